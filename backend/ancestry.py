@@ -0,0 +1,110 @@
+"""
+Outage impact: which customers sit below each headend, FDH, splitter and drop line.
+
+CustomerAncestry is a closure table of the plant. Every connected customer
+has one row per node on its path (headend, FDH, splitter and its active
+drop line from that splitter, if any),
+keyed (ancestor_type, ancestor_id, customer_id). The customers behind any
+set of failed nodes are then one range scan of that primary key, at any
+level: a whole headend costs the same single lookup as one drop line,
+instead of a walk down through FDHs and splitters.
+
+crud keeps the table in step, in the same transaction as the hierarchy
+writes. Port assignment and release rewrite the customer's rows, and moving
+an FDH to another headend (or a splitter to another FDH) rewrites the rows
+of every customer below it. A rewrite is a DELETE plus one INSERT ... SELECT
+over the hierarchy tables for just those customers.
+
+migrations.py fills the table when it creates it. Bulk loads that bypass
+crud (synthetic_data.py) rebuild it afterwards. To repair it, run:
+    python ancestry.py --rebuild
+"""
+from sqlalchemy import select, delete, insert, literal, union_all, or_, and_
+from sqlalchemy.orm import Session
+import models
+
+LEVELS = ("headend", "fdh", "splitter", "drop_line")
+COLUMNS = ("ancestor_type", "ancestor_id", "customer_id")
+_CHUNK = 500 # Customers per rewrite statement, to keep IN lists modest
+
+def _paths(customer_ids: list[int] | None = None):
+    """(ancestor_type, ancestor_id, customer_id) for every level, for all customers or the given ones"""
+    customer, splitter, fdh, line = models.Customer, models.Splitter, models.FDH, models.FiberDropLine
+    levels = [
+        select(literal("splitter"), customer.splitter_id, customer.customer_id)
+        .where(customer.splitter_id.isnot(None)),
+        select(literal("fdh"), splitter.fdh_id, customer.customer_id)
+        .join(splitter, splitter.splitter_id == customer.splitter_id)
+        .where(splitter.fdh_id.isnot(None)),
+        select(literal("headend"), fdh.headend_id, customer.customer_id)
+        .join(splitter, splitter.splitter_id == customer.splitter_id)
+        .join(fdh, fdh.fdh_id == splitter.fdh_id)
+        .where(fdh.headend_id.isnot(None)),
+        # Only a live drop: release leaves the line in place, and a customer
+        # moved to another splitter may still have the old one
+        select(literal("drop_line"), line.line_id, customer.customer_id)
+        .join(line, and_(line.to_customer_id == customer.customer_id,
+                         line.from_splitter_id == customer.splitter_id))
+        .where(line.status == "Active"),
+    ]
+    if customer_ids is not None:
+        levels = [level.where(customer.customer_id.in_(customer_ids)) for level in levels]
+    return union_all(*levels)
+
+def refresh(db: Session, customer_ids: list[int]):
+    """Rewrite the rows of these customers from the hierarchy as it stands in this transaction"""
+    if not customer_ids:
+        return
+    db.flush()
+    closure = models.CustomerAncestry
+    for start in range(0, len(customer_ids), _CHUNK):
+        chunk = customer_ids[start:start + _CHUNK]
+        db.execute(delete(closure).where(closure.customer_id.in_(chunk)))
+        db.execute(insert(closure).from_select(COLUMNS, _paths(chunk)))
+
+def below(db: Session, level: str, node_id: int) -> list[int]:
+    """IDs of the customers below one node"""
+    closure = models.CustomerAncestry
+    return list(db.scalars(
+        select(closure.customer_id).where(closure.ancestor_type == level, closure.ancestor_id == node_id)
+    ))
+
+def move(db: Session, level: str, node_id: int):
+    """Rewrite the rows below a node after it moved to a new parent"""
+    refresh(db, below(db, level, node_id))
+
+def affected(failed: dict[str, list[int]]):
+    """
+    SELECT of the distinct customer IDs below any of the failed nodes,
+    given as {level: [node IDs]}, for use as a subquery.
+    """
+    closure = models.CustomerAncestry
+    return select(closure.customer_id).where(or_(*(
+        and_(closure.ancestor_type == level, closure.ancestor_id.in_(ids))
+        for level, ids in failed.items() if ids
+    ))).distinct()
+
+def rebuild(db: Session):
+    """Recompute the whole table from the hierarchy tables"""
+    db.execute(delete(models.CustomerAncestry))
+    db.execute(insert(models.CustomerAncestry).from_select(COLUMNS, _paths()))
+    db.commit()
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the customer ancestry (outage impact) table")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every row from the hierarchy tables")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        db = SessionLocal()
+        try:
+            rebuild(db)
+        finally:
+            db.close()
+        print("Customer ancestry rebuilt.")
+    else:
+        parser.print_help()
@@ -0,0 +1,179 @@
+"""
+Trigram index for substring search on Asset.serial_number, model and location.
+
+A '%term%' LIKE cannot use a B-tree index, so every keystroke in the asset
+list used to scan the whole Asset table. Instead, every 3-character window
+of each searchable field is stored in AssetSearchTrigram, keyed by
+(trigram, field, asset_id). A search for "arehou" first counts the postings
+of its trigrams ("are", "reh", "eho", "hou"), each up to MAX_CANDIDATES in
+one query. The assets under the rarest one are the candidates, and the real
+substring check runs on those alone.
+
+The index only pays off for selective terms. When every trigram of the term
+has MAX_CANDIDATES postings or more (e.g. "warehouse" in a stock of spares),
+the search is a plain ILIKE instead: walking those postings would cost more
+than scanning Asset, and a page of a listing can stop scanning as soon as
+it is full. benchmarks/asset_search.py measures both cases.
+
+The index is kept up to date by the asset writes in crud. migrations.py
+builds it for existing rows when it creates the table, and seed.py and
+synthetic_data.py rebuild it after their bulk inserts. Anything else that
+writes Asset rows directly must do the same. To repair it, run:
+    python asset_search.py --rebuild
+
+Settings:
+    ASSET_SEARCH_MAX_CANDIDATES   postings above which a trigram is too common to use (default 2000)
+"""
+from sqlalchemy import select, delete, insert, func, case, or_, literal, union_all
+from sqlalchemy.orm import Session
+import models
+import os
+import unicodedata
+
+SEARCH_FIELDS = ("serial_number", "model", "location")
+MAX_CANDIDATES = int(os.getenv("ASSET_SEARCH_MAX_CANDIDATES", "2000"))
+
+def normalize(text: str) -> str:
+    """Lower-case and strip accents, so the index agrees with case/accent-insensitive collations"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def trigrams(text: str | None) -> set[str]:
+    if not text:
+        return set()
+    text = normalize(text)
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _trigram_rows(asset) -> list[dict]:
+    return [
+        {"trigram": gram, "field": field, "asset_id": asset.asset_id}
+        for field in SEARCH_FIELDS
+        for gram in trigrams(getattr(asset, field))
+    ]
+
+def index_assets(db: Session, assets):
+    """
+    (Re)index the given assets; they must already have IDs (flushed).
+    Runs inside the caller's transaction, so the index commits or rolls
+    back together with the asset rows.
+    """
+    assets = list(assets)
+    if not assets:
+        return
+    db.execute(delete(models.AssetSearchTrigram).where(
+        models.AssetSearchTrigram.asset_id.in_([asset.asset_id for asset in assets])
+    ))
+    rows = [row for asset in assets for row in _trigram_rows(asset)]
+    if rows:
+        db.execute(insert(models.AssetSearchTrigram), rows)
+
+def _postings(db: Session, grams, fields) -> dict[str, int]:
+    """Postings per trigram in `fields`, each counted up to MAX_CANDIDATES, in one query"""
+    trigram = models.AssetSearchTrigram
+    probes = [
+        select(literal(gram).label("trigram"), func.count().label("postings")).select_from(
+            select(trigram.asset_id)
+            .where(trigram.trigram == gram, trigram.field.in_(fields))
+            .limit(MAX_CANDIDATES)
+            .subquery()
+        )
+        for gram in sorted(grams)
+    ]
+    query = probes[0] if len(probes) == 1 else union_all(*probes)
+    return {row.trigram: row.postings for row in db.execute(query)}
+
+def candidate_ids(db: Session, term: str, fields=SEARCH_FIELDS):
+    """
+    Subquery of asset IDs that may have `term` in one of `fields` (a
+    superset: callers still apply the real substring check). None when the
+    index wouldn't help: the term is shorter than a trigram, or too common.
+    """
+    grams = trigrams(term)
+    if not grams:
+        return None
+    postings = _postings(db, grams, fields)
+    rarest = min(grams, key=lambda gram: postings.get(gram, 0))
+    if postings.get(rarest, 0) >= MAX_CANDIDATES:
+        return None
+    trigram = models.AssetSearchTrigram
+    return select(trigram.asset_id).where(trigram.trigram == rarest, trigram.field.in_(fields))
+
+def filter_contains(query, column, term: str):
+    """Case-insensitive substring filter on one Asset column, using the index when it helps"""
+    candidates = candidate_ids(query.session, term, (column.key,))
+    if candidates is not None:
+        query = query.filter(models.Asset.asset_id.in_(candidates))
+    return query.filter(column.ilike(f"%{term}%"))
+
+def search_assets(db: Session, term: str,
+                  asset_type=None, status=None, limit: int = 50):
+    """
+    Ranked substring search across serial number, model and location.
+    Exact serial matches come first, then serial prefixes, then any serial,
+    model or location match.
+    """
+    asset = models.Asset
+    pattern = f"%{term}%"
+    query = db.query(asset)
+
+    if len(normalize(term)) >= 3:
+        candidates = candidate_ids(db, term)
+        if candidates is not None:
+            query = query.filter(asset.asset_id.in_(candidates))
+        query = query.filter(or_(*(getattr(asset, field).ilike(pattern) for field in SEARCH_FIELDS)))
+    else:
+        # Too short for trigrams: fall back to (indexed) serial number prefixes
+        query = query.filter(asset.serial_number.ilike(f"{term}%"))
+
+    if asset_type:
+        query = query.filter(asset.asset_type == asset_type)
+    if status:
+        query = query.filter(asset.status == status)
+
+    rank = case(
+        (asset.serial_number == term, 0),
+        (asset.serial_number.ilike(f"{term}%"), 1),
+        (asset.serial_number.ilike(pattern), 2),
+        (asset.model.ilike(pattern), 3),
+        else_=4,
+    )
+    return query.order_by(rank, asset.asset_id).limit(limit).all()
+
+def rebuild(db: Session, batch_size: int = 5000):
+    """Rebuild the whole trigram index from the Asset table"""
+    db.execute(delete(models.AssetSearchTrigram))
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(models.Asset.asset_id, *(getattr(models.Asset, f) for f in SEARCH_FIELDS))
+            .where(models.Asset.asset_id > last_id)
+            .order_by(models.Asset.asset_id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        rows = [row for asset in batch for row in _trigram_rows(asset)]
+        if rows:
+            # Core insert on the table: plain executemany, no ORM bulk bookkeeping
+            db.execute(insert(models.AssetSearchTrigram.__table__), rows)
+        db.commit()
+        last_id = batch[-1].asset_id
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the asset search trigram index")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the index from the Asset table")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        db = SessionLocal()
+        try:
+            rebuild(db)
+        finally:
+            db.close()
+        print("Asset search index rebuilt.")
+    else:
+        parser.print_help()
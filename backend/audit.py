@@ -0,0 +1,212 @@
+"""
+Audit pipeline: structured change events written in batches off the request path.
+
+crud describes each change as an AuditEvent: action, entity, id, field diffs
+and user. record() attaches the event to the request's session. Once that
+session commits, the event goes on a bounded queue, and a background thread
+inserts queued events into AuditLog in multi-row batches. A rolled-back
+transaction drops its events, so the log only shows changes that happened.
+
+Synchronous mode writes the AuditLog row inside the caller's transaction
+instead. It is used when:
+  - record(..., atomic=True) is passed, for security-relevant actions that
+    must not lose their trail if the process dies before a batch is
+    written: logins, port assignments and releases, and task dispatch;
+  - AUDIT_MODE=sync is set;
+  - the writer isn't running (scripts, tests without the app lifespan);
+  - the queue stays full for longer than AUDIT_ENQUEUE_TIMEOUT seconds.
+Events are never dropped.
+
+Events are attributed to acting_user, which auth.authenticate sets per
+request from the caller's token (None for system actions and anonymous
+requests), unless crud passes user_id explicitly.
+
+stop() drains and flushes the queue; the app calls it on shutdown.
+"""
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+import models
+
+logger = logging.getLogger(__name__)
+
+AUDIT_MODE = os.getenv("AUDIT_MODE", "async").lower()
+QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+ENQUEUE_TIMEOUT = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT", "0.05"))
+
+# User ID of whoever is making the current request
+acting_user: ContextVar[int | None] = ContextVar("acting_user", default=None)
+
+@dataclass
+class AuditEvent:
+    action_type: str
+    entity_type: str
+    entity_id: int
+    # field -> [old, new]
+    changes: dict = field(default_factory=dict)
+    user_id: int | None = field(default_factory=acting_user.get)
+    # Short human label for the entity, e.g. a serial number or FDH name
+    label: str | None = None
+    timestamp: datetime.datetime = field(default_factory=datetime.datetime.utcnow)
+
+    def description(self) -> str:
+        subject = f"{self.entity_type} {self.label or self.entity_id}"
+        if not self.changes:
+            return f"{self.action_type}: {subject} (ID: {self.entity_id})"
+        changes = ", ".join(f"{k}: {old} -> {new}" for k, (old, new) in self.changes.items())
+        return f"{self.action_type}: {subject} (ID: {self.entity_id}). Changes: {changes}"
+
+    def row(self) -> dict:
+        return {
+            "action_type": self.action_type,
+            "entity_type": self.entity_type,
+            "entity_id": self.entity_id,
+            "changes": json.dumps(self.changes, default=str) if self.changes else None,
+            "description": self.description(),
+            "timestamp": self.timestamp,
+            "user_id": self.user_id,
+        }
+
+def diff(obj, update_data: dict) -> dict:
+    """Field diffs {field: [old, new]} for the values in update_data that actually change obj"""
+    changes = {}
+    for key, new in update_data.items():
+        old = getattr(obj, key)
+        if old != new:
+            changes[key] = [_plain(old), _plain(new)]
+    return changes
+
+def _plain(value):
+    # str-Enum members (schemas.AssetStatus etc.) -> their value
+    return getattr(value, "value", value)
+
+
+class AuditWriter:
+    def __init__(self, session_factory, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Stop the worker after everything queued so far has been written"""
+        if not self.running:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def enqueue(self, events) -> list:
+        """Queue events; returns those that didn't fit within ENQUEUE_TIMEOUT"""
+        for i, audit_event in enumerate(events):
+            try:
+                self.queue.put(audit_event, timeout=ENQUEUE_TIMEOUT)
+            except queue.Full:
+                return events[i:]
+        return []
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+            elif self._stopping.is_set():
+                return
+
+    def _take_batch(self) -> list:
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        for attempt in range(3):
+            db = self.session_factory()
+            try:
+                db.execute(insert(models.AuditLog), [audit_event.row() for audit_event in batch])
+                db.commit()
+                return
+            except Exception:
+                db.rollback()
+                logger.exception("Audit batch insert failed (attempt %d)", attempt + 1)
+            finally:
+                db.close()
+        # Last resort: keep the trail in the application log
+        for audit_event in batch:
+            logger.error("Unwritten audit event: %s", json.dumps(audit_event.row(), default=str))
+
+
+writer: AuditWriter | None = None
+
+def start(session_factory):
+    global writer
+    if AUDIT_MODE == "sync":
+        return
+    writer = AuditWriter(session_factory)
+    writer.start()
+
+def stop():
+    if writer is not None:
+        writer.stop()
+
+def record(db: Session, audit_event: AuditEvent, atomic: bool = False):
+    """
+    Audit a change made in `db`'s current transaction.
+    With atomic=True (or no background writer), the AuditLog row is added to
+    the same transaction; otherwise it is queued once the transaction commits.
+    """
+    if atomic or writer is None or not writer.running:
+        db.add(models.AuditLog(**audit_event.row()))
+        return
+    db.info.setdefault("pending_audit", []).append(audit_event)
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed(session):
+    pending = session.info.pop("pending_audit", None)
+    if not pending:
+        return
+    overflow = writer.enqueue(pending) if writer is not None and writer.running else pending
+    if overflow:
+        # Queue is saturated (or writer gone): write these directly rather than drop them
+        db = writer.session_factory() if writer is not None else None
+        if db is None:
+            logger.error("Audit writer unavailable; %d events logged only", len(overflow))
+            for audit_event in overflow:
+                logger.error("Unwritten audit event: %s", json.dumps(audit_event.row(), default=str))
+            return
+        try:
+            db.execute(insert(models.AuditLog), [audit_event.row() for audit_event in overflow])
+            db.commit()
+        finally:
+            db.close()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("pending_audit", None)
@@ -0,0 +1,75 @@
+"""
+Move AuditLog entries older than N days out of the hot table.
+
+AuditLog only grows, and every query against it pays for that. This job
+moves entries older than the retention window, in timestamp order and in
+fixed-size batches, either into the AuditLogArchive table (no secondary
+indexes apart from timestamp, no foreign keys) or into a gzipped NDJSON
+file. With the table target each batch is copied and deleted in one
+transaction. With a file, a batch is written out before its rows are
+deleted, so an interrupted run may repeat a batch in the file but never
+loses one.
+
+Run it from cron:
+    python audit_archive.py --older-than 90
+    python audit_archive.py --older-than 90 --file /var/archive/audit-2026.ndjson.gz
+"""
+from sqlalchemy import select, delete, insert
+from sqlalchemy.orm import Session
+import datetime
+import gzip
+import json
+import models
+
+ARCHIVE_COLUMNS = [column.name for column in models.AuditLogArchive.__table__.columns]
+
+def archive_older_than(db: Session, days: int, file_path: str | None = None, batch_size: int = 5000) -> int:
+    """Archive entries older than `days` days; returns how many were moved"""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    log = models.AuditLog
+    moved = 0
+    archive_file = gzip.open(file_path, "at", encoding="utf-8") if file_path else None
+
+    try:
+        while True:
+            # Oldest first, served by ix_AuditLog_timestamp
+            rows = db.execute(
+                select(*(getattr(log, name) for name in ARCHIVE_COLUMNS))
+                .where(log.timestamp < cutoff)
+                .order_by(log.timestamp, log.log_id)
+                .limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+
+            if archive_file:
+                archive_file.writelines(json.dumps(dict(row), default=str) + "\n" for row in rows)
+                archive_file.flush()
+            else:
+                db.execute(insert(models.AuditLogArchive), [dict(row) for row in rows])
+            db.execute(delete(log).where(log.log_id.in_([row["log_id"] for row in rows])))
+            db.commit()
+            moved += len(rows)
+    finally:
+        if archive_file:
+            archive_file.close()
+    return moved
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Archive old audit log entries")
+    parser.add_argument("--older-than", type=int, required=True, metavar="DAYS",
+                        help="archive entries older than this many days")
+    parser.add_argument("--file", help="append to this gzipped NDJSON file instead of the AuditLogArchive table")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        moved = archive_older_than(db, args.older_than, file_path=args.file, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Archived {moved} audit log entries.")
@@ -0,0 +1,165 @@
+"""
+Login and bearer-token authentication.
+
+Passwords are only checked at login. Argon2 costs tens of milliseconds of
+CPU by design, so it runs on a small dedicated thread pool
+(AUTH_HASH_WORKERS) rather than the event loop or the shared threadpool
+the database calls use; a burst of logins queues there instead of starving
+everything else. argon2-cffi releases the GIL while hashing, so the
+workers really run in parallel.
+
+A successful login returns an HMAC-SHA256 signed token carrying the user's
+ID, username, role and expiry. Requests send it as "Authorization: Bearer
+<token>"; checking it is a signature check, and tokens already checked are
+kept in a bounded cache until they expire, so repeat requests cost a dict
+lookup. authenticate() also records the caller as audit.acting_user, which
+is where AuditLog.user_id comes from.
+
+Settings:
+    AUTH_SECRET_KEY        signing key; must be the same on every worker
+    AUTH_TOKEN_TTL         token lifetime in seconds (default 8 hours)
+    AUTH_REQUIRED          reject requests without a token (default off)
+    AUTH_HASH_WORKERS      argon2 threads (default 2)
+    AUTH_TOKEN_CACHE_SIZE  verified tokens kept in memory (default 10000)
+Argon2 parameters are set in crud.pwd_context (ARGON2_* variables).
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+import asyncio
+import base64
+import datetime
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import audit
+import crud
+
+logger = logging.getLogger(__name__)
+
+SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "")
+TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL", str(8 * 3600)))
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "0").lower() in ("1", "true", "yes")
+HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+
+if not SECRET_KEY:
+    # Tokens then only work on this worker and until it restarts
+    logger.warning("AUTH_SECRET_KEY is not set; using a random per-process key")
+    SECRET_KEY = secrets.token_urlsafe(32)
+_key = SECRET_KEY.encode()
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int
+    username: str
+    role: str
+
+
+# --- Password verification ---
+
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="argon2")
+
+@functools.cache
+def _dummy_hash() -> str:
+    return crud.get_password_hash(secrets.token_urlsafe(16))
+
+async def verify_password(password: str, password_hash: str | None) -> tuple[bool, str | None]:
+    """
+    Check a password on the argon2 pool. Returns (valid, upgraded hash or None).
+    Pass password_hash=None for an unknown user: a dummy hash is checked
+    instead, so response time doesn't reveal which usernames exist.
+    """
+    loop = asyncio.get_running_loop()
+    if password_hash is None:
+        await loop.run_in_executor(_hash_pool, crud.pwd_context.verify, password, _dummy_hash())
+        return False, None
+    return await loop.run_in_executor(_hash_pool, crud.pwd_context.verify_and_update, password, password_hash)
+
+
+# --- Tokens ---
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_key, payload.encode(), hashlib.sha256).digest())
+
+def issue_token(user) -> dict:
+    """A signed access token for a models.User, in the shape of schemas.Token"""
+    expires_at = int(time.time()) + TOKEN_TTL_SECONDS
+    claims = {"sub": user.user_id, "name": user.username, "role": user.role, "exp": expires_at}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return {
+        "access_token": f"{payload}.{_sign(payload)}",
+        "token_type": "bearer",
+        "expires_at": datetime.datetime.fromtimestamp(expires_at, datetime.timezone.utc),
+        "user_id": user.user_id,
+        "username": user.username,
+        "role": user.role,
+    }
+
+_cache_lock = threading.Lock()
+# token -> (principal, expiry), least recently used first
+_token_cache: OrderedDict[str, tuple[Principal, int]] = OrderedDict()
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+def verify_token(token: str) -> Principal:
+    """The principal a token was issued to; raises 401 if it is forged, malformed or expired"""
+    now = time.time()
+    with _cache_lock:
+        cached = _token_cache.get(token)
+        if cached is not None:
+            if cached[1] > now:
+                _token_cache.move_to_end(token)
+                return cached[0]
+            del _token_cache[token]
+
+    payload, _, signature = token.partition(".")
+    # Compared as bytes: compare_digest rejects str with non-ASCII characters
+    if not signature or not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+        raise _unauthorized("Invalid token")
+    try:
+        claims = json.loads(_b64decode(payload))
+        principal = Principal(int(claims["sub"]), claims["name"], claims["role"])
+        expires_at = int(claims["exp"])
+    except (ValueError, KeyError, TypeError):
+        raise _unauthorized("Invalid token")
+    if expires_at <= now:
+        raise _unauthorized("Token has expired")
+
+    with _cache_lock:
+        _token_cache[token] = (principal, expires_at)
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return principal
+
+
+# --- Dependencies ---
+
+_bearer = HTTPBearer(auto_error=False)
+
+async def authenticate(credentials: HTTPAuthorizationCredentials | None = Depends(_bearer)) -> Principal | None:
+    """
+    Router dependency: identify the caller from its bearer token, if any,
+    and attribute the request's audit events to them. A bad token is always
+    a 401; a missing one only when AUTH_REQUIRED is set.
+    """
+    principal = verify_token(credentials.credentials) if credentials else None
+    if principal is None and AUTH_REQUIRED:
+        raise _unauthorized("Not authenticated")
+    audit.acting_user.set(principal.user_id if principal else None)
+    return principal
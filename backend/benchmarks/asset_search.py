@@ -0,0 +1,120 @@
+"""
+Asset substring search: the trigram index against a plain ILIKE scan.
+
+Seeds a throwaway SQLite database with assets shaped like a stock of
+spares: unique serial numbers, a handful of models, and most units in one
+of two warehouses (the rest on vans or at sites). Builds the trigram index
+(asset_search.rebuild), then times each query three ways:
+  index: always narrow down through the trigram index;
+  scan:  always a plain ILIKE over Asset;
+  auto:  what the API does, the index only for selective terms
+         (asset_search.MAX_CANDIDATES).
+The queries are a page of the asset list filtered by location
+(crud.get_assets) and the ranked search (crud.search_assets), with a
+common term and with rare ones. It checks that all three ways agree.
+
+Run from the backend directory:
+    python -m benchmarks.asset_search [--assets 100000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench_asset_search.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+import asset_search
+import crud
+import migrations
+import models
+from database import SessionLocal, engine
+
+MODELS = ["Nokia G-010G-A", "Huawei HG8245H", "Netgear R7000", "TP-Link Archer C6", "ZTE F660"]
+
+
+def seed(db, assets: int) -> list[str]:
+    rng = random.Random(42)
+    rows = []
+    for i in range(assets):
+        where = rng.random()
+        if where < 0.85:
+            location = rng.choice(["Warehouse A", "Warehouse B"])
+        elif where < 0.95:
+            location = f"Van {rng.randrange(1, 200)}"
+        else:
+            location = f"Site {rng.randrange(1, 5000)} Cabinet"
+        rows.append({
+            "asset_type": rng.choice(["ONT", "Router"]),
+            "model": rng.choice(MODELS),
+            "serial_number": f"SN{rng.randrange(16 ** 10):010X}{i}",
+            "status": "Available",
+            "location": location,
+        })
+    for start in range(0, assets, 50_000):
+        db.execute(insert(models.Asset), rows[start:start + 50_000])
+    db.commit()
+    return [row["serial_number"] for row in rows]
+
+
+def best_of(repeat: int, fn, *args):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assets", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        serials = seed(db, args.assets)
+        rebuild_s, _ = best_of(1, asset_search.rebuild, db)
+        print(f"{args.assets:,} assets, trigram index rebuilt in {rebuild_s:,.1f} s")
+
+        def page(location):
+            return [row.asset_id for row in crud.get_assets(db, location=location, limit=100)["items"]]
+
+        def search(q):
+            return [asset.asset_id for asset in crud.search_assets(db, q)]
+
+        queries = [
+            ("list page", "warehouse", page),
+            ("list page", "Van 17", page),
+            ("list page", "Site 4242", page),
+            ("search", "warehouse", search),
+            ("search", serials[len(serials) // 2][4:12], search),
+            ("search", "R7000", search),
+        ]
+        modes = {"index": 10 ** 12, "scan": 0, "auto": asset_search.MAX_CANDIDATES}
+        print(f"  {'query':<10} {'term':<12} {'rows':>5} " + " ".join(f"{mode:>10}" for mode in modes))
+        for name, term, fn in queries:
+            timings, results = [], []
+            for limit in modes.values():
+                asset_search.MAX_CANDIDATES = limit
+                elapsed, result = best_of(args.repeat, fn, term)
+                timings.append(elapsed)
+                results.append(result)
+            asset_search.MAX_CANDIDATES = modes["auto"]
+            if any(result != results[0] for result in results):
+                raise SystemExit(f"{name} {term!r}: index, scan and auto disagree")
+            print(f"  {name:<10} {term:<12} {len(results[0]):>5} "
+                  + " ".join(f"{elapsed * 1000:>7.1f} ms" for elapsed in timings))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Batch dispatch of a week's install backlog (crud.schedule_tasks).
+
+Seeds a throwaway SQLite database with customers spread over regions and
+neighborhoods, technicians per region, and N unscheduled tasks (a tenth of
+them with a fixed date). It then schedules the whole backlog over a week,
+timing each stage: load (three queries), plan (in memory) and write (one
+executemany UPDATE plus commit). Afterwards it checks the result: every
+task is handled once, fixed dates are kept, and no technician's day goes
+over capacity.
+
+Run from the backend directory:
+    python -m benchmarks.dispatch [--tasks 10000] [--regions 8] [--technicians 30]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench_dispatch.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+
+import dispatch
+import migrations
+import models
+from database import SessionLocal, engine
+
+NEIGHBORHOODS_PER_REGION = 40
+START = datetime.date(2026, 1, 5)
+DAYS = 7
+
+
+def seed(db, tasks: int, regions: int, technicians: int, rng: random.Random):
+    region_names = [f"Region {r}" for r in range(regions)]
+    db.execute(insert(models.Headend), [{"headend_id": 1, "name": "BENCH-HE"}])
+    db.execute(insert(models.FDH), [
+        {"fdh_id": r + 1, "name": f"BENCH-FDH-{r}", "location": "Bench", "region": name, "headend_id": 1}
+        for r, name in enumerate(region_names)
+    ])
+    db.execute(insert(models.Splitter), [
+        {"splitter_id": r + 1, "model": "1:32", "port_capacity": 32, "used_ports": 0, "fdh_id": r + 1}
+        for r in range(regions)
+    ])
+    db.execute(insert(models.Technician), [
+        {"name": f"Tech {r}-{t}", "region": name, "daily_capacity": rng.choice([None, 5, 6, 8])}
+        for r, name in enumerate(region_names) for t in range(technicians)
+    ])
+    db.execute(insert(models.Customer), [
+        {"customer_id": i + 1, "name": f"Bench {i}", "address": f"{i} Bench St", "status": "Pending",
+         "splitter_id": i % regions + 1, "neighborhood": f"Hood {rng.randrange(NEIGHBORHOODS_PER_REGION)}"}
+        for i in range(tasks)
+    ])
+    db.execute(insert(models.DeploymentTask), [
+        {"customer_id": i + 1, "status": "Scheduled",
+         "scheduled_date": START + datetime.timedelta(days=rng.randrange(DAYS)) if rng.random() < 0.1 else None}
+        for i in range(tasks)
+    ])
+    db.commit()
+
+
+def check(db, tasks: int, fixed_dates: dict):
+    rows = db.execute(
+        select(models.DeploymentTask.task_id, models.DeploymentTask.technician_id, models.DeploymentTask.scheduled_date)
+    ).all()
+    assert len(rows) == tasks
+    for task_id, technician_id, day in rows:
+        if task_id in fixed_dates and technician_id is not None:
+            assert day == fixed_dates[task_id], f"task {task_id} moved off its fixed date"
+    capacity = {
+        technician_id: daily_capacity or dispatch.DEFAULT_DAILY_CAPACITY
+        for technician_id, daily_capacity in db.execute(select(models.Technician.technician_id, models.Technician.daily_capacity))
+    }
+    load = Counter((technician_id, day) for _, technician_id, day in rows if technician_id is not None)
+    over = [key for key, count in load.items() if count > capacity[key[0]]]
+    assert not over, f"{len(over)} technician days over capacity"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--regions", type=int, default=8)
+    parser.add_argument("--technicians", type=int, default=30, help="technicians per region")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        seed(db, args.tasks, args.regions, args.technicians, random.Random(args.seed))
+        fixed_dates = dict(db.execute(
+            select(models.DeploymentTask.task_id, models.DeploymentTask.scheduled_date)
+            .where(models.DeploymentTask.scheduled_date.isnot(None))
+        ).all())
+
+        start = time.perf_counter()
+        backlog = dispatch.load(db, START, DAYS)
+        loaded = time.perf_counter()
+        plan = dispatch.plan(backlog, START, DAYS)
+        planned = time.perf_counter()
+        dispatch.apply(db, plan.assignments)
+        db.commit()
+        written = time.perf_counter()
+
+        check(db, args.tasks, fixed_dates)
+        neighborhood = {task_id: hood for task_id, _, hood, _ in backlog.tasks}
+        stops = {}
+        for task_id, technician_id, day, _ in plan.assignments:
+            stops.setdefault((technician_id, day), set()).add(neighborhood[task_id])
+        days_used = len(stops)
+        print(f"{args.tasks:,} tasks, {args.regions} regions x {args.technicians} technicians, {DAYS} days")
+        print(f"  scheduled   {len(plan.assignments):>8,}  unassigned {len(plan.unassigned):,}")
+        print(f"  technician-days used {days_used:,}, "
+              f"{len(plan.assignments) / max(days_used, 1):.1f} tasks and "
+              f"{sum(map(len, stops.values())) / max(days_used, 1):.1f} neighborhoods each")
+        print(f"  load  {(loaded - start) * 1000:>8.1f} ms")
+        print(f"  plan  {(planned - loaded) * 1000:>8.1f} ms")
+        print(f"  write {(written - planned) * 1000:>8.1f} ms")
+        print(f"  total {(written - start) * 1000:>8.1f} ms")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
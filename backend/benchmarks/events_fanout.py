@@ -0,0 +1,134 @@
+"""
+Change event fan-out to many connected operator sessions.
+
+Runs the events broker in process, without sockets: each simulated session
+subscribes to "hierarchy", the assets list or a few FDH and splitter topics
+(as the Network page, the asset list and the topology view would), and a
+sender task per session drains its outbox the way events.serve does. Then
+publishes a burst of splitter and customer events from a worker thread and
+times:
+  publish:  encoding every event in the writing thread;
+  fan-out:  until every session has taken all its frames off its outbox.
+It checks that each session got exactly the events for its topics, or a
+resync if it fell more than EVENTS_OUTBOX_LIMIT events behind.
+
+Run from the backend directory:
+    python -m benchmarks.events_fanout [--sessions 2000] [--events 5000] [--fdhs 200]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+
+import events
+
+
+def session_topics(rng: random.Random, fdhs: int) -> list[str]:
+    kind = rng.random()
+    if kind < 0.2:
+        return ["hierarchy"]
+    if kind < 0.4:
+        return ["assets"]
+    fdh_id = rng.randrange(1, fdhs + 1)
+    return [f"fdh:{fdh_id}", f"splitter:{fdh_id * 8}"]
+
+
+def make_events(rng: random.Random, count: int, fdhs: int) -> list[tuple]:
+    """Splitter and customer updates, topics as crud publishes them"""
+    result = []
+    for i in range(count):
+        fdh_id = rng.randrange(1, fdhs + 1)
+        splitter_id = fdh_id * 8 - rng.randrange(8)
+        if i % 4 == 0:
+            data = {"splitter_id": splitter_id, "fdh_id": fdh_id, "model": "1:32", "port_capacity": 32,
+                    "used_ports": rng.randrange(33), "location": "Bench"}
+            result.append(("splitter.updated", data,
+                           ["hierarchy", f"splitter:{splitter_id}", f"fdh:{fdh_id}"]))
+        else:
+            data = {"customer_id": i, "name": f"Bench {i}", "address": f"{i} Bench St", "status": "Active",
+                    "splitter_id": splitter_id, "assigned_port": rng.randrange(1, 33)}
+            result.append(("customer.updated", data,
+                           [f"customer:{i}", f"splitter:{splitter_id}", f"fdh:{fdh_id}"]))
+    return result
+
+
+async def run(sessions: int, event_count: int, fdhs: int) -> None:
+    rng = random.Random(42)
+    events.start()
+    broker = events._broker
+    subscribers = []
+    for _ in range(sessions):
+        subscriber = events.Subscriber()
+        broker.subscribe(subscriber, session_topics(rng, fdhs))
+        subscribers.append(subscriber)
+    expected = {id(s): 0 for s in subscribers}
+    burst = make_events(rng, event_count, fdhs)
+    for _, _, topics in burst:
+        for subscriber in {s for topic in topics for s in broker.subscribers.get(topic, ())}:
+            expected[id(subscriber)] += 1
+    deliveries = sum(expected.values())
+
+    received = {id(s): 0 for s in subscribers}
+    frames = resyncs = 0
+    remaining = sum(1 for count in expected.values() if count)
+    done = asyncio.Event()
+
+    async def drain(subscriber):
+        nonlocal frames, resyncs, remaining
+        while received[id(subscriber)] < expected[id(subscriber)]:
+            frame = await subscriber.next_frame()
+            frames += 1
+            if frame == events._RESYNC:
+                # Would refetch; nothing more to count for this session
+                resyncs += 1
+                received[id(subscriber)] = expected[id(subscriber)]
+            else:
+                received[id(subscriber)] += len(orjson.loads(frame))
+        remaining -= 1
+        if remaining == 0:
+            done.set()
+
+    senders = [asyncio.create_task(drain(s)) for s in subscribers if expected[id(s)]]
+    await asyncio.sleep(0) # Let every sender reach its first wait
+
+    def writer():
+        for type, data, topics in burst:
+            events.publish(type, data, topics)
+
+    start = time.perf_counter()
+    thread = threading.Thread(target=writer)
+    thread.start()
+    await asyncio.to_thread(thread.join)
+    publish_s = time.perf_counter() - start
+    await asyncio.wait_for(done.wait(), timeout=60)
+    total_s = time.perf_counter() - start
+    await asyncio.gather(*senders)
+    events.stop()
+
+    wrong = [s for s in subscribers if received[id(s)] != expected[id(s)]]
+    if wrong:
+        raise SystemExit(f"{len(wrong)} sessions got the wrong number of events")
+    print(f"{sessions:,} sessions, {event_count:,} events -> {deliveries:,} deliveries in {frames:,} frames"
+          f" ({resyncs:,} sessions fell behind and resynced)")
+    print(f"  publish  {publish_s * 1000:>8.1f} ms  ({publish_s / event_count * 1e6:.1f} us per event)")
+    print(f"  fan-out  {total_s * 1000:>8.1f} ms  ({total_s / max(deliveries, 1) * 1e6:.2f} us per delivery)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--fdhs", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.sessions, args.events, args.fdhs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Latency of GET /api/topology/fdh/{id} as the cabinet grows.
+
+Seeds a throwaway SQLite database with one FDH per size, each holding N
+fully-populated splitters, then times the route and counts SQL statements.
+Query count should stay constant and the per-node cost (us/node) flat:
+total latency grows only with the size of the graph returned, not with
+extra round trips per splitter.
+
+Run from the backend directory:
+    python -m benchmarks.fdh_topology
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench_fdh_topology.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+
+import migrations
+import models
+from database import SessionLocal, engine
+from main import app
+
+SPLITTER_COUNTS = [1, 4, 9, 18, 36]
+PORTS_PER_SPLITTER = 32
+ITERATIONS = 50
+
+
+def seed_fdh(db, headend_id: int, splitter_count: int) -> int:
+    fdh = models.FDH(name=f"BENCH-FDH-{splitter_count}", location="Bench", headend_id=headend_id,
+                     max_ports=splitter_count * PORTS_PER_SPLITTER)
+    db.add(fdh)
+    db.flush()
+
+    splitters = [models.Splitter(model="1:32", port_capacity=PORTS_PER_SPLITTER, used_ports=PORTS_PER_SPLITTER,
+                                 location=f"Slot {i}", fdh_id=fdh.fdh_id) for i in range(splitter_count)]
+    db.add_all(splitters)
+    db.flush()
+
+    customers = []
+    for splitter in splitters:
+        for port in range(1, PORTS_PER_SPLITTER + 1):
+            customers.append(models.Customer(name=f"Bench {splitter.splitter_id}-{port}", address="Bench",
+                                             status="Active", assigned_port=port, splitter_id=splitter.splitter_id))
+    db.add_all(customers)
+    db.flush()
+
+    db.execute(insert(models.FiberDropLine), [
+        {"length_meters": 120, "from_splitter_id": c.splitter_id, "to_customer_id": c.customer_id}
+        for c in customers
+    ])
+    db.commit()
+    return fdh.fdh_id
+
+
+def main():
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    headend = models.Headend(name="BENCH-HE", location="Bench")
+    db.add(headend)
+    db.commit()
+    fdh_ids = {n: seed_fdh(db, headend.headend_id, n) for n in SPLITTER_COUNTS}
+    db.close()
+
+    statements = [0]
+    def count_statement(*args, **kwargs):
+        statements[0] += 1
+    event.listen(engine, "before_cursor_execute", count_statement)
+
+    client = TestClient(app)
+    print(f"{'splitters':>9} {'customers':>9} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8} {'us/node':>8}")
+    for n, fdh_id in fdh_ids.items():
+        client.get(f"/api/topology/fdh/{fdh_id}")  # warm up
+        statements[0] = 0
+        timings = []
+        for _ in range(ITERATIONS):
+            start = time.perf_counter()
+            response = client.get(f"/api/topology/fdh/{fdh_id}")
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        node_count = 2 + n + n * PORTS_PER_SPLITTER
+        print(f"{n:>9} {n * PORTS_PER_SPLITTER:>9} {statements[0] // ITERATIONS:>7} "
+              f"{p50:>8.2f} {p95:>8.2f} {p50 * 1000 / node_count:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
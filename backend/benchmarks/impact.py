@@ -0,0 +1,149 @@
+"""
+Outage impact lookups on the customer ancestry closure table.
+
+Seeds a throwaway SQLite database with headends, FDHs, 1:32 splitters, a
+customer with a drop line and an ONT on every port, builds the closure
+table (ancestry.rebuild), then takes one failed node at each level (a drop
+line, a splitter, an FDH and a whole headend) and times:
+  lookup: the affected customer IDs from the closure table;
+  walk:   the same IDs found by joining down the hierarchy
+          (Headend -> FDH -> Splitter -> Customer), for comparison;
+  report: the whole crud.get_outage_impact, customers with their assets.
+It checks that all three agree on the customers.
+
+Run from the backend directory:
+    python -m benchmarks.impact [--headends 4] [--fdhs-per-headend 50] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench_impact.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+
+import ancestry
+import crud
+import migrations
+import models
+import schemas
+from database import SessionLocal, engine
+
+SPLITTERS_PER_FDH = 8
+PORTS = 32
+
+
+def seed(db, headends: int, fdhs_per_headend: int) -> int:
+    fdhs = headends * fdhs_per_headend
+    splitters = fdhs * SPLITTERS_PER_FDH
+    customers = splitters * PORTS
+    db.execute(insert(models.Headend), [{"headend_id": h + 1, "name": f"BENCH-HE-{h}"} for h in range(headends)])
+    db.execute(insert(models.FDH), [
+        {"fdh_id": f + 1, "name": f"BENCH-FDH-{f}", "location": "Bench", "headend_id": f // fdhs_per_headend + 1}
+        for f in range(fdhs)
+    ])
+    db.execute(insert(models.Splitter), [
+        {"splitter_id": s + 1, "model": "1:32", "port_capacity": PORTS, "used_ports": PORTS,
+         "fdh_id": s // SPLITTERS_PER_FDH + 1}
+        for s in range(splitters)
+    ])
+    for start in range(0, customers, 50_000):
+        ids = range(start, min(customers, start + 50_000))
+        db.execute(insert(models.Customer), [
+            {"customer_id": i + 1, "name": f"Bench {i}", "address": f"{i} Bench St", "status": "Active",
+             "splitter_id": i // PORTS + 1, "assigned_port": i % PORTS + 1}
+            for i in ids
+        ])
+        db.execute(insert(models.FiberDropLine), [
+            {"line_id": i + 1, "from_splitter_id": i // PORTS + 1, "to_customer_id": i + 1,
+             "length_meters": 100, "status": "Active"}
+            for i in ids
+        ])
+        db.execute(insert(models.Asset), [
+            {"asset_id": i + 1, "asset_type": "ONT", "model": "Bench ONT", "serial_number": f"BENCH-{i}",
+             "status": "Assigned"}
+            for i in ids
+        ])
+        db.execute(insert(models.AssignedAssets), [{"customer_id": i + 1, "asset_id": i + 1} for i in ids])
+    db.commit()
+    return customers
+
+
+def walk(db, level: str, node_id: int) -> list[int]:
+    """The customers below a node, found by joining down the hierarchy"""
+    customer, splitter, fdh = models.Customer, models.Splitter, models.FDH
+    if level == "drop_line":
+        line = models.FiberDropLine
+        # A live drop: active, and from the splitter the customer is still on
+        query = (
+            select(customer.customer_id)
+            .join(line, (line.to_customer_id == customer.customer_id) & (line.from_splitter_id == customer.splitter_id))
+            .where(line.line_id == node_id, line.status == "Active")
+        )
+    elif level == "splitter":
+        query = select(customer.customer_id).where(customer.splitter_id == node_id)
+    else:
+        query = (
+            select(customer.customer_id)
+            .join(splitter, splitter.splitter_id == customer.splitter_id)
+            .join(fdh, fdh.fdh_id == splitter.fdh_id)
+            .where(fdh.fdh_id == node_id if level == "fdh" else fdh.headend_id == node_id)
+        )
+    return sorted(db.scalars(query))
+
+
+def lookup(db, level: str, node_id: int) -> list[int]:
+    return sorted(db.scalars(ancestry.affected({level: [node_id]})))
+
+
+def best_of(repeat: int, fn, *args):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--headends", type=int, default=4)
+    parser.add_argument("--fdhs-per-headend", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        customers = seed(db, args.headends, args.fdhs_per_headend)
+        rebuild_s, _ = best_of(1, ancestry.rebuild, db)
+        print(f"{customers:,} customers, closure table rebuilt in {rebuild_s * 1000:,.0f} ms")
+
+        requests = {
+            "drop_line": schemas.ImpactRequest(line_ids=[customers // 2]),
+            "splitter": schemas.ImpactRequest(splitter_ids=[1]),
+            "fdh": schemas.ImpactRequest(fdh_ids=[1]),
+            "headend": schemas.ImpactRequest(headend_ids=[1]),
+        }
+        print(f"  {'failed node':<11} {'customers':>9} {'lookup':>10} {'walk':>10} {'report':>10}")
+        for level, request in requests.items():
+            node_id = next(ids[0] for ids in request.model_dump().values() if ids)
+            lookup_s, found = best_of(args.repeat, lookup, db, level, node_id)
+            walk_s, walked = best_of(args.repeat, walk, db, level, node_id)
+            report_s, report = best_of(args.repeat, crud.get_outage_impact, db, request)
+            reported = [customer["customer_id"] for customer in report["customers"]]
+            if not found == walked == reported:
+                raise SystemExit(f"{level} {node_id}: closure, walk and report disagree "
+                                 f"({len(found)}, {len(walked)} and {len(reported)} customers)")
+            print(f"  {level:<11} {len(found):>9,} {lookup_s * 1000:>7.1f} ms {walk_s * 1000:>7.1f} ms "
+                  f"{report_s * 1000:>7.1f} ms")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Network-wide optical power budget over a million drop lines.
+
+Seeds a throwaway SQLite database with FDHs (with random feeder lengths),
+1:32 and 1:64 splitters, and N customers, each with an active drop line of
+random length (some unknown) from their splitter. It then times each stage of the below-margin report:
+  load:     the two queries that fill the line arrays (power_budget.load),
+            which the API amortizes through the network snapshot;
+  evaluate: loss and margin for every line (power_budget.evaluate);
+  report:   the 1000 worst lines below margin, plus the summary.
+Every line is also recomputed in plain Python and compared with the arrays.
+
+Run from the backend directory:
+    python -m benchmarks.power_budget [--lines 1000000] [--repeat 5]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench_power_budget.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+import migrations
+import models
+import power_budget
+from database import SessionLocal, engine
+
+LINES_PER_SPLITTER = 32
+SPLITTERS_PER_FDH = 8
+
+
+def seed(db, lines: int, rng: random.Random):
+    splitters = -(-lines // LINES_PER_SPLITTER)
+    fdhs = -(-splitters // SPLITTERS_PER_FDH)
+    db.execute(insert(models.Headend), [{"headend_id": 1, "name": "BENCH-HE"}])
+    db.execute(insert(models.FDH), [
+        {"fdh_id": f + 1, "name": f"BENCH-FDH-{f}", "location": "Bench", "headend_id": 1,
+         "feeder_length_meters": rng.choice([None, rng.randrange(1000, 20000)])}
+        for f in range(fdhs)
+    ])
+    db.execute(insert(models.Splitter), [
+        {"splitter_id": s + 1, "model": rng.choice(["1:32", "1:64"]), "port_capacity": 64, "used_ports": 0,
+         "fdh_id": s // SPLITTERS_PER_FDH + 1}
+        for s in range(splitters)
+    ])
+    for start in range(0, lines, 100_000):
+        db.execute(insert(models.Customer.__table__), [
+            {"customer_id": i + 1, "name": f"Bench {i}", "status": "Active",
+             "splitter_id": i // LINES_PER_SPLITTER + 1, "assigned_port": i % LINES_PER_SPLITTER + 1}
+            for i in range(start, min(lines, start + 100_000))
+        ])
+        db.execute(insert(models.FiberDropLine.__table__), [
+            {"line_id": i + 1, "from_splitter_id": i // LINES_PER_SPLITTER + 1, "to_customer_id": i + 1,
+             "length_meters": None if rng.random() < 0.02 else round(rng.uniform(20, 3000), 2), "status": "Active"}
+            for i in range(start, min(lines, start + 100_000))
+        ])
+    db.commit()
+
+
+def reference_margin(drop_m, feeder_m, ratio) -> float:
+    drop = power_budget.DEFAULT_DROP_METERS if math.isnan(drop_m) else drop_m
+    feeder = power_budget.DEFAULT_FEEDER_METERS if math.isnan(feeder_m) else feeder_m
+    loss = (power_budget.FIBER_DB_PER_KM * (feeder + drop) / 1000
+            + 10 * math.log10(ratio) + power_budget.SPLITTER_EXCESS_DB * math.log2(ratio)
+            + power_budget.FIXED_LOSS_DB)
+    return power_budget.BUDGET_DB - loss
+
+
+def best_of(repeat: int, fn, *args):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(budget):
+    positions = power_budget.below_margin(budget, limit=1000)
+    return power_budget.summary(budget), power_budget.rows(budget, positions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        print(f"Seeding {args.lines:,} drop lines ...", flush=True)
+        seed(db, args.lines, random.Random(args.seed))
+
+        load_s, lines = best_of(1, power_budget.load, db)
+        evaluate_s, budget = best_of(args.repeat, power_budget.evaluate, lines)
+        report_s, (summary, worst) = best_of(args.repeat, report, budget)
+
+        for position in range(len(lines)):
+            expected = reference_margin(lines.drop_m[position], lines.feeder_m[position], lines.ratio[position])
+            if abs(expected - budget.margin_db[position]) > 1e-9:
+                raise SystemExit(f"line {lines.line_id[position]}: margin {budget.margin_db[position]} != {expected}")
+
+        print(f"{len(lines):,} lines, {summary['below_margin']:,} below {summary['min_margin_threshold_db']} dB margin "
+              f"(min {summary['min_margin_db']} dB, median {summary['median_margin_db']} dB)")
+        print(f"  load      {load_s * 1000:>8.1f} ms")
+        print(f"  evaluate  {evaluate_s * 1000:>8.1f} ms")
+        print(f"  report    {report_s * 1000:>8.1f} ms  ({len(worst)} worst lines)")
+        print(f"  compute   {(evaluate_s + report_s) * 1000:>8.1f} ms  (evaluate + report)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
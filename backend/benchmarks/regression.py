@@ -0,0 +1,405 @@
+"""
+Endpoint benchmark and performance regression check.
+
+For each scale, a synthetic plant is generated into a SQLite file
+(synthetic_data.py, cached per scale and seed). Each run works on a fresh
+copy of that file: it starts the API on the copy under uvicorn and exercises
+every route of the assets, customers, network-hierarchy and topology
+routers. Reads run with --concurrency clients. Writes run one at a time and
+use rows the run created itself.
+
+For every route the harness reports:
+  - p50/p95/p99 latency and throughput;
+  - SQL statements per request, taken from the app's own /metrics.
+
+Results are compared with a stored baseline. A route regresses when:
+  - its p95 grows by more than --threshold (and by more than --min-ms,
+    which keeps timer noise out), or
+  - it runs more SQL statements per request than the baseline did.
+Any regression makes the run exit with status 1.
+
+Latency depends on the machine, so record the baseline on the machine that
+runs the check. Run from the backend directory:
+    python -m benchmarks.regression --save-baseline
+    python -m benchmarks.regression
+    python -m benchmarks.regression --scales small medium large --threshold 0.3
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "nim-bench")
+
+# synthetic_data.py arguments per scale (8 splitters x 32 ports per FDH, 75% filled)
+SCALES = {
+    "small": {"headends": 1, "fdhs_per_headend": 4},     # ~800 customers
+    "medium": {"headends": 4, "fdhs_per_headend": 25},   # ~20k customers
+    "large": {"headends": 10, "fdhs_per_headend": 50},   # ~100k customers
+}
+
+BULK_ASSIGN_SIZE = 5
+
+
+@dataclass
+class Route:
+    method: str
+    template: str # The route path as /metrics labels it
+    request: Callable[[int], tuple[str, object]] # iteration -> (path, JSON body)
+    write: bool = False
+    keep: Callable[[int, httpx.Response], None] | None = None
+    share: float = 1.0 # Fraction of the usual iteration count
+
+    @property
+    def label(self) -> str:
+        return f"{self.method} {self.template}"
+
+
+# --- Data ---
+
+def seed_database(scale: str, seed: int, data_dir: str) -> str:
+    """Path to the pristine database for a scale, generating it on first use"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"bench_{scale}_{seed}.db")
+    if not os.path.exists(path):
+        print(f"Generating {scale} dataset (seed {seed}) ...", flush=True)
+        options = SCALES[scale]
+        partial = path + ".partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        subprocess.run(
+            [sys.executable, "synthetic_data.py", "--seed", str(seed),
+             "--headends", str(options["headends"]), "--fdhs-per-headend", str(options["fdhs_per_headend"])],
+            cwd=BACKEND_DIR, env=dict(os.environ, DATABASE_URL=f"sqlite:///{partial}"),
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        os.replace(partial, path)
+    return path
+
+
+def load_fixtures(db_file: str, seed: int) -> dict:
+    """IDs and values of existing rows for the read routes to ask for"""
+    rng = random.Random(seed)
+    con = sqlite3.connect(db_file)
+    try:
+        def column(sql):
+            return [row[0] for row in con.execute(sql)]
+
+        def sample(values, n=500):
+            return rng.sample(values, min(n, len(values))) if values else []
+
+        return {
+            "customer_ids": sample(column("SELECT customer_id FROM Customer WHERE splitter_id IS NOT NULL")),
+            "asset_ids": sample(column("SELECT asset_id FROM Asset")),
+            "serials": sample(column(
+                "SELECT a.serial_number FROM Asset a JOIN AssignedAssets aa ON aa.asset_id = a.asset_id"
+            )),
+            "fdh_ids": column("SELECT fdh_id FROM FDH"),
+            "splitter_ids": sample(column("SELECT splitter_id FROM Splitter")),
+            "regions": column("SELECT DISTINCT region FROM FDH WHERE region IS NOT NULL"),
+        }
+    finally:
+        con.close()
+
+
+def build_routes(fx: dict, run_id: str) -> list[Route]:
+    """Every route under test, writes before the reads and writes that use what they create"""
+    created = {"assets": [], "customers": [], "headends": [], "fdhs": [], "splitters": [], "assigned": []}
+
+    def pick(values, i):
+        return values[i % len(values)]
+
+    def keep(kind, key):
+        return lambda i, response: created[kind].append(response.json()[key])
+
+    def keep_assignment(i, response):
+        body = response.json()
+        created["assigned"].append((body["splitter_id"], body["customer_id"]))
+
+    assets = "/api/inventory-assets"
+    customers = "/api/customers"
+    hierarchy = "/api/network-hierarchy"
+    topology = "/api/topology"
+    return [
+        # --- Assets ---
+        Route("POST", f"{assets}/", lambda i: (f"{assets}/", {
+            "asset_type": "ONT", "model": "Bench", "serial_number": f"BENCH-{run_id}-{i}", "location": "Warehouse A",
+        }), write=True, keep=keep("assets", "asset_id")),
+        Route("POST", f"{assets}/bulk", lambda i: (f"{assets}/bulk", [
+            {"asset_type": "Router", "model": "Bench", "serial_number": f"BULK-{run_id}-{i}-{j}"} for j in range(100)
+        ]), write=True, share=0.2),
+        Route("GET", f"{assets}/", lambda i: (f"{assets}/?limit=100&asset_type=ONT", None)),
+        Route("GET", f"{assets}/search", lambda i: (f"{assets}/search?q={pick(fx['serials'], i)[-6:]}", None)),
+        Route("GET", f"{assets}/{{asset_id}}", lambda i: (f"{assets}/{pick(fx['asset_ids'], i)}", None)),
+        Route("PUT", f"{assets}/{{asset_id}}", lambda i: (
+            f"{assets}/{pick(created['assets'], i)}", {"location": f"Tech Van {i % 12 + 1}"}
+        ), write=True),
+        Route("DELETE", f"{assets}/{{asset_id}}", lambda i: (f"{assets}/{pick(created['assets'], i)}", None), write=True),
+
+        # --- Customers ---
+        Route("POST", f"{customers}/", lambda i: (f"{customers}/", {
+            "name": f"Bench {run_id} {i}", "address": f"{i} Bench St", "plan": "1 GIG Fiber",
+        }), write=True, keep=keep("customers", "customer_id")),
+        Route("GET", f"{customers}/", lambda i: (f"{customers}/?limit=100", None)),
+        Route("GET", f"{customers}/{{customer_id}}", lambda i: (f"{customers}/{pick(fx['customer_ids'], i)}", None)),
+
+        # --- Network hierarchy ---
+        Route("POST", f"{hierarchy}/headends", lambda i: (f"{hierarchy}/headends", {
+            "name": f"BENCH-HE-{run_id}-{i}", "location": "Bench",
+        }), write=True, keep=keep("headends", "headend_id"), share=0.2),
+        Route("GET", f"{hierarchy}/headends", lambda i: (f"{hierarchy}/headends", None)),
+        Route("POST", f"{hierarchy}/fdhs", lambda i: (f"{hierarchy}/fdhs", {
+            "name": f"BENCH-FDH-{run_id}-{i}", "location": "Bench", "region": "Bench",
+            "headend_id": pick(created["headends"], i), "max_ports": 256,
+        }), write=True, keep=keep("fdhs", "fdh_id"), share=0.2),
+        Route("GET", f"{hierarchy}/fdhs", lambda i: (f"{hierarchy}/fdhs", None)),
+        Route("PUT", f"{hierarchy}/fdhs/{{fdh_id}}", lambda i: (
+            f"{hierarchy}/fdhs/{pick(created['fdhs'], i)}", {"location": f"Bench {i}"}
+        ), write=True),
+        Route("POST", f"{hierarchy}/splitters", lambda i: (f"{hierarchy}/splitters", {
+            "model": "1:32", "port_capacity": 32, "location": f"Slot {i}", "fdh_id": pick(created["fdhs"], i),
+        }), write=True, keep=keep("splitters", "splitter_id")),
+        Route("GET", f"{hierarchy}/splitters", lambda i: (f"{hierarchy}/splitters", None)),
+        Route("PUT", f"{hierarchy}/splitters/{{splitter_id}}", lambda i: (
+            f"{hierarchy}/splitters/{pick(created['splitters'], i)}", {"location": f"Slot {i}, Shelf 2"}
+        ), write=True),
+        Route("GET", f"{hierarchy}/splitters/{{splitter_id}}/ports", lambda i: (
+            f"{hierarchy}/splitters/{pick(fx['splitter_ids'], i)}/ports", None
+        )),
+        Route("POST", f"{hierarchy}/splitters/{{splitter_id}}/assignments", lambda i: (
+            f"{hierarchy}/splitters/{pick(created['splitters'], i)}/assignments",
+            {"customer_id": created["customers"][i]},
+        ), write=True, keep=keep_assignment),
+        Route("DELETE", f"{hierarchy}/splitters/{{splitter_id}}/assignments/{{customer_id}}", lambda i: (
+            "{}/splitters/{}/assignments/{}".format(hierarchy, *created["assigned"][i]), None
+        ), write=True),
+        Route("POST", f"{hierarchy}/fdhs/{{fdh_id}}/assignments", lambda i: (
+            f"{hierarchy}/fdhs/{pick(created['fdhs'], i)}/assignments",
+            {"customer_ids": created["customers"][i * BULK_ASSIGN_SIZE:(i + 1) * BULK_ASSIGN_SIZE]},
+        ), write=True, share=1 / BULK_ASSIGN_SIZE),
+        Route("GET", f"{hierarchy}/capacity", lambda i: (f"{hierarchy}/capacity?level=fdh", None)),
+        Route("GET", f"{hierarchy}/capacity/{{level}}/{{key}}", lambda i: (
+            f"{hierarchy}/capacity/fdh/{pick(fx['fdh_ids'], i)}" if i % 2
+            else f"{hierarchy}/capacity/region/{pick(fx['regions'], i)}", None
+        )),
+
+        # --- Topology ---
+        Route("GET", f"{topology}/customer/{{customer_id}}", lambda i: (
+            f"{topology}/customer/{pick(fx['customer_ids'], i)}", None
+        )),
+        Route("POST", f"{topology}/customers", lambda i: (f"{topology}/customers", {
+            "customer_ids": [pick(fx["customer_ids"], i + j) for j in range(100)],
+        })),
+        Route("GET", f"{topology}/fdh/{{fdh_id}}", lambda i: (f"{topology}/fdh/{pick(fx['fdh_ids'], i)}", None)),
+        Route("GET", f"{topology}/search", lambda i: (f"{topology}/search?serial={pick(fx['serials'], i)}", None)),
+    ]
+
+
+# --- Measuring ---
+
+_METRIC_LINE = re.compile(r'^db_statements_per_request_(sum|count)\{method="([^"]+)",route="([^"]+)"\} (\S+)$')
+
+async def statement_totals(client: httpx.AsyncClient) -> dict:
+    """(method, route) -> [statement sum, request count] from the app's /metrics"""
+    totals = {}
+    for line in (await client.get("/metrics")).text.splitlines():
+        match = _METRIC_LINE.match(line)
+        if match:
+            kind, method, route, value = match.groups()
+            totals.setdefault(f"{method} {route}", [0.0, 0.0])[kind == "count"] = float(value)
+    return totals
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    return sorted_values[max(0, math.ceil(p * len(sorted_values)) - 1)]
+
+
+async def measure(client: httpx.AsyncClient, route: Route, iterations: int, concurrency: int) -> dict:
+    latencies = []
+
+    async def call(i: int):
+        path, body = route.request(i)
+        start = time.perf_counter()
+        response = await client.request(route.method, path, json=body)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{route.label} ({path}) -> {response.status_code}: {response.text[:200]}")
+        if route.keep:
+            route.keep(i, response)
+
+    before = await statement_totals(client)
+    start = time.perf_counter()
+    if route.write:
+        # One at a time: SQLite has a single writer, and later writes use earlier results
+        for i in range(iterations):
+            await call(i)
+    else:
+        counter = iter(range(iterations))
+
+        async def worker():
+            for i in counter:
+                await call(i)
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    after = await statement_totals(client)
+
+    statements, count = after.get(route.label, [0.0, 0.0])
+    statements -= before.get(route.label, [0.0, 0.0])[0]
+    count -= before.get(route.label, [0.0, 0.0])[1]
+    latencies.sort()
+    return {
+        "requests": iterations,
+        "rps": iterations / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "statements": statements / count if count else None,
+    }
+
+
+async def wait_until_up(client: httpx.AsyncClient, server: subprocess.Popen):
+    for _ in range(300):
+        if server.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def bench_scale(db_file: str, seed: int, requests: int, write_requests: int, concurrency: int) -> dict:
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_file}", AUTH_REQUIRED="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+            await wait_until_up(client, server)
+            routes = build_routes(load_fixtures(db_file, seed), run_id=f"{seed}-{int(time.time())}")
+            results = {}
+            for route in routes:
+                if not route.write:
+                    # Warm caches (graph index, statement cache) before timing
+                    for i in range(min(5, requests)):
+                        path, body = route.request(i)
+                        await client.request(route.method, path, json=body)
+                iterations = max(1, int((write_requests if route.write else requests) * route.share))
+                results[route.label] = await measure(client, route, iterations, concurrency)
+            return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+# --- Reporting ---
+
+def compare(scale: str, results: dict, baseline: dict, threshold: float, min_ms: float) -> list[str]:
+    """Regression messages for routes that got slower or chattier than the baseline"""
+    problems = []
+    for label, current in results.items():
+        previous = baseline.get(label)
+        if not previous:
+            continue
+        slower = current["p95_ms"] - previous["p95_ms"]
+        if slower > min_ms and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            problems.append(f"{scale} {label}: p95 {previous['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+        if current["statements"] is not None and previous.get("statements") is not None \
+                and current["statements"] > previous["statements"] + 0.5:
+            problems.append(f"{scale} {label}: SQL statements/request {previous['statements']:.1f} -> {current['statements']:.1f}")
+    return problems
+
+
+def print_table(scale: str, results: dict, baseline: dict):
+    print(f"\n[{scale}]")
+    print(f"{'route':<80} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'SQL/req':>8} {'p95 vs base':>12}")
+    for label, r in results.items():
+        previous = baseline.get(label)
+        change = f"{(r['p95_ms'] / previous['p95_ms'] - 1) * 100:+.0f}%" if previous and previous["p95_ms"] else "-"
+        statements = f"{r['statements']:.1f}" if r["statements"] is not None else "-"
+        print(f"{label:<80} {r['rps']:>8.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{statements:>8} {change:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["small", "medium"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=200, help="requests per read route")
+    parser.add_argument("--write-requests", type=int, default=50, help="requests per write route")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients for read routes")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p95 growth, as a fraction")
+    parser.add_argument("--min-ms", type=float, default=2.0, help="ignore p95 growth smaller than this")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where generated datasets are cached")
+    args = parser.parse_args()
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+
+    problems = []
+    for scale in args.scales:
+        pristine = seed_database(scale, args.seed, args.data_dir)
+        work_dir = tempfile.mkdtemp(prefix="nim-bench-")
+        try:
+            db_file = os.path.join(work_dir, "bench.db")
+            shutil.copyfile(pristine, db_file)
+            results = asyncio.run(bench_scale(db_file, args.seed, args.requests, args.write_requests, args.concurrency))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        baseline = stored.get("scales", {}).get(scale, {})
+        print_table(scale, results, {} if args.save_baseline else baseline)
+        if args.save_baseline:
+            stored.setdefault("scales", {})[scale] = results
+        else:
+            problems += compare(scale, results, baseline, args.threshold, args.min_ms)
+
+    if args.save_baseline:
+        stored["settings"] = {"seed": args.seed, "requests": args.requests,
+                              "write_requests": args.write_requests, "concurrency": args.concurrency}
+        with open(args.baseline, "w") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+    elif not stored:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+    elif problems:
+        print("\nREGRESSIONS:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    else:
+        print(f"\nNo regressions (threshold {args.threshold:.0%}, min {args.min_ms} ms).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Validated ORM responses vs the plain-row fast path, for large lists.
+
+For each size, seeds a throwaway SQLite database with that many customers,
+assets and splitters (spread over FDHs), then times both ways of producing
+the response body:
+  current: crud returns ORM objects, which are validated against the
+           response schema (from_attributes), dumped and encoded with the
+           stdlib json module, as FastAPI does with response_model
+  fast:    crud selects just the schema's columns as dicts (plain=True),
+           encoded with orjson (fast_json.fast_json)
+Both bodies are decoded and compared, so a speedup never hides a
+difference in output.
+
+Run from the backend directory:
+    python -m benchmarks.serialization [--sizes 10000 100000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench_serialization.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import delete, insert
+
+import crud
+import models
+import schemas
+from database import SessionLocal, engine
+from fast_json import fast_json
+
+SPLITTERS_PER_FDH = 8
+
+CASES = [
+    # label, crud call, response schema
+    ("customers", lambda db, n, plain: crud.get_customers(db, limit=n, plain=plain), schemas.CustomerPage),
+    ("assets", lambda db, n, plain: crud.get_assets(db, limit=n, plain=plain), schemas.AssetPage),
+    ("fdhs (nested)", lambda db, n, plain: crud.get_fdhs(db, plain=plain), List[schemas.FDH]),
+]
+
+
+def seed(db, size: int):
+    for model in (models.Customer, models.Splitter, models.FDH, models.Headend, models.Asset):
+        db.execute(delete(model))
+    db.execute(insert(models.Headend), [{"headend_id": 1, "name": "BENCH-HE"}])
+    fdh_count = max(1, size // (SPLITTERS_PER_FDH * 32))
+    db.execute(insert(models.FDH), [
+        {"fdh_id": i + 1, "name": f"BENCH-FDH-{i}", "location": "Bench", "region": "Bench", "headend_id": 1}
+        for i in range(fdh_count)
+    ])
+    db.execute(insert(models.Splitter), [
+        {"model": "1:32", "port_capacity": 32, "used_ports": 0, "location": f"Slot {i}", "fdh_id": i % fdh_count + 1}
+        for i in range(fdh_count * SPLITTERS_PER_FDH)
+    ])
+    db.execute(insert(models.Customer), [
+        {"name": f"Bench {i}", "address": f"{i} Bench Street", "plan": "1G", "neighborhood": "Bench", "status": "Active"}
+        for i in range(size)
+    ])
+    db.execute(insert(models.Asset), [
+        {"asset_type": "ONT", "model": "M-100", "serial_number": f"BENCH{i:08d}", "location": "Warehouse A"}
+        for i in range(size)
+    ])
+    db.commit()
+
+
+def current_path(db, call, schema, size: int) -> bytes:
+    adapter = TypeAdapter(schema)
+    content = adapter.dump_python(adapter.validate_python(call(db, size, False), from_attributes=True), mode="json")
+    # What fastapi.responses.JSONResponse.render does
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(db, call, schema, size: int) -> bytes:
+    return fast_json(call(db, size, True)).body
+
+
+def best_of(repeat: int, fn, *args):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            result = fn(db, *args)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            db.close()
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    print(f"{'rows':>8} {'endpoint':<14} {'current ms':>11} {'fast ms':>9} {'speedup':>8} {'body KB':>8}")
+    for size in args.sizes:
+        db = SessionLocal()
+        try:
+            seed(db, size)
+        finally:
+            db.close()
+        for label, call, schema in CASES:
+            current_s, current_body = best_of(args.repeat, current_path, call, schema, size)
+            fast_s, fast_body = best_of(args.repeat, fast_path, call, schema, size)
+            if json.loads(current_body) != json.loads(fast_body):
+                raise SystemExit(f"{label}: fast path output differs from the validated response")
+            print(f"{size:>8} {label:<14} {current_s * 1000:>11.1f} {fast_s * 1000:>9.1f} "
+                  f"{current_s / fast_s:>7.1f}x {len(fast_body) / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
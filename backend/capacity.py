@@ -0,0 +1,182 @@
+"""
+Capacity roll-ups: splitter ports and FDH max_ports totalled per FDH, region and headend.
+
+Utilization used to mean aggregating every Splitter under a node on each
+request. CapacityRollup instead holds one row per FDH, region and headend
+with running totals (splitters, port capacity, used ports, max_ports), and
+the hierarchy and port-allocation writes in crud adjust those totals in the
+same transaction as the change itself. Reading a node is a primary key
+lookup, however many splitters sit under it.
+
+Totals change by UPDATE ... SET x = x + delta, so concurrent writers add up
+instead of overwriting each other. A node's row is created by its first
+write with INSERT ... ON CONFLICT DO NOTHING (INSERT IGNORE on MySQL), so
+two first writes to a new region or headend don't collide. migrations.py
+fills the table when it creates it. To repair it (this also recounts every
+splitter's used_ports from its customers), run:
+    python capacity.py --rebuild
+"""
+from sqlalchemy import select, delete, insert, update, func, or_, and_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+import models
+
+TOTALS = ("splitter_count", "port_capacity", "used_ports", "max_ports")
+
+def node_keys(fdh_id: int, region: str | None, headend_id: int | None) -> list[tuple[str, str]]:
+    """The (level, key) roll-up rows an FDH contributes to"""
+    keys = [("fdh", str(fdh_id))]
+    if region:
+        keys.append(("region", region))
+    if headend_id is not None:
+        keys.append(("headend", str(headend_id)))
+    return keys
+
+def fdh_keys(fdh) -> list[tuple[str, str]]:
+    return node_keys(fdh.fdh_id, fdh.region, fdh.headend_id)
+
+def summary(row) -> dict:
+    """A roll-up row as the API returns it, with utilization worked out"""
+    values = {"level": row.level, "key": row.key, **{name: getattr(row, name) for name in TOTALS}}
+    values["utilization"] = row.used_ports / row.port_capacity if row.port_capacity else 0.0
+    return values
+
+def _match(keys):
+    rollup = models.CapacityRollup
+    return or_(*(and_(rollup.level == level, rollup.key == key) for level, key in keys))
+
+def _existing_keys(db: Session, keys) -> set[tuple[str, str]]:
+    rollup = models.CapacityRollup
+    return set(db.execute(select(rollup.level, rollup.key).where(_match(keys))).tuples())
+
+def _insert_missing(db: Session):
+    """INSERT that skips rows already there, e.g. created by a concurrent first write to the same node"""
+    rollup = models.CapacityRollup
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert(rollup).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        return postgresql_insert(rollup).on_conflict_do_nothing()
+    if dialect in ("mysql", "mariadb"):
+        return insert(rollup).prefix_with("IGNORE")
+    return insert(rollup)
+
+def _ensure_rows(db: Session, keys):
+    # Another transaction can create a missing row between the SELECT and
+    # the INSERT; the INSERT then skips it and adjust's UPDATE adds to it
+    existing = _existing_keys(db, keys)
+    missing = [key for key in keys if key not in existing]
+    if missing:
+        db.execute(_insert_missing(db), [
+            {"level": level, "key": key, **dict.fromkeys(TOTALS, 0)} for level, key in missing
+        ])
+
+def adjust(db: Session, keys, **deltas):
+    """Add deltas (splitter_count=, port_capacity=, used_ports=, max_ports=) to the given rows"""
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not keys or not deltas:
+        return
+    _ensure_rows(db, keys)
+    rollup = models.CapacityRollup
+    db.execute(
+        update(rollup)
+        .where(_match(keys))
+        .values({name: getattr(rollup, name) + value for name, value in deltas.items()})
+        .execution_options(synchronize_session=False)
+    )
+
+def add_fdh(db: Session, fdh):
+    """Start totals for a new FDH (it must already have its ID, i.e. be flushed)"""
+    keys = fdh_keys(fdh)
+    _ensure_rows(db, keys)
+    adjust(db, keys, max_ports=fdh.max_ports or 0)
+
+def move_fdh(db: Session, fdh, old_region: str | None, old_headend_id: int | None, old_max_ports: int | None):
+    """Carry an FDH's totals over after its region, headend or max_ports changed"""
+    old_keys = node_keys(fdh.fdh_id, old_region, old_headend_id)
+    new_keys = fdh_keys(fdh)
+    max_ports_delta = (fdh.max_ports or 0) - (old_max_ports or 0)
+    if old_keys == new_keys:
+        adjust(db, new_keys, max_ports=max_ports_delta)
+        return
+
+    rollup = models.CapacityRollup
+    row = db.execute(
+        select(*(getattr(rollup, name) for name in TOTALS))
+        .where(_match(old_keys[:1]))
+        .with_for_update()
+    ).mappings().first()
+    totals = dict(row) if row else dict.fromkeys(TOTALS, 0)
+    totals["max_ports"] = old_max_ports or 0
+    adjust(db, old_keys[1:], **{name: -value for name, value in totals.items()})
+    totals["max_ports"] = fdh.max_ports or 0
+    adjust(db, new_keys[1:], **totals)
+    adjust(db, new_keys[:1], max_ports=max_ports_delta)
+
+def rebuild(db: Session):
+    """Recompute every roll-up row (and Splitter.used_ports) from the hierarchy tables"""
+    splitter, customer, fdh = models.Splitter, models.Customer, models.FDH
+
+    # used_ports from real occupancy; the port bitmap is rebuilt from the
+    # customers the next time a port is allocated on each splitter
+    occupied = (
+        select(func.count())
+        .where(customer.splitter_id == splitter.splitter_id, customer.assigned_port.isnot(None))
+        .correlate(splitter)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(splitter).values(used_ports=occupied, port_map=None)
+        .execution_options(synchronize_session=False)
+    )
+
+    per_fdh = db.execute(
+        select(
+            fdh.fdh_id, fdh.region, fdh.headend_id, fdh.max_ports,
+            func.count(splitter.splitter_id),
+            func.coalesce(func.sum(splitter.port_capacity), 0),
+            func.coalesce(func.sum(splitter.used_ports), 0),
+        )
+        .outerjoin(splitter, splitter.fdh_id == fdh.fdh_id)
+        .group_by(fdh.fdh_id, fdh.region, fdh.headend_id, fdh.max_ports)
+    ).all()
+
+    rows = {}
+    for fdh_id, region, headend_id, max_ports, splitters, port_capacity, used_ports in per_fdh:
+        for key in node_keys(fdh_id, region, headend_id):
+            totals = rows.setdefault(key, dict.fromkeys(TOTALS, 0))
+            totals["splitter_count"] += splitters
+            totals["port_capacity"] += int(port_capacity)
+            totals["used_ports"] += int(used_ports)
+            totals["max_ports"] += max_ports or 0
+
+    db.execute(delete(models.CapacityRollup))
+    if rows:
+        db.execute(insert(models.CapacityRollup), [
+            {"level": level, "key": key, **totals} for (level, key), totals in rows.items()
+        ])
+    db.commit()
+
+
+if __name__ == "__main__":
+    import argparse
+    import hierarchy_version
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the capacity roll-up table")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every roll-up from the hierarchy tables")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        db = SessionLocal()
+        try:
+            rebuild(db)
+            # used_ports may have changed: invalidate the hierarchy ETags
+            hierarchy_version.bump(db)
+            db.commit()
+        finally:
+            db.close()
+        print("Capacity roll-ups rebuilt.")
+    else:
+        parser.print_help()
@@ -1,11 +1,131 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload, joinedload
+from sqlalchemy import func, select, insert, or_, and_
+from sqlalchemy.exc import SQLAlchemyError
 import models, schemas
+import graph_index
+import ancestry
+import asset_search
+import audit
+import capacity
+import dispatch
+import events
+import hierarchy_version
 from passlib.context import CryptContext
 from fastapi import HTTPException
+from pydantic import ValidationError
+import base64
+import datetime
+import heapq
+import json
+import os
+import threading
+import time
+
+# --- Pagination ---
+
+def encode_cursor(last_id: int, **keys) -> str:
+    """Build an opaque cursor pointing just past the given primary key (plus any other sort keys)"""
+    raw = json.dumps({"after": last_id, **keys}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor_keys(cursor: str) -> dict:
+    """Decode everything encode_cursor() put into a cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        keys = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(keys.get("after"), int):
+            raise ValueError
+        return keys
+    except (ValueError, AttributeError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def decode_cursor(cursor: str) -> int:
+    """Turn a cursor from encode_cursor() back into the last-seen primary key"""
+    return decode_cursor_keys(cursor)["after"]
+
+def paginate(query, pk_column, cursor: str | None, limit: int):
+    """
+    Keyset pagination over a query, ordered by its primary key.
+    Fetches one extra row to find out whether another page exists, so
+    every page costs the same index range scan no matter how deep it is.
+    """
+    if cursor:
+        query = query.filter(pk_column > decode_cursor(cursor))
+    rows = query.order_by(pk_column).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], pk_column.key))
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+# --- Plain rows (fast serialization path) ---
+# With plain=True the list functions select only the columns their response
+# schema has and return dicts, which routes send through fast_json.fast_json
+# without per-object validation.
+
+def schema_columns(model, schema) -> list:
+    """The model's columns that the response schema has fields for"""
+    table_columns = model.__table__.columns
+    return [getattr(model, name) for name in schema.model_fields if name in table_columns]
+
+def _plain_rows(rows) -> list[dict]:
+    return [row._asdict() for row in rows]
+
+def _plain_fdhs(db: Session) -> list[dict]:
+    # Two flat queries, joined up in Python
+    fdhs = _plain_rows(db.query(*schema_columns(models.FDH, schemas.FDH)).order_by(models.FDH.fdh_id))
+    splitters_by_fdh = {}
+    splitters = db.query(*schema_columns(models.Splitter, schemas.Splitter)).order_by(models.Splitter.splitter_id)
+    for splitter in _plain_rows(splitters):
+        splitters_by_fdh.setdefault(splitter["fdh_id"], []).append(splitter)
+    for fdh in fdhs:
+        fdh["splitters"] = splitters_by_fdh.get(fdh["fdh_id"], [])
+    return fdhs
+
+
+# --- Change events ---
+# Write functions publish their events (see events.py) once the commit has
+# succeeded. Where the rows would need reloading after the commit (e.g. the
+# splitters of a port allocation), the events are built just before it.
+
+def _asset_event(action: str, asset):
+    return f"asset.{action}", events.plain(asset, schemas.Asset), ["assets"]
+
+def _headend_event(action: str, headend):
+    return f"headend.{action}", events.plain(headend, schemas.Headend), ["hierarchy"]
+
+def _fdh_event(action: str, fdh):
+    return f"fdh.{action}", events.plain(fdh, schemas.FDH), ["hierarchy", f"fdh:{fdh.fdh_id}"]
+
+def _splitter_event(action: str, splitter, old_fdh_id: int | None = None):
+    topics = ["hierarchy", f"splitter:{splitter.splitter_id}"]
+    topics += [f"fdh:{fdh_id}" for fdh_id in (splitter.fdh_id, old_fdh_id) if fdh_id is not None]
+    return f"splitter.{action}", events.plain(splitter, schemas.Splitter), topics
+
+def _customer_event(action: str, customer, splitter=None):
+    """The customer was created, or connected to or released from `splitter`"""
+    topics = [f"customer:{customer.customer_id}"]
+    if splitter is not None:
+        topics.append(f"splitter:{splitter.splitter_id}")
+        if splitter.fdh_id is not None:
+            topics.append(f"fdh:{splitter.fdh_id}")
+    return f"customer.{action}", events.plain(customer, schemas.Customer), topics
+
 
 # --- User / Auth ---
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Argon2id at the OWASP baseline (19 MiB, 2 passes) by default: enough to
+# slow down offline guessing without making each login cost 100+ ms of CPU.
+# Hashes made with other parameters are upgraded on the next login.
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__memory_cost=int(os.getenv("ARGON2_MEMORY_COST", "19456")), # KiB
+    argon2__time_cost=int(os.getenv("ARGON2_TIME_COST", "2")),
+    argon2__parallelism=int(os.getenv("ARGON2_PARALLELISM", "1")),
+)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
@@ -16,6 +136,21 @@ def verify_password(plain_password, hashed_password):
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
+def record_login(db: Session, user_id: int, new_password_hash: str | None = None):
+    """Stamp last_login (and store an upgraded password hash, if verification produced one)"""
+    db_user = db.get(models.User, user_id)
+    db_user.last_login = datetime.datetime.utcnow()
+    if new_password_hash:
+        db_user.password_hash = new_password_hash
+    audit.record(db, audit.AuditEvent(
+        action_type="Login",
+        entity_type="User",
+        entity_id=db_user.user_id,
+        label=db_user.username,
+        user_id=db_user.user_id
+    ), atomic=True)
+    db.commit()
+
 
 # --- Asset CRUD ---
 
@@ -27,10 +162,89 @@ def create_asset(db: Session, asset: schemas.AssetCreate):
     
     new_asset = models.Asset(**asset.model_dump())
     db.add(new_asset)
+    db.flush()
+    asset_search.index_assets(db, [new_asset])
     db.commit()
     db.refresh(new_asset)
+    invalidate_stats()
+    events.publish(*_asset_event("created", new_asset))
     return new_asset
 
+def bulk_create_assets(db: Session, rows: list[dict], batch_size: int = 500):
+    """
+    Import many assets at once. Each batch does one SELECT ... IN for
+    duplicate serials, one multi-row INSERT and one commit, instead of
+    four round trips per asset. A failing batch is rolled back on its own
+    and every row in it is reported as rejected.
+    """
+    report = []
+    seen_serials = set()
+    valid = []  # (row_number, AssetCreate)
+
+    for row_number, raw in enumerate(rows, start=1):
+        try:
+            asset = schemas.AssetCreate.model_validate(raw)
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            serial = raw.get("serial_number") if isinstance(raw, dict) else None
+            report.append(schemas.AssetImportRow(row=row_number, serial_number=serial, accepted=False, error=error))
+            continue
+        if asset.serial_number in seen_serials:
+            report.append(schemas.AssetImportRow(
+                row=row_number, serial_number=asset.serial_number, accepted=False,
+                error="Duplicate serial number in this import"
+            ))
+            continue
+        seen_serials.add(asset.serial_number)
+        valid.append((row_number, asset))
+
+    for start in range(0, len(valid), batch_size):
+        batch = valid[start:start + batch_size]
+        serials = [asset.serial_number for _, asset in batch]
+        existing = set(db.scalars(
+            select(models.Asset.serial_number).where(models.Asset.serial_number.in_(serials))
+        ))
+
+        to_insert = []
+        batch_report = []
+        for row_number, asset in batch:
+            if asset.serial_number in existing:
+                report.append(schemas.AssetImportRow(
+                    row=row_number, serial_number=asset.serial_number, accepted=False,
+                    error="Asset with this serial number already exists"
+                ))
+                continue
+            to_insert.append(asset.model_dump())
+            batch_report.append(schemas.AssetImportRow(
+                row=row_number, serial_number=asset.serial_number, accepted=True
+            ))
+
+        if not to_insert:
+            continue
+        try:
+            db.execute(insert(models.Asset), to_insert)
+            # Read the new IDs back (no RETURNING on MySQL) to index them
+            inserted = db.execute(
+                select(models.Asset.asset_id, *(getattr(models.Asset, f) for f in asset_search.SEARCH_FIELDS))
+                .where(models.Asset.serial_number.in_([row["serial_number"] for row in to_insert]))
+            ).all()
+            asset_search.index_assets(db, inserted)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            for item in batch_report:
+                item.accepted = False
+                item.error = f"Batch rolled back: {e.__class__.__name__}"
+        report.extend(batch_report)
+
+    invalidate_stats()
+    report.sort(key=lambda item: item.row)
+    accepted = sum(1 for item in report if item.accepted)
+    if accepted:
+        # One event for the whole import; clients reload their page of assets
+        events.publish("asset.imported", {"accepted": accepted}, ["assets"])
+    return schemas.AssetImportReport(accepted=accepted, rejected=len(report) - accepted, rows=report)
+
 def get_asset_by_id(db: Session, asset_id: int):
     """Get a single asset by its ID"""
     return db.query(models.Asset).filter(models.Asset.asset_id == asset_id).first()
@@ -41,20 +255,32 @@ def get_assets(db: Session,
              asset_type: schemas.AssetType | None = None, 
              status: schemas.AssetStatus | None = None, 
              location: str | None = None,  # Add this parameter
-             skip: int = 0, 
-             limit: int = 100):
-    """Get a list of assets with optional filters for type, status, and location"""
-    query = db.query(models.Asset)
+             cursor: str | None = None,
+             limit: int = 100,
+             plain: bool = False):
+    """Get a page of assets with optional filters for type, status, and location"""
+    query = db.query(*schema_columns(models.Asset, schemas.Asset)) if plain else db.query(models.Asset)
     
     if asset_type:
         query = query.filter(models.Asset.asset_type == asset_type)
     if status:
         query = query.filter(models.Asset.status == status)
     if location:  # Add this block
-        # Use .ilike() for case-insensitive partial matching
-        query = query.filter(models.Asset.location.ilike(f"%{location}%")) 
+        # Case-insensitive partial match, narrowed down by the trigram index
+        query = asset_search.filter_contains(query, models.Asset.location, location)
         
-    return query.offset(skip).limit(limit).all()
+    page = paginate(query, models.Asset.asset_id, cursor, limit)
+    if plain:
+        page["items"] = _plain_rows(page["items"])
+    return page
+
+
+def search_assets(db: Session, q: str,
+                  asset_type: schemas.AssetType | None = None,
+                  status: schemas.AssetStatus | None = None,
+                  limit: int = 50):
+    """Ranked partial-match search on serial number, model and location"""
+    return asset_search.search_assets(db, q, asset_type=asset_type, status=status, limit=limit)
 
 
 def update_asset(db: Session, asset_id: int, asset_update: schemas.AssetUpdate):
@@ -64,25 +290,28 @@ def update_asset(db: Session, asset_id: int, asset_update: schemas.AssetUpdate):
         raise HTTPException(status_code=404, detail="Asset not found")
 
     update_data = asset_update.model_dump(exclude_unset=True)
+    changes = audit.diff(db_asset, update_data)
     for key, value in update_data.items():
         setattr(db_asset, key, value)
     
     # --- AUDIT LOG ---
-    # Log the change
-    log_description = f"Updated asset {db_asset.serial_number}. "
-    log_description += f"Changes: {', '.join([f'{k}: {v}' for k, v in update_data.items()])}"
-    
-    audit_log = models.AuditLog(
+    audit.record(db, audit.AuditEvent(
         action_type="Asset Update",
-        description=log_description,
-        user_id=1 # Hardcoding to admin for now. We will fix this in the auth sprint.
-    )
-    db.add(audit_log)
+        entity_type="Asset",
+        entity_id=db_asset.asset_id,
+        label=db_asset.serial_number,
+        changes=changes
+    ))
     # --- END AUDIT LOG ---
 
+    if update_data.keys() & set(asset_search.SEARCH_FIELDS):
+        asset_search.index_assets(db, [db_asset])
+
     db.add(db_asset)
     db.commit()
     db.refresh(db_asset)
+    invalidate_stats()
+    events.publish(*_asset_event("updated", db_asset))
     return db_asset
 
 def delete_asset(db: Session, asset_id: int):
@@ -91,57 +320,120 @@ def delete_asset(db: Session, asset_id: int):
     if not db_asset:
         raise HTTPException(status_code=404, detail="Asset not found")
         
+    changes = audit.diff(db_asset, {"status": schemas.AssetStatus.Retired})
     db_asset.status = schemas.AssetStatus.Retired
     
     # Log this action
-    audit_log = models.AuditLog(
+    audit.record(db, audit.AuditEvent(
         action_type="Asset Retired",
-        description=f"Retired asset {db_asset.serial_number} (ID: {asset_id})",
-        user_id=1 # Hardcode admin user
-    )
-    db.add(audit_log)
+        entity_type="Asset",
+        entity_id=db_asset.asset_id,
+        label=db_asset.serial_number,
+        changes=changes
+    ))
 
     db.add(db_asset)
     db.commit()
     db.refresh(db_asset)
+    invalidate_stats()
+    events.publish(*_asset_event("updated", db_asset))
     return db_asset
 
 
 # --- Hierarchy CRUD ---
+# These writes and the port allocations below bump hierarchy_version just
+# before committing, which invalidates the hierarchy routes' ETags.
 
 def create_headend(db: Session, headend: schemas.HeadendCreate):
     new_headend = models.Headend(**headend.model_dump())
     db.add(new_headend)
+    hierarchy_version.bump(db)
     db.commit()
     db.refresh(new_headend)
+    graph_index.index.upsert_headend(new_headend)
+    events.publish(*_headend_event("created", new_headend))
     return new_headend
 
-def get_headends(db: Session):
-    return db.query(models.Headend).all()
+def get_headends(db: Session, plain: bool = False):
+    if plain:
+        headends = _plain_rows(
+            db.query(*schema_columns(models.Headend, schemas.Headend)).order_by(models.Headend.headend_id)
+        )
+        fdhs_by_headend = {}
+        for fdh in _plain_fdhs(db):
+            fdhs_by_headend.setdefault(fdh["headend_id"], []).append(fdh)
+        for headend in headends:
+            headend["fdhs"] = fdhs_by_headend.get(headend["headend_id"], [])
+        return headends
+
+    # Eager-load the nested tree the Headend schema serializes:
+    # 3 queries in total instead of 1 + one per headend + one per FDH
+    return (
+        db.query(models.Headend)
+        .options(selectinload(models.Headend.fdhs).selectinload(models.FDH.splitters))
+        .all()
+    )
 
 def create_fdh(db: Session, fdh: schemas.FDHCreate):
     new_fdh = models.FDH(**fdh.model_dump())
     db.add(new_fdh)
+    db.flush()
+    capacity.add_fdh(db, new_fdh)
+    hierarchy_version.bump(db)
     db.commit()
     db.refresh(new_fdh)
+    invalidate_stats()
+    graph_index.index.upsert_fdh(new_fdh)
+    events.publish(*_fdh_event("created", new_fdh))
     return new_fdh
 
-def get_fdhs(db: Session):
-    return db.query(models.FDH).all()
+def get_fdhs(db: Session, plain: bool = False):
+    if plain:
+        return _plain_fdhs(db)
+    return db.query(models.FDH).options(selectinload(models.FDH.splitters)).all()
 
 def create_splitter(db: Session, splitter: schemas.SplitterCreate):
     new_splitter = models.Splitter(**splitter.model_dump())
     db.add(new_splitter)
+    db_fdh = get_fdh_by_id(db, new_splitter.fdh_id)
+    if db_fdh:
+        capacity.adjust(db, capacity.fdh_keys(db_fdh), splitter_count=1, port_capacity=new_splitter.port_capacity)
+    hierarchy_version.bump(db)
     db.commit()
     db.refresh(new_splitter)
+    invalidate_stats()
+    graph_index.index.upsert_splitter(new_splitter)
+    events.publish(*_splitter_event("created", new_splitter))
     return new_splitter
 
-def get_splitters(db: Session):
+def get_splitters(db: Session, plain: bool = False):
+    if plain:
+        return _plain_rows(
+            db.query(*schema_columns(models.Splitter, schemas.Splitter)).order_by(models.Splitter.splitter_id)
+        )
     return db.query(models.Splitter).all()
 
 def get_fdh_by_id(db: Session, fdh_id: int):
     return db.query(models.FDH).filter(models.FDH.fdh_id == fdh_id).first()
 
+def get_fdh_tree(db: Session, fdh_id: int):
+    """
+    Load an FDH with its headend, splitters, their customers and the
+    customers' drop lines in a fixed number of queries (one per level),
+    however many splitters and ports the cabinet has.
+    """
+    return (
+        db.query(models.FDH)
+        .options(
+            joinedload(models.FDH.headend),
+            selectinload(models.FDH.splitters)
+            .selectinload(models.Splitter.customers)
+            .joinedload(models.Customer.drop_line),
+        )
+        .filter(models.FDH.fdh_id == fdh_id)
+        .first()
+    )
+
 def get_splitter_by_id(db: Session, splitter_id: int):
     return db.query(models.Splitter).filter(models.Splitter.splitter_id == splitter_id).first()
 
@@ -152,23 +444,30 @@ def update_fdh(db: Session, fdh_id: int, fdh_update: schemas.FDHUpdate):
         raise HTTPException(status_code=404, detail="FDH not found")
 
     update_data = fdh_update.model_dump(exclude_unset=True)
+    changes = audit.diff(db_fdh, update_data)
+    old_region, old_headend_id, old_max_ports = db_fdh.region, db_fdh.headend_id, db_fdh.max_ports
     for key, value in update_data.items():
         setattr(db_fdh, key, value)
+    capacity.move_fdh(db, db_fdh, old_region, old_headend_id, old_max_ports)
+    if db_fdh.headend_id != old_headend_id:
+        ancestry.move(db, "fdh", db_fdh.fdh_id)
     
     # --- AUDIT LOG ---
-    log_description = f"Updated FDH {db_fdh.name}. "
-    log_description += f"Changes: {', '.join([f'{k}: {v}' for k, v in update_data.items()])}"
-    audit_log = models.AuditLog(
+    audit.record(db, audit.AuditEvent(
         action_type="FDH Update",
-        description=log_description,
-        user_id=1 # Hardcoding admin user for now
-    )
-    db.add(audit_log)
+        entity_type="FDH",
+        entity_id=db_fdh.fdh_id,
+        label=db_fdh.name,
+        changes=changes
+    ))
     # --- END AUDIT LOG ---
 
     db.add(db_fdh)
+    hierarchy_version.bump(db)
     db.commit()
     db.refresh(db_fdh)
+    graph_index.index.upsert_fdh(db_fdh)
+    events.publish(*_fdh_event("updated", db_fdh))
     return db_fdh
 
 def update_splitter(db: Session, splitter_id: int, splitter_update: schemas.SplitterUpdate):
@@ -187,26 +486,278 @@ def update_splitter(db: Session, splitter_id: int, splitter_update: schemas.Spli
         )
     # --- End Business Rule Check ---
 
+    changes = audit.diff(db_splitter, update_data)
+    old_fdh_id = db_splitter.fdh_id
     for key, value in update_data.items():
         setattr(db_splitter, key, value)
+
+    if db_splitter.fdh_id != old_fdh_id:
+        # Only empty splitters can move, so just the splitter and its capacity change hands
+        for fdh_id, sign in ((old_fdh_id, -1), (db_splitter.fdh_id, 1)):
+            db_fdh = get_fdh_by_id(db, fdh_id) if fdh_id is not None else None
+            if db_fdh:
+                capacity.adjust(db, capacity.fdh_keys(db_fdh), splitter_count=sign, port_capacity=sign * db_splitter.port_capacity)
+        ancestry.move(db, "splitter", db_splitter.splitter_id)
     
     # --- AUDIT LOG ---
-    log_description = f"Updated Splitter {db_splitter.splitter_id}. "
-    log_description += f"Changes: {', '.join([f'{k}: {v}' for k, v in update_data.items()])}"
-    audit_log = models.AuditLog(
+    audit.record(db, audit.AuditEvent(
         action_type="Splitter Update",
-        description=log_description,
-        user_id=1 # Hardcoding admin user for now
-    )
-    db.add(audit_log)
+        entity_type="Splitter",
+        entity_id=db_splitter.splitter_id,
+        changes=changes
+    ))
     # --- END AUDIT LOG ---
 
     db.add(db_splitter)
+    hierarchy_version.bump(db)
     db.commit()
     db.refresh(db_splitter)
+    graph_index.index.upsert_splitter(db_splitter)
+    events.publish(*_splitter_event("updated", db_splitter, old_fdh_id))
     return db_splitter
     
 
+# --- Port Allocation ---
+# Each splitter keeps its occupied ports as a bitmap (Splitter.port_map,
+# bit 0 = port 1), so finding a free port is a couple of integer operations
+# instead of a scan of the splitter's customers. Allocations take row locks
+# (SELECT ... FOR UPDATE) on the splitters first and then the customers,
+# always in ID order, so concurrent planners queue up instead of handing out
+# the same port; the unique (splitter_id, assigned_port) constraint backs
+# this up at the database level.
+
+def _port_mask(db: Session, splitter: models.Splitter) -> int:
+    if splitter.port_map is not None:
+        return int.from_bytes(splitter.port_map, "little")
+    # Splitters that predate the bitmap: build it from their customers once.
+    # Legacy ports outside 1..port_capacity can't be a bit of the map; skip them.
+    mask = 0
+    ports = db.scalars(
+        select(models.Customer.assigned_port)
+        .where(models.Customer.splitter_id == splitter.splitter_id,
+               models.Customer.assigned_port.between(1, splitter.port_capacity))
+    )
+    for port in ports:
+        mask |= 1 << (port - 1)
+    return mask
+
+def _store_port_mask(splitter: models.Splitter, mask: int) -> int:
+    """Save the bitmap and used_ports; returns how much used_ports changed"""
+    delta = mask.bit_count() - (splitter.used_ports or 0)
+    splitter.port_map = mask.to_bytes((splitter.port_capacity + 7) // 8, "little")
+    splitter.used_ports = mask.bit_count()
+    return delta
+
+def _first_free_port(mask: int, capacity: int) -> int | None:
+    # ~mask & (mask + 1) isolates the lowest clear bit
+    port = (~mask & (mask + 1)).bit_length()
+    return port if port <= capacity else None
+
+def _lock_splitter(db: Session, splitter_id: int) -> models.Splitter:
+    splitter = (
+        db.query(models.Splitter)
+        .filter(models.Splitter.splitter_id == splitter_id)
+        .populate_existing()
+        .with_for_update()
+        .first()
+    )
+    if not splitter:
+        raise HTTPException(status_code=404, detail="Splitter not found")
+    return splitter
+
+def _lock_customers(db: Session, customer_ids: list[int]) -> list[models.Customer]:
+    customers = (
+        db.query(models.Customer)
+        .filter(models.Customer.customer_id.in_(customer_ids))
+        .order_by(models.Customer.customer_id)
+        .populate_existing()
+        .with_for_update()
+        .all()
+    )
+    missing = set(customer_ids) - {customer.customer_id for customer in customers}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Customers not found: {sorted(missing)}")
+    assigned = [customer.customer_id for customer in customers if customer.splitter_id is not None]
+    if assigned:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Customers already assigned to a splitter: {assigned}. Please release them first."
+        )
+    return customers
+
+def _record_port_change(db: Session, action_type: str, customer: models.Customer, changes: dict):
+    audit.record(db, audit.AuditEvent(
+        action_type=action_type,
+        entity_type="Customer",
+        entity_id=customer.customer_id,
+        label=customer.name,
+        changes=changes
+    ), atomic=True)
+
+def _adjust_used_ports(db: Session, fdh_id: int | None, delta: int):
+    db_fdh = get_fdh_by_id(db, fdh_id) if fdh_id is not None else None
+    if db_fdh:
+        capacity.adjust(db, capacity.fdh_keys(db_fdh), used_ports=delta)
+
+def get_splitter_ports(db: Session, splitter_id: int):
+    """Capacity, usage and the list of free ports of one splitter"""
+    splitter = get_splitter_by_id(db, splitter_id)
+    if not splitter:
+        raise HTTPException(status_code=404, detail="Splitter not found")
+    mask = _port_mask(db, splitter)
+    return {
+        "splitter_id": splitter.splitter_id,
+        "port_capacity": splitter.port_capacity,
+        "used_ports": mask.bit_count(),
+        "free_ports": [port for port in range(1, splitter.port_capacity + 1) if not mask >> (port - 1) & 1],
+    }
+
+def assign_customer_port(db: Session, splitter_id: int, assignment: schemas.PortAssignment):
+    """Connect a customer to a splitter port: the one requested, or the lowest free one"""
+    splitter = _lock_splitter(db, splitter_id)
+    customer = _lock_customers(db, [assignment.customer_id])[0]
+    mask = _port_mask(db, splitter)
+
+    if assignment.port is None:
+        port = _first_free_port(mask, splitter.port_capacity)
+        if port is None:
+            raise HTTPException(status_code=409, detail="Splitter has no free ports")
+    else:
+        port = assignment.port
+        if not 1 <= port <= splitter.port_capacity:
+            raise HTTPException(status_code=400, detail=f"Port must be between 1 and {splitter.port_capacity}")
+        if mask >> (port - 1) & 1:
+            raise HTTPException(status_code=409, detail=f"Port {port} is already in use")
+
+    _adjust_used_ports(db, splitter.fdh_id, _store_port_mask(splitter, mask | 1 << (port - 1)))
+    customer.splitter_id = splitter.splitter_id
+    customer.assigned_port = port
+    ancestry.refresh(db, [customer.customer_id])
+    _record_port_change(db, "Port Assigned", customer, {"splitter_id": [None, splitter.splitter_id], "assigned_port": [None, port]})
+    changed = [_customer_event("updated", customer, splitter), _splitter_event("updated", splitter)]
+    hierarchy_version.bump(db)
+    db.commit()
+    db.refresh(customer)
+    graph_index.index.upsert_customer(customer)
+    for event in changed:
+        events.publish(*event)
+    return customer
+
+def release_customer_port(db: Session, splitter_id: int, customer_id: int):
+    """Disconnect a customer from its splitter port and free the port"""
+    splitter = _lock_splitter(db, splitter_id)
+    customer = (
+        db.query(models.Customer)
+        .filter(models.Customer.customer_id == customer_id)
+        .populate_existing()
+        .with_for_update()
+        .first()
+    )
+    if not customer or customer.splitter_id != splitter.splitter_id:
+        raise HTTPException(status_code=404, detail="Customer is not assigned to this splitter")
+
+    port = customer.assigned_port
+    mask = _port_mask(db, splitter)
+    if port is not None:
+        mask &= ~(1 << (port - 1))
+    _adjust_used_ports(db, splitter.fdh_id, _store_port_mask(splitter, mask))
+    customer.splitter_id = None
+    customer.assigned_port = None
+    ancestry.refresh(db, [customer.customer_id])
+    _record_port_change(db, "Port Released", customer, {"splitter_id": [splitter.splitter_id, None], "assigned_port": [port, None]})
+    changed = [_customer_event("updated", customer, splitter), _splitter_event("updated", splitter)]
+    hierarchy_version.bump(db)
+    db.commit()
+    db.refresh(customer)
+    graph_index.index.upsert_customer(customer)
+    for event in changed:
+        events.publish(*event)
+    return customer
+
+def bulk_assign_customer_ports(db: Session, fdh_id: int, customer_ids: list[int]):
+    """
+    Spread customers over an FDH's splitters, always filling the least
+    utilized splitter next (by used/capacity). All or nothing: if the FDH
+    doesn't have enough free ports, nothing is assigned.
+    """
+    if not get_fdh_by_id(db, fdh_id):
+        raise HTTPException(status_code=404, detail="FDH not found")
+    splitters = (
+        db.query(models.Splitter)
+        .filter(models.Splitter.fdh_id == fdh_id)
+        .order_by(models.Splitter.splitter_id)
+        .populate_existing()
+        .with_for_update()
+        .all()
+    )
+    customers = _lock_customers(db, list(dict.fromkeys(customer_ids)))
+
+    masks = {splitter.splitter_id: _port_mask(db, splitter) for splitter in splitters}
+    free = sum(splitter.port_capacity - masks[splitter.splitter_id].bit_count() for splitter in splitters)
+    if free < len(customers):
+        raise HTTPException(
+            status_code=409,
+            detail=f"FDH has {free} free splitter ports, {len(customers)} requested"
+        )
+
+    heap = [
+        (masks[splitter.splitter_id].bit_count() / splitter.port_capacity, splitter.splitter_id, splitter)
+        for splitter in splitters if splitter.port_capacity > 0
+    ]
+    heapq.heapify(heap)
+    for customer in customers:
+        _, splitter_id, splitter = heapq.heappop(heap)
+        mask = masks[splitter_id]
+        port = _first_free_port(mask, splitter.port_capacity)
+        masks[splitter_id] = mask = mask | 1 << (port - 1)
+        customer.splitter_id = splitter_id
+        customer.assigned_port = port
+        _record_port_change(db, "Port Assigned", customer, {"splitter_id": [None, splitter_id], "assigned_port": [None, port]})
+        if mask.bit_count() < splitter.port_capacity:
+            heapq.heappush(heap, (mask.bit_count() / splitter.port_capacity, splitter_id, splitter))
+
+    used_delta = sum(_store_port_mask(splitter, masks[splitter.splitter_id]) for splitter in splitters)
+    _adjust_used_ports(db, fdh_id, used_delta)
+    assigned_ids = [customer.customer_id for customer in customers]
+    ancestry.refresh(db, assigned_ids)
+    by_id = {splitter.splitter_id: splitter for splitter in splitters}
+    changed = [_customer_event("updated", customer, by_id[customer.splitter_id]) for customer in customers]
+    filled = {customer.splitter_id for customer in customers}
+    changed += [_splitter_event("updated", by_id[splitter_id]) for splitter_id in sorted(filled)]
+    hierarchy_version.bump(db)
+    db.commit()
+    # Reload the committed rows in one query rather than one refresh per customer
+    customers = (
+        db.query(models.Customer)
+        .filter(models.Customer.customer_id.in_(assigned_ids))
+        .order_by(models.Customer.customer_id)
+        .all()
+    )
+    for customer in customers:
+        graph_index.index.upsert_customer(customer)
+    for event in changed:
+        events.publish(*event)
+    return customers
+
+
+# --- Capacity Roll-ups ---
+
+def get_capacity(db: Session, level: schemas.CapacityLevel | None = None):
+    """Port totals and utilization for every FDH, region and headend (or one level)"""
+    query = db.query(models.CapacityRollup)
+    if level:
+        query = query.filter(models.CapacityRollup.level == level.value)
+    rollups = query.order_by(models.CapacityRollup.level, models.CapacityRollup.key).all()
+    return [capacity.summary(rollup) for rollup in rollups]
+
+def get_capacity_node(db: Session, level: schemas.CapacityLevel, key: str):
+    """Port totals and utilization for one FDH, region or headend: a primary key lookup"""
+    rollup = db.get(models.CapacityRollup, (level.value, key))
+    if not rollup:
+        raise HTTPException(status_code=404, detail=f"No capacity data for {level.value} {key}")
+    return capacity.summary(rollup)
+
+
 # --- Customer CRUD (from Sprint 0) ---
 
 def create_customer(db: Session, customer: schemas.CustomerCreate):
@@ -214,10 +765,370 @@ def create_customer(db: Session, customer: schemas.CustomerCreate):
     db.add(new_customer)
     db.commit()
     db.refresh(new_customer)
+    invalidate_stats()
+    graph_index.index.upsert_customer(new_customer)
+    events.publish(*_customer_event("created", new_customer))
     return new_customer
 
-def get_customers(db: Session):
-    return db.query(models.Customer).all()
+def get_customers(db: Session, cursor: str | None = None, limit: int = 100, plain: bool = False):
+    """Get a page of customers, ordered by ID"""
+    if not plain:
+        return paginate(db.query(models.Customer), models.Customer.customer_id, cursor, limit)
+    query = db.query(*schema_columns(models.Customer, schemas.Customer))
+    page = paginate(query, models.Customer.customer_id, cursor, limit)
+    page["items"] = _plain_rows(page["items"])
+    return page
 
 def get_customer_by_id(db: Session, customer_id: int):
-    return db.query(models.Customer).filter(models.Customer.customer_id == customer_id).first()
\ No newline at end of file
+    return db.query(models.Customer).filter(models.Customer.customer_id == customer_id).first()
+
+def get_customer_paths(db: Session, customer_ids: list[int]):
+    """
+    Load many customers together with their Splitter -> FDH -> Headend
+    chain in a single joined query, whatever the number of IDs.
+    """
+    return (
+        db.query(models.Customer)
+        .options(
+            joinedload(models.Customer.splitter)
+            .joinedload(models.Splitter.fdh)
+            .joinedload(models.FDH.headend)
+        )
+        .filter(models.Customer.customer_id.in_(customer_ids))
+        .order_by(models.Customer.customer_id)
+        .all()
+    )
+
+def get_outage_impact(db: Session, request: schemas.ImpactRequest):
+    """
+    Customers below any of the failed headends, FDHs, splitters or drop
+    lines, with their assigned assets. The customers come from one primary
+    key lookup on the ancestry closure table (see ancestry.py), joined to
+    their assets in the same query.
+    """
+    failed = {
+        "headend": request.headend_ids,
+        "fdh": request.fdh_ids,
+        "splitter": request.splitter_ids,
+        "drop_line": request.line_ids,
+    }
+    if not any(failed.values()):
+        raise HTTPException(status_code=400, detail="Give at least one failed headend, FDH, splitter or drop line")
+
+    customer, link, asset = models.Customer, models.AssignedAssets, models.Asset
+    rows = db.connection().execute(
+        select(
+            customer.customer_id, customer.name, customer.address, customer.neighborhood, customer.status,
+            customer.splitter_id, customer.assigned_port,
+            asset.asset_id, asset.asset_type, asset.model, asset.serial_number, asset.status,
+        )
+        .outerjoin(link, link.customer_id == customer.customer_id)
+        .outerjoin(asset, asset.asset_id == link.asset_id)
+        .where(customer.customer_id.in_(ancestry.affected(failed)))
+        .order_by(customer.customer_id, asset.asset_id)
+    )
+
+    customers = []
+    asset_count = 0
+    for (customer_id, name, address, neighborhood, status, splitter_id, assigned_port,
+         asset_id, asset_type, model, serial_number, asset_status) in rows:
+        if not customers or customers[-1]["customer_id"] != customer_id:
+            customers.append({
+                "customer_id": customer_id, "name": name, "address": address, "neighborhood": neighborhood,
+                "status": status, "splitter_id": splitter_id, "assigned_port": assigned_port, "assets": [],
+            })
+        if asset_id is not None:
+            customers[-1]["assets"].append({
+                "asset_id": asset_id, "asset_type": asset_type, "model": model,
+                "serial_number": serial_number, "status": asset_status,
+            })
+            asset_count += 1
+    return {"customer_count": len(customers), "asset_count": asset_count, "customers": customers}
+
+
+# --- Technicians & Deployment Tasks ---
+
+def get_technicians(db: Session, region: str | None = None):
+    query = db.query(models.Technician)
+    if region:
+        query = query.filter(models.Technician.region == region)
+    return query.order_by(models.Technician.technician_id).all()
+
+def create_technician(db: Session, technician: schemas.TechnicianCreate):
+    new_technician = models.Technician(**technician.model_dump())
+    db.add(new_technician)
+    db.commit()
+    db.refresh(new_technician)
+    return new_technician
+
+def _check_task_refs(db: Session, customer_id: int | None = None, technician_id: int | None = None):
+    if customer_id is not None and db.get(models.Customer, customer_id) is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    if technician_id is not None and db.get(models.Technician, technician_id) is None:
+        raise HTTPException(status_code=404, detail="Technician not found")
+
+def get_tasks(db: Session,
+              status: schemas.TaskStatus | None = None,
+              technician_id: int | None = None,
+              customer_id: int | None = None,
+              unassigned: bool | None = None,
+              date_from: datetime.date | None = None,
+              date_to: datetime.date | None = None,
+              cursor: str | None = None,
+              limit: int = 100):
+    """Get a page of deployment tasks, ordered by ID, with optional filters"""
+    task = models.DeploymentTask
+    query = db.query(task)
+    if status:
+        query = query.filter(task.status == status.value)
+    if technician_id is not None:
+        query = query.filter(task.technician_id == technician_id)
+    if customer_id is not None:
+        query = query.filter(task.customer_id == customer_id)
+    if unassigned is not None:
+        query = query.filter(task.technician_id.is_(None) if unassigned else task.technician_id.isnot(None))
+    if date_from:
+        query = query.filter(task.scheduled_date >= date_from)
+    if date_to:
+        query = query.filter(task.scheduled_date <= date_to)
+    return paginate(query, task.task_id, cursor, limit)
+
+def get_task_by_id(db: Session, task_id: int):
+    return db.get(models.DeploymentTask, task_id)
+
+def create_task(db: Session, task: schemas.DeploymentTaskCreate):
+    _check_task_refs(db, task.customer_id, task.technician_id)
+    new_task = models.DeploymentTask(**task.model_dump())
+    db.add(new_task)
+    db.flush()
+    audit.record(db, audit.AuditEvent(
+        action_type="Task Create",
+        entity_type="DeploymentTask",
+        entity_id=new_task.task_id,
+        changes={key: [None, value] for key, value in task.model_dump().items() if value is not None}
+    ))
+    db.commit()
+    db.refresh(new_task)
+    invalidate_stats()
+    return new_task
+
+def update_task(db: Session, task_id: int, task_update: schemas.DeploymentTaskUpdate):
+    """Update a task's status, date, technician or notes"""
+    db_task = get_task_by_id(db, task_id)
+    if not db_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    update_data = task_update.model_dump(exclude_unset=True)
+    if "status" in update_data and update_data["status"] is not None:
+        update_data["status"] = update_data["status"].value
+    _check_task_refs(db, technician_id=update_data.get("technician_id"))
+    changes = audit.diff(db_task, update_data)
+    for key, value in update_data.items():
+        setattr(db_task, key, value)
+
+    audit.record(db, audit.AuditEvent(
+        action_type="Task Update",
+        entity_type="DeploymentTask",
+        entity_id=db_task.task_id,
+        changes=changes
+    ))
+    db.commit()
+    db.refresh(db_task)
+    invalidate_stats()
+    return db_task
+
+def schedule_tasks(db: Session, request: schemas.ScheduleRequest):
+    """
+    Assign every unscheduled task to a technician and day in the window
+    (see dispatch.py). Planned in memory from three queries and written
+    with one executemany UPDATE.
+    """
+    start = request.start_date or datetime.date.today()
+    backlog = dispatch.load(db, start, request.days, request.region)
+    plan = dispatch.plan(backlog, start, request.days)
+
+    if request.dry_run:
+        db.rollback() # Release the backlog rows
+    else:
+        matched = dispatch.apply(db, plan.assignments)
+        if matched not in (-1, len(plan.assignments)):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Tasks were assigned while scheduling ran; run it again")
+        for task_id, technician_id, day, requested in plan.assignments:
+            changes = {"technician_id": [None, technician_id]}
+            if day != requested:
+                changes["scheduled_date"] = [requested, day]
+            audit.record(db, audit.AuditEvent(
+                action_type="Task Dispatch",
+                entity_type="DeploymentTask",
+                entity_id=task_id,
+                changes=changes
+            ), atomic=True)
+        db.commit()
+
+    return {
+        "start_date": start,
+        "days": request.days,
+        "dry_run": request.dry_run,
+        "scheduled": len(plan.assignments),
+        "unassigned_count": len(plan.unassigned),
+        "assignments": [
+            {"task_id": task_id, "technician_id": technician_id, "scheduled_date": day}
+            for task_id, technician_id, day, _ in plan.assignments
+        ],
+        "unassigned": [{"task_id": task_id, "reason": reason} for task_id, reason in plan.unassigned],
+    }
+
+
+# --- Audit Log ---
+
+def get_audit_logs(db: Session,
+                   start: datetime.datetime | None = None,
+                   end: datetime.datetime | None = None,
+                   action_type: str | None = None,
+                   user_id: int | None = None,
+                   entity_type: str | None = None,
+                   entity_id: int | None = None,
+                   cursor: str | None = None,
+                   limit: int = 100):
+    """
+    Newest-first page of audit entries in [start, end), with optional filters.
+    Keyset-paginated on (timestamp, log_id), which every AuditLog index ends
+    in, so each page is a single bounded index range scan.
+    """
+    log = models.AuditLog
+    query = db.query(log)
+
+    if start:
+        query = query.filter(log.timestamp >= start)
+    if end:
+        query = query.filter(log.timestamp < end)
+    if action_type:
+        query = query.filter(log.action_type == action_type)
+    if user_id is not None:
+        query = query.filter(log.user_id == user_id)
+    if entity_type:
+        query = query.filter(log.entity_type == entity_type)
+    if entity_id is not None:
+        query = query.filter(log.entity_id == entity_id)
+
+    if cursor:
+        keys = decode_cursor_keys(cursor)
+        try:
+            last_ts = datetime.datetime.fromisoformat(keys["ts"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(or_(
+            log.timestamp < last_ts,
+            and_(log.timestamp == last_ts, log.log_id < keys["after"]),
+        ))
+
+    rows = query.order_by(log.timestamp.desc(), log.log_id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].log_id, ts=rows[-1].timestamp.isoformat())
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+# --- Dashboard Stats ---
+
+# Dashboard counts may lag writes by at most this long; writes through
+# this module invalidate the cache straight away.
+STATS_TTL_SECONDS = 30
+
+# Label for rows whose status or asset type is NULL
+UNKNOWN_GROUP = "Unknown"
+
+# Guards _stats_cache only; stats are computed outside it
+_stats_lock = threading.Lock()
+_stats_cache = {"value": None, "expires_at": 0.0, "generation": 0}
+
+def invalidate_stats():
+    """Drop the cached dashboard stats so the next read recomputes them"""
+    with _stats_lock:
+        _stats_cache["generation"] += 1
+        _stats_cache["value"] = None
+
+def _count_into(counts: dict, key, count: int):
+    key = UNKNOWN_GROUP if key is None else key
+    counts[key] = counts.get(key, 0) + count
+
+def _compute_stats(db: Session):
+    customers_by_status = {}
+    for status, count in db.query(models.Customer.status, func.count()).group_by(models.Customer.status):
+        _count_into(customers_by_status, status, count)
+
+    assets_by_type = {}
+    assets_by_status = {}
+    asset_counts = (
+        db.query(models.Asset.asset_type, models.Asset.status, func.count())
+        .group_by(models.Asset.asset_type, models.Asset.status)
+        .all()
+    )
+    for asset_type, status, count in asset_counts:
+        _count_into(assets_by_type, asset_type, count)
+        _count_into(assets_by_status, status, count)
+
+    # Remaining totals in a single round trip
+    total_fdhs, total_splitters, pending_tasks = db.execute(select(
+        select(func.count()).select_from(models.FDH).scalar_subquery(),
+        select(func.count()).select_from(models.Splitter).scalar_subquery(),
+        select(func.count()).select_from(models.DeploymentTask)
+            .where(models.DeploymentTask.status.in_(["Scheduled", "InProgress"]))
+            .scalar_subquery(),
+    )).one()
+
+    return schemas.DashboardStats(
+        total_customers=sum(customers_by_status.values()),
+        customers_by_status=customers_by_status,
+        total_assets=sum(assets_by_type.values()),
+        assets_by_type=assets_by_type,
+        assets_by_status=assets_by_status,
+        total_fdhs=total_fdhs,
+        total_splitters=total_splitters,
+        pending_tasks=pending_tasks,
+    )
+
+def get_stats(db: Session):
+    """Dashboard counts, computed with COUNT/GROUP BY and cached for a short TTL"""
+    with _stats_lock:
+        if _stats_cache["value"] is not None and time.monotonic() < _stats_cache["expires_at"]:
+            return _stats_cache["value"]
+        generation = _stats_cache["generation"]
+    # Outside the lock, so a slow compute doesn't hold up other requests
+    stats = _compute_stats(db)
+    with _stats_lock:
+        # Don't cache a result that a concurrent write has already made stale
+        if generation == _stats_cache["generation"]:
+            _stats_cache["value"] = stats
+            _stats_cache["expires_at"] = time.monotonic() + STATS_TTL_SECONDS
+    return stats
+
+
+# --- Bulk Export ---
+
+EXPORT_MODELS = {
+    schemas.ExportEntity.assets: models.Asset,
+    schemas.ExportEntity.customers: models.Customer,
+    schemas.ExportEntity.drop_lines: models.FiberDropLine,
+}
+
+def export_columns(entity: schemas.ExportEntity):
+    """Column names of an exportable table, in table order"""
+    return [column.name for column in EXPORT_MODELS[entity].__table__.columns]
+
+def export_statement(entity: schemas.ExportEntity):
+    """Plain-column SELECT of a whole table in primary key order"""
+    table = EXPORT_MODELS[entity].__table__
+    return select(*table.columns).order_by(*table.primary_key.columns)
+
+def stream_export_rows(db: Session, entity: schemas.ExportEntity, chunk_size: int = 1000):
+    """
+    Yield an entire table as lists of row mappings, chunk_size rows at a time.
+    Selects plain columns (no ORM identity map) over a server-side cursor,
+    so memory stays flat however large the table is.
+    """
+    result = db.execute(export_statement(entity), execution_options={"yield_per": chunk_size})
+    for partition in result.mappings().partitions():
+        yield partition
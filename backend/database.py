@@ -1,8 +1,12 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
 import os
 from dotenv import load_dotenv
+import metrics
 
 # Load environment variables from .env file
 load_dotenv()
@@ -12,10 +16,57 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable not set")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# DB_ASYNC=1 serves requests through an AsyncEngine/AsyncSession on an async
+# driver instead of blocking sessions on the threadpool.
+DB_ASYNC = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+
+# Sync driver -> async driver, used when ASYNC_DATABASE_URL isn't given
+ASYNC_DRIVERS = {
+    "mysql+pymysql://": "mysql+aiomysql://",
+    "mysql://": "mysql+aiomysql://",
+    "sqlite://": "sqlite+aiosqlite://",
+    "postgresql://": "postgresql+asyncpg://",
+}
+
+def to_async_url(url: str) -> str:
+    for sync_prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+def pool_options(url: str, poolclass) -> dict:
+    """
+    Connection pool settings from the environment. In-memory SQLite keeps
+    its default single-connection pool, which takes none of these.
+    """
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "yes"),
+    }
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options(SQLALCHEMY_DATABASE_URL, metrics.TimedQueuePool))
+metrics.instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The sync engine is always available (create_all, seed and CLI scripts);
+# the async one only exists in async mode.
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, metrics.TimedAsyncAdaptedQueuePool)
+    )
+    metrics.instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, class_=AsyncSession)
+
 Base = declarative_base()
 
 # Dependency for API endpoints
@@ -25,3 +76,29 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Routers depend on this, so the session type follows DB_ASYNC
+get_session = get_async_db if DB_ASYNC else get_db
+AnySession = Session | AsyncSession
+
+async def run_db(db, fn, *args, response_model=None, **kwargs):
+    """
+    Call a (sync) crud function from an async route without blocking the event loop.
+    With an AsyncSession it runs via run_sync, so its queries go through the
+    async driver; with a plain Session it runs on the threadpool as before.
+    If response_model is given, the result is converted to it while the
+    session is still usable, so lazy relationships load correctly.
+    """
+    def call(session):
+        result = fn(session, *args, **kwargs)
+        if response_model is not None:
+            result = TypeAdapter(response_model).validate_python(result, from_attributes=True)
+        return result
+
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(call)
+    return await run_in_threadpool(call, db)
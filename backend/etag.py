@@ -0,0 +1,65 @@
+"""
+Conditional GET for the hierarchy and topology graph reads.
+
+Responses carry a strong ETag with Cache-Control: no-cache, so browsers
+revalidate on every mount, and a matching If-None-Match is answered with
+304 by these dependencies, before the route runs its queries.
+
+hierarchy_conditional_get, for /api/network-hierarchy: the ETag is the
+hierarchy version row (hierarchy_version.py), which every hierarchy and
+port write in crud bumps in its own transaction. It is shared by all
+workers, so a write on one of them changes the ETag on all of them. Reading
+it costs one primary key lookup in the request's session.
+
+conditional_get, for the topology routes served from the graph index: every
+hierarchy or customer write in crud ends by updating the graph index
+(graph_index.py), which bumps its generation, and so does every reload of
+the index. "<process epoch>-<generation>" therefore changes whenever
+anything the index serves may have changed. The generation is per worker:
+other workers' writes only reach it when its index reloads
+(GRAPH_INDEX_MAX_AGE). That is fine for routes whose body comes from the
+same index, since a 200 from this worker would be just as old; routes that
+read the database must not use it. The random epoch makes sure an ETag from
+another worker, or from before a restart, never matches.
+"""
+from fastapi import Depends, HTTPException, Request, Response
+from database import get_session, run_db, AnySession
+import graph_index
+import hierarchy_version
+import uuid
+
+EPOCH = uuid.uuid4().hex[:12]
+
+def current_etag() -> str:
+    return f'"{EPOCH}-{graph_index.index.generation}"'
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def _answer(request: Request, response: Response, etag: str, current: bool = True):
+    """Tag the response, or answer 304 if the client already has this version"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if current and _matches(request.headers.get("if-none-match", ""), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+async def conditional_get(request: Request, response: Response):
+    """Route dependency: ETag GET responses and answer 304 when the client's copy is current"""
+    if request.method not in ("GET", "HEAD"):
+        return
+    # Taken before the route reads anything, so a write racing with this
+    # request can only make the ETag older than the body, never newer.
+    # A stale index is about to be reloaded, which may change the data.
+    _answer(request, response, current_etag(), current=not graph_index.index.is_stale())
+
+async def hierarchy_conditional_get(request: Request, response: Response, db: AnySession = Depends(get_session)):
+    """Route dependency: like conditional_get, tagged with the database's hierarchy version"""
+    if request.method not in ("GET", "HEAD"):
+        return
+    # Read in the route's own session (FastAPI shares it within a request),
+    # before the route's queries, so again the ETag is never newer than the body
+    version = await run_db(db, hierarchy_version.current)
+    if version is not None:
+        _answer(request, response, f'"h-{version}"')
@@ -0,0 +1,194 @@
+"""
+Change events pushed to the browser over a WebSocket (routers/live.py).
+
+crud's write functions call publish() once they have committed, with the
+row as its response schema shows it and the topics it concerns:
+    assets          every asset created, updated, retired or imported
+    hierarchy       headends, FDHs and splitters (the Network page's tree)
+    fdh:<id>        the FDH, its splitters and their customers
+    splitter:<id>   the splitter and its customers
+    customer:<id>   the customer, including its port assignment
+An event is {"type": "splitter.updated", "topics": [...], "data": {...}}.
+Clients subscribe to the topics on screen and apply each event to the rows
+they already hold instead of refetching. A move (e.g. a splitter to another
+FDH) is published to the old and the new parent's topics, and the data
+carries the new parent's ID.
+
+Fan-out: crud runs on worker threads (or the event loop in async mode), so
+publish() encodes the event once and hands the text to the loop. There the
+broker looks up each topic's subscribers and appends the same string to
+each one's outbox. That is a dict lookup per topic and a deque append per
+subscriber, without awaiting anything. Every connection has its own sender,
+which drains its outbox as one frame (a JSON array of events). A burst of
+writes therefore costs one send per client, and a slow client only delays
+itself. A client that falls OUTBOX_LIMIT events behind loses its backlog
+and gets [{"type": "resync"}]. It should then refetch what it shows, as it
+should after reconnecting.
+
+The broker lives in the API process. With several workers, a client only
+hears about writes made by the worker it is connected to; put a shared bus
+(e.g. Redis pub/sub) behind publish() before scaling out.
+
+Settings:
+    EVENTS_OUTBOX_LIMIT   events held per client before it must resync (default 1000)
+    EVENTS_MAX_TOPICS     topics one connection may subscribe to (default 200)
+"""
+from collections import deque
+from fastapi import WebSocket, WebSocketDisconnect
+import asyncio
+import orjson
+import os
+import re
+
+OUTBOX_LIMIT = int(os.getenv("EVENTS_OUTBOX_LIMIT", "1000"))
+MAX_TOPICS = int(os.getenv("EVENTS_MAX_TOPICS", "200"))
+
+_TOPIC = re.compile(r"assets|hierarchy|(fdh|splitter|customer):\d+")
+_RESYNC = '[{"type":"resync"}]'
+
+def valid_topic(topic) -> bool:
+    return isinstance(topic, str) and _TOPIC.fullmatch(topic) is not None
+
+def plain(obj, schema) -> dict:
+    """A model instance's columns that the response schema has fields for"""
+    columns = obj.__table__.columns
+    return {name: getattr(obj, name) for name in schema.model_fields if name in columns}
+
+
+class Subscriber:
+    """One connection: its topics and the encoded events waiting to be sent"""
+
+    def __init__(self):
+        self.topics: set[str] = set()
+        self.outbox: deque[str] = deque()
+        self.overflowed = False
+        self.ready = asyncio.Event()
+
+    def push(self, message: str):
+        if self.overflowed:
+            return
+        if len(self.outbox) >= OUTBOX_LIMIT:
+            self.outbox.clear()
+            self.overflowed = True
+        else:
+            self.outbox.append(message)
+        self.ready.set()
+
+    async def next_frame(self) -> str:
+        """Wait for events, then take everything pending as one JSON array"""
+        await self.ready.wait()
+        self.ready.clear()
+        if self.overflowed:
+            self.overflowed = False
+            return _RESYNC
+        frame = "[" + ",".join(self.outbox) + "]"
+        self.outbox.clear()
+        return frame
+
+
+class Broker:
+    """Topic -> subscribers. Only touched on the event loop, so it needs no lock."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.subscribers: dict[str, set[Subscriber]] = {}
+
+    def subscribe(self, subscriber: Subscriber, topics):
+        for topic in topics:
+            subscriber.topics.add(topic)
+            self.subscribers.setdefault(topic, set()).add(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber, topics=None):
+        for topic in list(subscriber.topics if topics is None else topics):
+            subscriber.topics.discard(topic)
+            members = self.subscribers.get(topic)
+            if members is not None:
+                members.discard(subscriber)
+                if not members:
+                    del self.subscribers[topic]
+
+    def dispatch(self, topics: list[str], message: str):
+        targets = set()
+        for topic in topics:
+            targets.update(self.subscribers.get(topic, ()))
+        for subscriber in targets:
+            subscriber.push(message)
+
+
+_broker: Broker | None = None
+
+def start():
+    """Bind the broker to the running event loop (from main's lifespan)"""
+    global _broker
+    _broker = Broker(asyncio.get_running_loop())
+
+def stop():
+    global _broker
+    _broker = None
+
+def publish(type: str, data: dict, topics: list[str]):
+    """Queue an event for the subscribers of any of the topics; safe to call from any thread"""
+    broker = _broker
+    if broker is None or not topics:
+        return
+    topics = list(dict.fromkeys(topics))
+    message = orjson.dumps({"type": type, "topics": topics, "data": data}).decode()
+    try:
+        broker.loop.call_soon_threadsafe(broker.dispatch, topics, message)
+    except RuntimeError:
+        pass # The loop has shut down
+
+
+# --- Connections ---
+
+def _update_topics(subscriber: Subscriber, message) -> str:
+    """Apply a {"subscribe": [...], "unsubscribe": [...]} message, all or nothing; returns the reply"""
+    broker = _broker
+    if broker is None:
+        return _reply("error", detail="Live updates are not running")
+    adding = removing = None
+    if isinstance(message, dict):
+        adding, removing = message.get("subscribe") or [], message.get("unsubscribe") or []
+    if not isinstance(adding, list) or not isinstance(removing, list):
+        return _reply("error", detail="Expected {\"subscribe\": [topics]} and/or {\"unsubscribe\": [topics]}")
+    invalid = [topic for topic in [*adding, *removing] if not valid_topic(topic)]
+    if invalid:
+        return _reply("error", detail=f"Unknown topics: {invalid}")
+    if len((subscriber.topics - set(removing)) | set(adding)) > MAX_TOPICS:
+        return _reply("error", detail=f"At most {MAX_TOPICS} topics per connection")
+    broker.unsubscribe(subscriber, removing)
+    broker.subscribe(subscriber, adding)
+    return _reply("subscribed", topics=sorted(subscriber.topics))
+
+def _reply(type: str, **fields) -> str:
+    return orjson.dumps({"type": type, **fields}).decode()
+
+async def serve(websocket: WebSocket, topics: list[str]):
+    """Run an accepted connection: read subscription changes, send events, until it closes"""
+    if _broker is None:
+        # Before start() or after stop(): nothing would ever be delivered
+        await websocket.close(code=1013, reason="Live updates are not running")
+        return
+    subscriber = Subscriber()
+    subscriber.push(_update_topics(subscriber, {"subscribe": topics}))
+
+    async def send_events():
+        while True:
+            await websocket.send_text(await subscriber.next_frame())
+
+    sender = asyncio.create_task(send_events())
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except ValueError:
+                message = None
+            subscriber.push(_update_topics(subscriber, message))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        # Also collects the sender's error if the client went away mid-send
+        await asyncio.gather(sender, return_exceptions=True)
+        if _broker is not None:
+            _broker.unsubscribe(subscriber)
@@ -0,0 +1,23 @@
+"""
+Fast response path for large lists of trusted rows.
+
+The regular path hands ORM objects to FastAPI, which validates each one
+against the route's response_model (from_attributes) and then encodes the
+result with the stdlib json module; for lists of thousands of rows that
+dominates the response time. The list endpoints serve rows straight from
+our own tables, so crud selects just the schema's columns as dicts
+(plain=True) and the route returns them through fast_json(), which encodes
+with orjson and skips validation. response_model stays on those routes for
+the OpenAPI docs. Compare the two paths with benchmarks/serialization.py.
+"""
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+def fast_json(content, response: Response | None = None, status_code: int = 200) -> ORJSONResponse:
+    """
+    Encode already-plain content (dicts, lists, datetimes) with orjson.
+    Pass the route's injected Response to keep headers that dependencies
+    set on it, such as the hierarchy ETag.
+    """
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,307 @@
+"""
+Process-local index of the physical plant: Headend -> FDH -> Splitter -> Customer.
+
+The plant changes far less often than it is read, so the topology routes
+serve from this index instead of walking the chain in the database.
+Each node keeps its parent ID and the set of its child IDs, so a
+customer's path is O(depth) dictionary lookups.
+
+The index is loaded once at startup and updated incrementally by the
+hierarchy/customer writes in crud. Each uvicorn worker has its own copy,
+so it is also fully reloaded once it is older than GRAPH_INDEX_MAX_AGE
+seconds, to pick up writes made by other workers. A reload reads a
+snapshot that a write committing meanwhile may have missed, so the
+updates made while it runs are recorded and applied again on top of it.
+"""
+from dataclasses import dataclass, field
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import models
+import os
+import threading
+import time
+
+MAX_AGE_SECONDS = int(os.getenv("GRAPH_INDEX_MAX_AGE", "300"))
+
+# --- Nodes ---
+# Attribute names mirror the ORM models, so the same formatting code
+# works on either.
+
+@dataclass(slots=True)
+class HeadendNode:
+    headend_id: int
+    name: str
+    fdh_ids: set = field(default_factory=set)
+
+@dataclass(slots=True)
+class FDHNode:
+    fdh_id: int
+    name: str
+    headend_id: int | None
+    splitter_ids: set = field(default_factory=set)
+
+@dataclass(slots=True)
+class SplitterNode:
+    splitter_id: int
+    model: str | None
+    location: str | None
+    fdh_id: int | None
+    customer_ids: set = field(default_factory=set)
+
+@dataclass(slots=True)
+class DropLineNode:
+    line_id: int
+    length_meters: float | None
+    status: str | None
+
+@dataclass(slots=True)
+class CustomerNode:
+    customer_id: int
+    name: str
+    status: str | None
+    splitter_id: int | None
+    drop_line: DropLineNode | None = None
+
+
+class NetworkGraphIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self.loaded_at: float | None = None
+        # Bumped on every load and every incremental update, so it changes
+        # whenever what the index (or the hierarchy behind it) holds may have
+        # changed; conditional GETs use it as their version (see etag.py).
+        self.generation = 0
+        # Updates made during a load, replayed once it swaps its maps in
+        self._replay: list | None = None
+        self.headends: dict[int, HeadendNode] = {}
+        self.fdhs: dict[int, FDHNode] = {}
+        self.splitters: dict[int, SplitterNode] = {}
+        self.customers: dict[int, CustomerNode] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    # --- Loading ---
+
+    def load(self, db: Session):
+        """Rebuild the whole index from the database (plain column selects, no ORM objects)"""
+        with self._load_lock:
+            self._load(db)
+
+    def _load(self, db: Session):
+        with self._lock:
+            self._replay = []
+        try:
+            maps = self._read(db)
+        except BaseException:
+            with self._lock:
+                self._replay = None
+            raise
+        with self._lock:
+            self.headends, self.fdhs, self.splitters, self.customers = maps
+            # A write that committed after our snapshot updated the old maps
+            for apply, values in self._replay:
+                apply(*values)
+            self._replay = None
+            self.loaded_at = time.monotonic()
+            self.generation += 1
+
+    def _read(self, db: Session):
+        headends = {
+            row.headend_id: HeadendNode(row.headend_id, row.name)
+            for row in db.execute(select(models.Headend.headend_id, models.Headend.name))
+        }
+        fdhs = {
+            row.fdh_id: FDHNode(row.fdh_id, row.name, row.headend_id)
+            for row in db.execute(select(models.FDH.fdh_id, models.FDH.name, models.FDH.headend_id))
+        }
+        splitters = {
+            row.splitter_id: SplitterNode(row.splitter_id, row.model, row.location, row.fdh_id)
+            for row in db.execute(select(
+                models.Splitter.splitter_id, models.Splitter.model,
+                models.Splitter.location, models.Splitter.fdh_id
+            ))
+        }
+        customers = {
+            row.customer_id: CustomerNode(row.customer_id, row.name, row.status, row.splitter_id)
+            for row in db.execute(select(
+                models.Customer.customer_id, models.Customer.name,
+                models.Customer.status, models.Customer.splitter_id
+            ))
+        }
+        drop_lines = db.execute(select(
+            models.FiberDropLine.line_id, models.FiberDropLine.length_meters,
+            models.FiberDropLine.status, models.FiberDropLine.to_customer_id
+        ))
+        for row in drop_lines:
+            customer = customers.get(row.to_customer_id)
+            if customer:
+                customer.drop_line = _drop_line_node(row)
+
+        for fdh in fdhs.values():
+            if fdh.headend_id in headends:
+                headends[fdh.headend_id].fdh_ids.add(fdh.fdh_id)
+        for splitter in splitters.values():
+            if splitter.fdh_id in fdhs:
+                fdhs[splitter.fdh_id].splitter_ids.add(splitter.splitter_id)
+        for customer in customers.values():
+            if customer.splitter_id in splitters:
+                splitters[customer.splitter_id].customer_ids.add(customer.customer_id)
+        return headends, fdhs, splitters, customers
+
+    def ensure_fresh(self, db: Session):
+        """Load the index if it never was, or reload it once it is older than MAX_AGE_SECONDS"""
+        if self.is_stale():
+            with self._load_lock:
+                # Another request may have reloaded while we waited
+                if self.is_stale():
+                    self._load(db)
+
+    def is_stale(self) -> bool:
+        return not self.loaded or time.monotonic() - self.loaded_at > MAX_AGE_SECONDS
+
+    # --- Incremental updates ---
+    # All of these accept ORM objects (or anything with the same attributes)
+    # and copy the values they need, so a load running meanwhile can replay
+    # them. They are no-ops until the index has been loaded, apart from
+    # bumping the generation.
+
+    def _update(self, apply, *values):
+        with self._lock:
+            self.generation += 1
+            if self._replay is not None:
+                self._replay.append((apply, values))
+            if self.loaded:
+                apply(*values)
+
+    def upsert_headend(self, headend):
+        self._update(self._upsert_headend, headend.headend_id, headend.name)
+
+    def upsert_fdh(self, fdh):
+        self._update(self._upsert_fdh, fdh.fdh_id, fdh.name, fdh.headend_id)
+
+    def upsert_splitter(self, splitter):
+        self._update(self._upsert_splitter, splitter.splitter_id, splitter.model, splitter.location, splitter.fdh_id)
+
+    def upsert_customer(self, customer):
+        self._update(self._upsert_customer, customer.customer_id, customer.name, customer.status, customer.splitter_id)
+
+    def set_drop_line(self, customer_id: int, drop_line):
+        self._update(self._set_drop_line, customer_id, _drop_line_node(drop_line) if drop_line else None)
+
+    def _upsert_headend(self, headend_id, name):
+        node = self.headends.get(headend_id)
+        if node:
+            node.name = name
+        else:
+            self.headends[headend_id] = HeadendNode(headend_id, name)
+
+    def _upsert_fdh(self, fdh_id, name, headend_id):
+        node = self.fdhs.get(fdh_id)
+        if node is None:
+            node = self.fdhs[fdh_id] = FDHNode(fdh_id, name, None)
+        node.name = name
+        self._reparent(node, "fdh_id", "headend_id", headend_id, self.headends, "fdh_ids")
+
+    def _upsert_splitter(self, splitter_id, model, location, fdh_id):
+        node = self.splitters.get(splitter_id)
+        if node is None:
+            node = self.splitters[splitter_id] = SplitterNode(splitter_id, None, None, None)
+        node.model = model
+        node.location = location
+        self._reparent(node, "splitter_id", "fdh_id", fdh_id, self.fdhs, "splitter_ids")
+
+    def _upsert_customer(self, customer_id, name, status, splitter_id):
+        node = self.customers.get(customer_id)
+        if node is None:
+            node = self.customers[customer_id] = CustomerNode(customer_id, name, None, None)
+        node.name = name
+        node.status = status
+        self._reparent(node, "customer_id", "splitter_id", splitter_id, self.splitters, "customer_ids")
+
+    def _set_drop_line(self, customer_id, drop_line):
+        node = self.customers.get(customer_id)
+        if node:
+            node.drop_line = drop_line
+
+    def add_customer_chain(self, customer):
+        """Index a customer loaded with its splitter -> fdh -> headend relationships"""
+        splitter = customer.splitter
+        fdh = splitter.fdh if splitter else None
+        if fdh and fdh.headend:
+            self.upsert_headend(fdh.headend)
+        if fdh:
+            self.upsert_fdh(fdh)
+        if splitter:
+            self.upsert_splitter(splitter)
+        self.upsert_customer(customer)
+
+    def add_fdh_tree(self, fdh):
+        """Index an FDH loaded with its headend, splitters, customers and drop lines"""
+        if fdh.headend:
+            self.upsert_headend(fdh.headend)
+        self.upsert_fdh(fdh)
+        for splitter in fdh.splitters:
+            self.upsert_splitter(splitter)
+            for customer in splitter.customers:
+                self.upsert_customer(customer)
+                self.set_drop_line(customer.customer_id, customer.drop_line)
+
+    def _reparent(self, node, id_attr, parent_attr, new_parent_id, parents, children_attr):
+        node_id = getattr(node, id_attr)
+        old_parent = parents.get(getattr(node, parent_attr))
+        if old_parent:
+            getattr(old_parent, children_attr).discard(node_id)
+        setattr(node, parent_attr, new_parent_id)
+        new_parent = parents.get(new_parent_id)
+        if new_parent:
+            getattr(new_parent, children_attr).add(node_id)
+
+    # --- Reads ---
+
+    def customer_path(self, customer_id: int):
+        """
+        (customer, splitter, fdh, headend) for a customer, with None past the
+        last link. None if the customer, or a link its path points to, isn't
+        indexed yet: the caller loads those from the database.
+        """
+        with self._lock:
+            customer = self.customers.get(customer_id)
+            if customer is None:
+                return None
+            splitter = self.splitters.get(customer.splitter_id)
+            fdh = self.fdhs.get(splitter.fdh_id) if splitter else None
+            headend = self.headends.get(fdh.headend_id) if fdh else None
+            links = ((customer, splitter, "splitter_id"), (splitter, fdh, "fdh_id"), (fdh, headend, "headend_id"))
+            if any(child and parent is None and getattr(child, attr) is not None for child, parent, attr in links):
+                return None
+            return customer, splitter, fdh, headend
+
+    def fdh_tree(self, fdh_id: int):
+        """(fdh, headend, [(splitter, [customers])]) for an FDH, ordered by ID; None if unknown"""
+        with self._lock:
+            fdh = self.fdhs.get(fdh_id)
+            if fdh is None:
+                return None
+            headend = self.headends.get(fdh.headend_id)
+            children = []
+            for splitter_id in sorted(fdh.splitter_ids):
+                splitter = self.splitters[splitter_id]
+                customers = [self.customers[c] for c in sorted(splitter.customer_ids)]
+                children.append((splitter, customers))
+            return fdh, headend, children
+
+
+def _drop_line_node(drop_line) -> DropLineNode:
+    length = drop_line.length_meters
+    return DropLineNode(drop_line.line_id, float(length) if length is not None else None, drop_line.status)
+
+
+index = NetworkGraphIndex()
+
+def get_index(db: Session) -> NetworkGraphIndex:
+    """The shared index, loaded (or refreshed) on demand"""
+    index.ensure_fresh(db)
+    return index
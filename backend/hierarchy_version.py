@@ -0,0 +1,34 @@
+"""
+Hierarchy version: one database row counting hierarchy and port writes.
+
+The /api/network-hierarchy reads (headends, FDHs, splitters, their ports and
+the capacity roll-ups) only change through the hierarchy and port-allocation
+writes in crud. Each of them runs bump() in its own transaction, so the
+version moves exactly when one of them commits, whichever worker ran it.
+etag.hierarchy_conditional_get reads it with one primary key lookup and
+answers If-None-Match with 304 before the route runs its queries.
+
+bump() is UPDATE ... SET version = version + 1, run just before the commit:
+concurrent writers queue on the row only for the rest of their commit, and
+since it is always the last row a write locks, after its splitters and
+customers, it adds no lock-order cycle.
+
+Scripts that write the hierarchy tables directly (seed.py,
+synthetic_data.py, capacity.py --rebuild) bump it when they are done.
+"""
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+import models
+
+ROW_ID = 1
+
+def current(db: Session) -> int | None:
+    """The hierarchy version, or None if the row is missing"""
+    return db.execute(
+        select(models.HierarchyVersion.version).where(models.HierarchyVersion.id == ROW_ID)
+    ).scalar_one_or_none()
+
+def bump(db: Session):
+    """Advance the version in the caller's transaction"""
+    version = models.HierarchyVersion
+    db.execute(update(version).where(version.id == ROW_ID).values(version=version.version + 1))
@@ -1,20 +1,50 @@
-from fastapi import FastAPI
-from database import engine
-import models
-from routers import assets, customers, hierarchy ,topology
+from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
+from contextlib import asynccontextmanager
+from database import engine, SessionLocal, async_engine, AsyncSessionLocal
+import migrations
+import graph_index
+import metrics
+import audit
+import auth
+import events
+from routers import assets, customers, hierarchy ,topology, export, stats, audit_logs, tasks, live
+from routers import auth as auth_routes
 from fastapi.middleware.cors import CORSMiddleware
 
 
-
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The schema is managed by migrations.py; only confirm it is current
+    migrations.check_schema(engine)
+    audit.start(SessionLocal)
+    events.start()
+    # Warm the in-memory topology index before serving traffic
+    if async_engine is not None:
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(graph_index.index.load)
+    else:
+        db = SessionLocal()
+        try:
+            graph_index.index.load(db)
+        finally:
+            db.close()
+    yield
+    # Flush queued audit events before the process exits
+    events.stop()
+    audit.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 app = FastAPI(
     title="Network Inventory Management API",
     description="API for managing broadband assets, customers, and deployments.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # --- Middleware ---
+app.add_middleware(metrics.MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -27,13 +57,30 @@ app.add_middleware(
 )
 
 # --- API Routers ---
-app.include_router(assets.router)
-app.include_router(customers.router)
-app.include_router(hierarchy.router) # Add the new hierarchy router
-app.include_router(topology.router)
+# Every API router identifies the caller from its bearer token (see auth.py)
+authenticated = [Depends(auth.authenticate)]
+app.include_router(auth_routes.router)
+app.include_router(assets.router, dependencies=authenticated)
+app.include_router(customers.router, dependencies=authenticated)
+app.include_router(hierarchy.router, dependencies=authenticated) # Add the new hierarchy router
+app.include_router(topology.router, dependencies=authenticated)
+app.include_router(export.router, dependencies=authenticated)
+app.include_router(stats.router, dependencies=authenticated)
+app.include_router(audit_logs.router, dependencies=authenticated)
+app.include_router(tasks.router, dependencies=authenticated)
+# The WebSocket checks its token itself: it comes in the query string
+app.include_router(live.router)
 
 # --- Root Endpoint ---
 @app.get("/", tags=["Root"])
 def read_root():
     """ A simple root endpoint to check if the API is running. """
-    return {"message": "Welcome to the Network Inventory API"}
\ No newline at end of file
+    return {"message": "Welcome to the Network Inventory API"}
+
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse)
+def read_metrics():
+    """ Per-route latency, SQL statement count/time and pool stats, in Prometheus text format. """
+    engines = [("sync", engine)]
+    if async_engine is not None:
+        engines.append(("async", async_engine.sync_engine))
+    return metrics.render(engines)
\ No newline at end of file
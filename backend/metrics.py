@@ -0,0 +1,193 @@
+"""
+Per-route request and database instrumentation, exposed as Prometheus text.
+
+MetricsMiddleware times each request and opens a per-request RequestStats in
+a context variable. SQLAlchemy engine events then add every statement (count
+and execution time) to it, and the timed pool classes add the time spent
+waiting for a pooled connection. When the response is finished, the totals
+are recorded against the route template (e.g. /api/topology/fdh/{fdh_id}),
+so an N+1 regression shows up as a jump in db_statements_per_request, and
+pool exhaustion shows up in db_pool_checkout_wait_seconds.
+"""
+from contextvars import ContextVar
+from dataclasses import dataclass
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    sql_seconds: float = 0.0
+    checkout_wait_seconds: float = 0.0
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+# --- Metric types ---
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{{{_labels(label_names, labels)}}} {_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets):
+        self.name, self.help, self.buckets = name, help, buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self.values.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.values.items()):
+            base = _labels(label_names, labels)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound:g}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {series[len(self.buckets)]}')
+            lines.append(f"{self.name}_sum{{{base}}} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{{{base}}} {series[len(self.buckets)]}")
+        return lines
+
+def _number(value: float) -> str:
+    """Sample value at full precision (:g would turn 1234567 into 1.23457e+06)"""
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _labels(names, values) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+_lock = threading.Lock()
+ROUTE_LABELS = ("method", "route")
+requests_total = Counter("http_requests_total", "Requests handled, by route and status code")
+request_duration = Histogram("http_request_duration_seconds", "Request latency", LATENCY_BUCKETS)
+statements_per_request = Histogram("db_statements_per_request", "SQL statements executed per request", STATEMENT_BUCKETS)
+sql_seconds = Histogram("db_sql_seconds_per_request", "Total SQL execution time per request", LATENCY_BUCKETS)
+checkout_wait = Histogram("db_pool_checkout_wait_seconds", "Time per request spent waiting for a pooled connection", LATENCY_BUCKETS)
+
+
+def record_request(method: str, route: str, status: int, seconds: float, stats: RequestStats):
+    labels = (method, route)
+    with _lock:
+        requests_total.inc((method, route, str(status)))
+        request_duration.observe(labels, seconds)
+        statements_per_request.observe(labels, stats.statements)
+        sql_seconds.observe(labels, stats.sql_seconds)
+        checkout_wait.observe(labels, stats.checkout_wait_seconds)
+
+
+# --- SQLAlchemy hooks ---
+
+def instrument_engine(engine):
+    """Attach statement counting/timing to a (sync) Engine; use async_engine.sync_engine for async ones"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.sql_seconds += elapsed
+
+def _record_checkout_wait(seconds: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.checkout_wait_seconds += seconds
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection"""
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_checkout_wait(time.perf_counter() - start)
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Async-engine counterpart of TimedQueuePool"""
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_checkout_wait(time.perf_counter() - start)
+
+
+# --- ASGI middleware ---
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            # Use the route template so /fdh/1 and /fdh/2 share a series
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            record_request(scope["method"], path, status, time.perf_counter() - start, stats)
+
+
+# --- Exposition ---
+
+def render(engines=()) -> str:
+    """All metrics in Prometheus text format, plus current pool gauges for the given engines"""
+    with _lock:
+        lines = requests_total.render(ROUTE_LABELS + ("status",))
+        for histogram in (request_duration, statements_per_request, sql_seconds, checkout_wait):
+            lines += histogram.render(ROUTE_LABELS)
+
+    gauges = {
+        "db_pool_size": ("Configured pool size", "size"),
+        "db_pool_checked_out": ("Connections currently checked out", "checkedout"),
+        "db_pool_overflow": ("Connections currently open beyond pool_size", "overflow"),
+    }
+    for name, (help, method) in gauges.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        for label, engine in engines:
+            pool = engine.pool
+            if hasattr(pool, method):
+                lines.append(f'{name}{{engine="{label}"}} {getattr(pool, method)()}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,224 @@
+"""
+Versioned schema migrations.
+
+The schema is created and changed only by this script, which runs as its
+own deploy step before the API starts:
+    python migrations.py             # apply pending migrations
+    python migrations.py --status    # show the current and latest version
+
+API workers never touch the schema. At startup, main.py calls
+check_schema(): one query that reads the latest SchemaVersion row. If the
+database is behind or ahead of this code, the worker refuses to start. Boot
+time therefore doesn't depend on schema size, and workers starting together
+can't race each other on DDL.
+
+Each migration is a function of a Connection, listed in MIGRATIONS in
+version order. It runs in one transaction with its SchemaVersion row. Never
+change a migration that has shipped; add a new one instead.
+
+Migration 1 adopts databases built by the old create_all-at-import: it only
+creates the original tables that are missing. Tables are created from the
+current model definitions, so on a new database they already have everything
+the later migrations add. Every migration therefore checks what exists
+before changing anything. That same check lets a migration that failed
+halfway on MySQL, where DDL can't be rolled back, simply be run again.
+"""
+from dataclasses import dataclass
+from typing import Callable
+from sqlalchemy import func, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+import ancestry
+import asset_search
+import capacity
+import hierarchy_version
+import models
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+# --- Helpers ---
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+def _create_tables(conn: Connection, *models_):
+    models.Base.metadata.create_all(bind=conn, tables=[m.__table__ for m in models_], checkfirst=True)
+
+def _add_columns(conn: Connection, model, *names: str):
+    """ALTER TABLE ... ADD COLUMN for each of the model's columns the table lacks"""
+    table = model.__tablename__
+    existing = {column["name"] for column in inspect(conn).get_columns(table)}
+    for name in names:
+        if name in existing:
+            continue
+        column_type = model.__table__.c[name].type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {_quote(conn, table)} ADD COLUMN {_quote(conn, name)} {column_type}"))
+
+def _index_names(conn: Connection, table: str) -> set[str]:
+    inspector = inspect(conn)
+    names = {index["name"] for index in inspector.get_indexes(table)}
+    return names | {constraint["name"] for constraint in inspector.get_unique_constraints(table)}
+
+def _create_model_indexes(conn: Connection, model, *names: str):
+    """Create the model's named indexes that the table lacks"""
+    existing = _index_names(conn, model.__tablename__)
+    for index in model.__table__.indexes:
+        if index.name in names and index.name not in existing:
+            index.create(conn)
+
+
+# --- Migrations ---
+
+def initial_schema(conn: Connection):
+    _create_tables(
+        conn,
+        models.User, models.Headend, models.FDH, models.Splitter, models.Customer, models.Asset,
+        models.AssignedAssets, models.FiberDropLine, models.Technician, models.DeploymentTask, models.AuditLog,
+    )
+
+def audit_log_changes(conn: Connection):
+    # Structured change records, the indexes behind the filtered audit
+    # queries, and the archive table
+    _add_columns(conn, models.AuditLog, "entity_type", "entity_id", "changes")
+    _create_model_indexes(
+        conn, models.AuditLog,
+        "ix_AuditLog_timestamp", "ix_AuditLog_action_timestamp",
+        "ix_AuditLog_user_timestamp", "ix_AuditLog_entity_timestamp",
+    )
+    _create_tables(conn, models.AuditLogArchive)
+
+def asset_search_index(conn: Connection):
+    if inspect(conn).has_table(models.AssetSearchTrigram.__tablename__):
+        return
+    _create_tables(conn, models.AssetSearchTrigram)
+    asset_search.rebuild(Session(bind=conn))
+
+def splitter_port_map(conn: Connection):
+    # port_map starts NULL and is built from the customers on first allocation
+    _add_columns(conn, models.Splitter, "port_map")
+    if "uq_Customer_splitter_port" in _index_names(conn, models.Customer.__tablename__):
+        return
+    customer = models.Customer
+    duplicates = conn.execute(
+        select(customer.splitter_id, customer.assigned_port, func.count())
+        .where(customer.splitter_id.isnot(None), customer.assigned_port.isnot(None))
+        .group_by(customer.splitter_id, customer.assigned_port)
+        .having(func.count() > 1)
+        .limit(20)
+    ).all()
+    if duplicates:
+        listed = ", ".join(f"splitter {s} port {p} ({n} customers)" for s, p, n in duplicates)
+        raise RuntimeError(f"Ports assigned to more than one customer; reassign them and re-run: {listed}")
+    # A unique index rather than ALTER TABLE ADD CONSTRAINT, which SQLite lacks
+    conn.execute(text(
+        f"CREATE UNIQUE INDEX {_quote(conn, 'uq_Customer_splitter_port')} "
+        f"ON {_quote(conn, 'Customer')} ({_quote(conn, 'splitter_id')}, {_quote(conn, 'assigned_port')})"
+    ))
+
+def capacity_rollups(conn: Connection):
+    if inspect(conn).has_table(models.CapacityRollup.__tablename__):
+        return
+    _create_tables(conn, models.CapacityRollup)
+    capacity.rebuild(Session(bind=conn))
+
+def technician_dispatch(conn: Connection):
+    _add_columns(conn, models.Technician, "daily_capacity")
+    _create_model_indexes(conn, models.DeploymentTask, "ix_DeploymentTask_technician_date")
+
+def fdh_feeder_length(conn: Connection):
+    _add_columns(conn, models.FDH, "feeder_length_meters")
+
+def customer_ancestry(conn: Connection):
+    # Impact reports join the affected customers to their assets
+    _create_model_indexes(conn, models.AssignedAssets, "ix_AssignedAssets_customer_id")
+    if inspect(conn).has_table(models.CustomerAncestry.__tablename__):
+        return
+    _create_tables(conn, models.CustomerAncestry)
+    ancestry.rebuild(Session(bind=conn))
+
+def ancestry_live_drop_lines(conn: Connection):
+    # Drop line rows now need an active line from the customer's own splitter
+    ancestry.rebuild(Session(bind=conn))
+
+def hierarchy_version_row(conn: Connection):
+    _create_tables(conn, models.HierarchyVersion)
+    version = models.HierarchyVersion
+    if conn.execute(select(version.id).where(version.id == hierarchy_version.ROW_ID)).first() is None:
+        conn.execute(insert(version).values(id=hierarchy_version.ROW_ID, version=0))
+
+
+MIGRATIONS = [
+    Migration(1, "initial schema", initial_schema),
+    Migration(2, "audit log changes, indexes and archive", audit_log_changes),
+    Migration(3, "asset search trigram index", asset_search_index),
+    Migration(4, "splitter port map and unique port assignment", splitter_port_map),
+    Migration(5, "capacity roll-ups", capacity_rollups),
+    Migration(6, "technician capacity and task calendar index", technician_dispatch),
+    Migration(7, "FDH feeder length", fdh_feeder_length),
+    Migration(8, "customer ancestry closure table and asset assignment index", customer_ancestry),
+    Migration(9, "customer ancestry without released or disconnected drop lines", ancestry_live_drop_lines),
+    Migration(10, "hierarchy version for ETags", hierarchy_version_row),
+]
+LATEST = MIGRATIONS[-1].version
+
+
+# --- Running and checking ---
+
+def current_version(conn: Connection) -> int:
+    """The last applied migration, 0 for a database this script hasn't touched"""
+    if not inspect(conn).has_table(models.SchemaVersion.__tablename__):
+        return 0
+    return conn.execute(select(func.max(models.SchemaVersion.version))).scalar() or 0
+
+def upgrade(engine: Engine) -> list[Migration]:
+    """Apply every pending migration in order; returns the ones applied"""
+    with engine.begin() as conn:
+        _create_tables(conn, models.SchemaVersion)
+        version = current_version(conn)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        with engine.begin() as conn:
+            migration.apply(conn)
+            conn.execute(insert(models.SchemaVersion).values(version=migration.version, name=migration.name))
+        applied.append(migration)
+    return applied
+
+def check_schema(engine: Engine):
+    """Raise unless the database is at exactly the version this code expects"""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version < LATEST:
+        raise RuntimeError(
+            f"Database schema is at version {version}, this code needs {LATEST}; run 'python migrations.py'"
+        )
+    if version > LATEST:
+        raise RuntimeError(f"Database schema is at version {version}, newer than this code ({LATEST})")
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Apply schema migrations")
+    parser.add_argument("--status", action="store_true", help="show the schema version without migrating")
+    args = parser.parse_args()
+
+    if args.status:
+        with engine.connect() as conn:
+            version = current_version(conn)
+        pending = [m for m in MIGRATIONS if m.version > version]
+        print(f"Schema version {version} of {LATEST}.")
+        for migration in pending:
+            print(f"  pending: {migration.version} {migration.name}")
+    else:
+        for migration in upgrade(engine):
+            print(f"Applied {migration.version}: {migration.name}")
+        print(f"Schema is at version {LATEST}.")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, DateTime, Text, DECIMAL, Date
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, DateTime, Text, DECIMAL, Date, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -23,6 +23,7 @@ class FDH(Base):
     location = Column(String(255))
     region = Column(String(100))
     max_ports = Column(Integer)
+    feeder_length_meters = Column(Integer) # Fiber run from the headend, for the power budget
     
     headend_id = Column(Integer, ForeignKey("Headend.headend_id"))
     
@@ -38,6 +39,10 @@ class Splitter(Base):
     model = Column(String(50))
     port_capacity = Column(Integer, nullable=False)
     used_ports = Column(Integer, default=0)
+    # Occupied ports as a little-endian bitmap (bit 0 = port 1), kept in step
+    # with used_ports by crud's port allocation. NULL until first allocation.
+    # 32 bytes: schemas.SplitterBase caps port_capacity at 256.
+    port_map = Column(LargeBinary(32))
     location = Column(String(100)) # e.g., "Slot 3, Shelf 1"
     
     fdh_id = Column(Integer, ForeignKey("FDH.fdh_id"))
@@ -49,6 +54,22 @@ class Splitter(Base):
     # One-to-Many: Splitter -> FiberDropLines
     drop_lines = relationship("FiberDropLine", back_populates="splitter")
 
+class CapacityRollup(Base):
+    """ Running port totals per FDH, region and headend (see capacity.py). """
+    __tablename__ = "CapacityRollup"
+    level = Column(Enum('fdh', 'region', 'headend'), primary_key=True)
+    key = Column(String(100), primary_key=True) # fdh_id, region name or headend_id
+    splitter_count = Column(Integer, nullable=False, default=0)
+    port_capacity = Column(Integer, nullable=False, default=0)
+    used_ports = Column(Integer, nullable=False, default=0)
+    max_ports = Column(Integer, nullable=False, default=0) # Sum of FDH.max_ports
+
+class HierarchyVersion(Base):
+    """ A single row, bumped by every hierarchy and port write (see hierarchy_version.py). """
+    __tablename__ = "HierarchyVersion"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
+
 # --- Customer & Asset Models ---
 
 class Customer(Base):
@@ -75,6 +96,18 @@ class Customer(Base):
     # One-to-Many: Customer -> DeploymentTasks
     tasks = relationship("DeploymentTask", back_populates="customer")
 
+    # A splitter port can only ever hold one customer
+    __table_args__ = (
+        UniqueConstraint("splitter_id", "assigned_port", name="uq_Customer_splitter_port"),
+    )
+
+class CustomerAncestry(Base):
+    """ Closure of the hierarchy: a customer and each node on its path (see ancestry.py). """
+    __tablename__ = "CustomerAncestry"
+    ancestor_type = Column(Enum('headend', 'fdh', 'splitter', 'drop_line'), primary_key=True)
+    ancestor_id = Column(Integer, primary_key=True)
+    customer_id = Column(Integer, ForeignKey("Customer.customer_id"), primary_key=True, index=True)
+
 class Asset(Base):
     """ A physical piece of hardware in inventory. """
     __tablename__ = "Asset"
@@ -88,11 +121,18 @@ class Asset(Base):
     # One-to-Many: Asset -> AssignedAssets (Join Table)
     assignments = relationship("AssignedAssets", back_populates="asset")
 
+class AssetSearchTrigram(Base):
+    """ Trigram index over Asset serial_number/model/location for substring search (see asset_search.py). """
+    __tablename__ = "AssetSearchTrigram"
+    trigram = Column(String(3), primary_key=True)
+    field = Column(Enum('serial_number', 'model', 'location'), primary_key=True)
+    asset_id = Column(Integer, ForeignKey("Asset.asset_id"), primary_key=True, index=True)
+
 class AssignedAssets(Base):
     """ Join table linking Customers to their specific Assets (ONTs, Routers). """
     __tablename__ = "AssignedAssets"
     id = Column(Integer, primary_key=True)
-    customer_id = Column(Integer, ForeignKey("Customer.customer_id"))
+    customer_id = Column(Integer, ForeignKey("Customer.customer_id"), index=True)
     asset_id = Column(Integer, ForeignKey("Asset.asset_id"))
     assigned_on = Column(DateTime, default=datetime.datetime.utcnow)
     
@@ -125,6 +165,7 @@ class Technician(Base):
     name = Column(String(100), nullable=False)
     contact = Column(String(50))
     region = Column(String(100))
+    daily_capacity = Column(Integer) # Tasks per day; NULL means dispatch.DEFAULT_DAILY_CAPACITY
     
     # One-to-Many: Technician -> DeploymentTasks
     tasks = relationship("DeploymentTask", back_populates="technician")
@@ -145,6 +186,11 @@ class DeploymentTask(Base):
     # Many-to-One: DeploymentTask -> Technician
     technician = relationship("Technician", back_populates="tasks")
 
+    # A technician's calendar, and (technician_id IS NULL) the dispatch backlog
+    __table_args__ = (
+        Index("ix_DeploymentTask_technician_date", "technician_id", "scheduled_date"),
+    )
+
 class User(Base):
     """ System user for role-based access control. """
     __tablename__ = "User"
@@ -162,6 +208,10 @@ class AuditLog(Base):
     __tablename__ = "AuditLog"
     log_id = Column(Integer, primary_key=True, index=True)
     action_type = Column(String(50))
+    # What changed, in structured form (see audit.AuditEvent)
+    entity_type = Column(String(50))
+    entity_id = Column(Integer)
+    changes = Column(Text) # JSON: {field: [old, new]}
     description = Column(Text)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
     
@@ -169,3 +219,34 @@ class AuditLog(Base):
     
     # Many-to-One: AuditLog -> User
     user = relationship("User", back_populates="logs")
+
+    # Every audit query is "newest first within a time range", optionally
+    # narrowed by action, user or entity; each index ends in (timestamp, log_id)
+    # so it serves both the filter and the keyset ordering.
+    __table_args__ = (
+        Index("ix_AuditLog_timestamp", "timestamp", "log_id"),
+        Index("ix_AuditLog_action_timestamp", "action_type", "timestamp", "log_id"),
+        Index("ix_AuditLog_user_timestamp", "user_id", "timestamp", "log_id"),
+        Index("ix_AuditLog_entity_timestamp", "entity_type", "entity_id", "timestamp", "log_id"),
+    )
+
+class AuditLogArchive(Base):
+    """ Cold storage for AuditLog rows past the retention window (see audit_archive.py). """
+    __tablename__ = "AuditLogArchive"
+    log_id = Column(Integer, primary_key=True, autoincrement=False) # Keeps the original AuditLog ID
+    action_type = Column(String(50))
+    entity_type = Column(String(50))
+    entity_id = Column(Integer)
+    changes = Column(Text)
+    description = Column(Text)
+    timestamp = Column(DateTime, index=True)
+    user_id = Column(Integer)
+
+# --- Schema Bookkeeping ---
+
+class SchemaVersion(Base):
+    """ One row per applied schema migration (see migrations.py). """
+    __tablename__ = "SchemaVersion"
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(100), nullable=False)
+    applied_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
@@ -0,0 +1,231 @@
+"""
+Optical link budget per drop line: headend -> FDH -> splitter -> customer.
+
+The loss along a customer's path, in dB, has three parts:
+  - fiber:    FIBER_DB_PER_KM x (the FDH's feeder length + the drop length);
+  - splitter: 10 log10(N) + SPLITTER_EXCESS_DB x log2(N) for a 1:N splitter.
+              N comes from Splitter.model (e.g. "1:32"), falling back to
+              port_capacity;
+  - fixed:    connectors and splices, FIXED_LOSS_DB.
+The margin is BUDGET_DB minus the loss. A line is below margin when its
+margin is under MIN_MARGIN_DB. Lines with an unknown feeder or drop length
+use DEFAULT_FEEDER_METERS / DEFAULT_DROP_METERS and are flagged as
+estimated. The defaults describe GPON class B+ optics at 1310 nm; set the
+POWER_* variables to match the plant.
+
+Budgets are computed in batches over NumPy arrays. One query fetches the
+numeric columns of every drop line in a splitter, an FDH or the whole
+network, and another fetches their splitters. The split-ratio parsing
+happens once per splitter, and every line's loss then comes out of a few
+array operations, so a million lines take a few tens of milliseconds.
+
+Reading a million rows from the database costs more than the arithmetic.
+The network-wide report therefore keeps a snapshot of all lines and reuses
+it for SNAPSHOT_MAX_AGE seconds. Age is the only test: the snapshot can't
+see writes made by other workers, so it lags the database by at most
+that long, whoever made the change. Splitter, FDH and customer budgets
+always read the database.
+"""
+from dataclasses import dataclass
+from sqlalchemy import Float, and_, cast, select
+from sqlalchemy.orm import Session
+import numpy as np
+import os
+import re
+import threading
+import time
+import models
+
+BUDGET_DB = float(os.getenv("POWER_BUDGET_DB", "28.0"))
+MIN_MARGIN_DB = float(os.getenv("POWER_MIN_MARGIN_DB", "3.0"))
+FIBER_DB_PER_KM = float(os.getenv("POWER_FIBER_DB_PER_KM", "0.35"))
+SPLITTER_EXCESS_DB = float(os.getenv("POWER_SPLITTER_EXCESS_DB", "0.4")) # Per 1:2 stage
+FIXED_LOSS_DB = float(os.getenv("POWER_FIXED_LOSS_DB", "1.5"))
+DEFAULT_FEEDER_METERS = float(os.getenv("POWER_DEFAULT_FEEDER_METERS", "5000"))
+DEFAULT_DROP_METERS = float(os.getenv("POWER_DEFAULT_DROP_METERS", "150"))
+SNAPSHOT_MAX_AGE = float(os.getenv("POWER_SNAPSHOT_MAX_AGE", "30"))
+
+_RATIO = re.compile(r"1\s*[:x/]\s*(\d+)")
+
+def split_ratio(model: str | None, port_capacity: int | None) -> int:
+    """N for a 1:N splitter, from its model name or else its port count"""
+    match = _RATIO.search(model or "")
+    if match and int(match.group(1)) > 0:
+        return int(match.group(1))
+    return max(port_capacity or 1, 1)
+
+
+@dataclass
+class Lines:
+    """Drop lines as parallel arrays, one element per line"""
+    line_id: np.ndarray
+    customer_id: np.ndarray
+    splitter_id: np.ndarray
+    fdh_id: np.ndarray # -1 when the splitter has no FDH
+    drop_m: np.ndarray # NaN when unknown
+    feeder_m: np.ndarray # NaN when unknown
+    ratio: np.ndarray
+
+    def __len__(self):
+        return len(self.line_id)
+
+@dataclass
+class Budget:
+    lines: Lines
+    fiber_db: np.ndarray
+    splitter_db: np.ndarray
+    loss_db: np.ndarray
+    margin_db: np.ndarray
+    estimated: np.ndarray
+
+
+# --- Loading ---
+
+def load(db: Session, splitter_id: int | None = None, fdh_id: int | None = None,
+         customer_id: int | None = None) -> Lines:
+    """
+    Live drop lines of one splitter, FDH or customer (or all of them), in two
+    queries. As for ancestry, a line is live when it is Active and comes from
+    the customer's current splitter: a customer moved to another splitter
+    may still have the old one.
+    """
+    line, splitter, fdh, customer = models.FiberDropLine, models.Splitter, models.FDH, models.Customer
+    lines = (
+        select(line.line_id, line.to_customer_id, line.from_splitter_id, cast(line.length_meters, Float))
+        .join(customer, and_(customer.customer_id == line.to_customer_id,
+                             customer.splitter_id == line.from_splitter_id))
+        .where(line.status == "Active")
+        .order_by(line.line_id)
+    )
+    splitters = (
+        select(splitter.splitter_id, splitter.fdh_id, splitter.model, splitter.port_capacity, fdh.feeder_length_meters)
+        .outerjoin(fdh, fdh.fdh_id == splitter.fdh_id)
+        .order_by(splitter.splitter_id)
+    )
+    if splitter_id is not None:
+        lines = lines.where(line.from_splitter_id == splitter_id)
+        splitters = splitters.where(splitter.splitter_id == splitter_id)
+    if fdh_id is not None:
+        lines = lines.join(splitter, splitter.splitter_id == line.from_splitter_id).where(splitter.fdh_id == fdh_id)
+        splitters = splitters.where(splitter.fdh_id == fdh_id)
+    if customer_id is not None:
+        lines = lines.where(line.to_customer_id == customer_id)
+        splitters = splitters.where(
+            splitter.splitter_id.in_(select(customer.splitter_id).where(customer.customer_id == customer_id))
+        )
+
+    # Core execution on the session's connection skips the ORM result layer,
+    # and NumPy converts plain tuples many times faster than Row objects
+    connection = db.connection()
+    rows = [tuple(row) for row in connection.execute(lines)]
+    line_data = np.array(rows, dtype=np.float64).reshape(len(rows), 4)
+    split_rows = connection.execute(splitters).all()
+
+    # Per-splitter values, then gathered onto the lines by position
+    split_ids = np.array([row[0] for row in split_rows], dtype=np.int64)
+    split_fdh = np.array([row[1] if row[1] is not None else -1 for row in split_rows], dtype=np.int64)
+    split_ratio_ = np.array([split_ratio(row[2], row[3]) for row in split_rows], dtype=np.float64)
+    split_feeder = np.array([row[4] for row in split_rows], dtype=np.float64)
+
+    line_splitter = line_data[:, 2].astype(np.int64)
+    position = np.minimum(np.searchsorted(split_ids, line_splitter), max(len(split_ids) - 1, 0))
+    # Lines whose splitter row is gone (SQLite doesn't enforce the foreign key)
+    known = split_ids[position] == line_splitter if len(split_ids) else np.zeros(len(rows), dtype=bool)
+    position, line_data, line_splitter = position[known], line_data[known], line_splitter[known]
+
+    return Lines(
+        line_id=line_data[:, 0].astype(np.int64),
+        customer_id=line_data[:, 1].astype(np.int64),
+        splitter_id=line_splitter,
+        fdh_id=split_fdh[position],
+        drop_m=line_data[:, 3],
+        feeder_m=split_feeder[position],
+        ratio=split_ratio_[position],
+    )
+
+
+_snapshot_lock = threading.Lock()
+_snapshot: tuple[float, Lines] | None = None # (loaded at, lines)
+
+def network(db: Session) -> Lines:
+    """Every live drop line, from the snapshot while it is younger than SNAPSHOT_MAX_AGE"""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is not None and time.monotonic() - _snapshot[0] < SNAPSHOT_MAX_AGE:
+            return _snapshot[1]
+        lines = load(db)
+        _snapshot = (time.monotonic(), lines)
+        return lines
+
+
+# --- Computing ---
+
+def evaluate(lines: Lines) -> Budget:
+    """Loss and margin of every line, as arrays"""
+    feeder = np.where(np.isnan(lines.feeder_m), DEFAULT_FEEDER_METERS, lines.feeder_m)
+    drop = np.where(np.isnan(lines.drop_m), DEFAULT_DROP_METERS, lines.drop_m)
+    fiber_db = FIBER_DB_PER_KM * (feeder + drop) / 1000.0
+    splitter_db = 10.0 * np.log10(lines.ratio) + SPLITTER_EXCESS_DB * np.log2(lines.ratio)
+    loss_db = fiber_db + splitter_db + FIXED_LOSS_DB
+    return Budget(
+        lines=lines,
+        fiber_db=fiber_db,
+        splitter_db=splitter_db,
+        loss_db=loss_db,
+        margin_db=BUDGET_DB - loss_db,
+        estimated=np.isnan(lines.feeder_m) | np.isnan(lines.drop_m),
+    )
+
+def below_margin(budget: Budget, min_margin_db: float = MIN_MARGIN_DB, limit: int | None = None) -> np.ndarray:
+    """Positions of the lines under min_margin_db, worst first (the `limit` worst if given)"""
+    under = np.flatnonzero(budget.margin_db < min_margin_db)
+    if limit is not None and limit < len(under):
+        under = under[np.argpartition(budget.margin_db[under], limit)[:limit]]
+    return under[np.argsort(budget.margin_db[under], kind="stable")]
+
+def summary(budget: Budget, min_margin_db: float = MIN_MARGIN_DB, where: np.ndarray | None = None) -> dict:
+    """Counts and margin statistics over all lines, or those selected by the boolean mask `where`"""
+    margins = budget.margin_db if where is None else budget.margin_db[where]
+    estimated = budget.estimated if where is None else budget.estimated[where]
+    return {
+        "lines": len(margins),
+        "below_margin": int(np.count_nonzero(margins < min_margin_db)),
+        "estimated": int(np.count_nonzero(estimated)),
+        "min_margin_db": round(float(margins.min()), 2) if len(margins) else None,
+        "median_margin_db": round(float(np.median(margins)), 2) if len(margins) else None,
+        "budget_db": BUDGET_DB,
+        "min_margin_threshold_db": min_margin_db,
+    }
+
+def rows(budget: Budget, positions=None, min_margin_db: float = MIN_MARGIN_DB) -> list[dict]:
+    """Plain dicts (schemas.LinkBudget) for the given line positions, or all lines"""
+    if positions is None:
+        positions = np.arange(len(budget.margin_db))
+    lines = budget.lines
+
+    def column(values, decimals=None):
+        values = values[positions]
+        return (np.round(values, decimals) if decimals is not None else values).tolist()
+
+    def lengths(values):
+        # NaN (unknown) -> None
+        return [None if value != value else value for value in values[positions].tolist()]
+
+    fdh_ids = [None if fdh_id < 0 else fdh_id for fdh_id in column(lines.fdh_id)]
+    margins = column(budget.margin_db, 2)
+    return [
+        {
+            "line_id": line_id, "customer_id": customer_id, "splitter_id": splitter_id, "fdh_id": fdh_id,
+            "split_ratio": int(ratio), "drop_length_meters": drop_m, "feeder_length_meters": feeder_m,
+            "fiber_loss_db": fiber_db, "splitter_loss_db": splitter_db, "fixed_loss_db": FIXED_LOSS_DB,
+            "total_loss_db": loss_db, "margin_db": margin_db, "below_margin": margin_db < min_margin_db,
+            "estimated": estimated,
+        }
+        for line_id, customer_id, splitter_id, fdh_id, ratio, drop_m, feeder_m,
+            fiber_db, splitter_db, loss_db, margin_db, estimated in zip(
+            column(lines.line_id), column(lines.customer_id), column(lines.splitter_id), fdh_ids,
+            column(lines.ratio), lengths(lines.drop_m), lengths(lines.feeder_m),
+            column(budget.fiber_db, 2), column(budget.splitter_db, 2), column(budget.loss_db, 2), margins,
+            column(budget.estimated),
+        )
+    ]
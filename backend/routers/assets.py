@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 import models, schemas, crud
-from database import get_db
+from database import get_session, run_db, AnySession
+from fast_json import fast_json
 from typing import List
+import csv
+import io
+import json
 
 router = APIRouter(
     prefix="/api/inventory-assets", # Changed prefix
@@ -10,39 +13,90 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.Asset, status_code=201)
-def create_new_asset(asset: schemas.AssetCreate, db: Session = Depends(get_db)):
+async def create_new_asset(asset: schemas.AssetCreate, db: AnySession = Depends(get_session)):
     """ Add a new asset to the inventory (ONT, Router, etc.). """
-    return crud.create_asset(db=db, asset=asset)
+    return await run_db(db, crud.create_asset, asset=asset)
 
-@router.get("/", response_model=List[schemas.Asset])
-def read_assets(
+@router.post("/bulk", response_model=schemas.AssetImportReport)
+async def bulk_import_assets(
+    request: Request,
+    batch_size: int = Query(500, ge=1, le=5000),
+    db: AnySession = Depends(get_session)
+):
+    """
+    Import many assets in one request.
+    Send either a JSON array of assets (Content-Type: application/json) or a
+    CSV file with a header row (Content-Type: text/csv). Returns a per-row
+    report of accepted and rejected rows.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("text/csv"):
+        try:
+            text = body.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+        reader = csv.DictReader(io.StringIO(text))
+        # Blank CSV cells mean "not given", so model defaults apply
+        rows = [{k: v for k, v in row.items() if k and v not in (None, "")} for row in reader]
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or CSV")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or CSV")
+
+    return await run_db(db, crud.bulk_create_assets, rows=rows, batch_size=batch_size)
+
+@router.get("/", response_model=schemas.AssetPage)
+async def read_assets(
+    response: Response,
     asset_type: schemas.AssetType | None = Query(None), # Use Query for clarity
     status: schemas.AssetStatus | None = Query(None),
     location: str | None = Query(None, description="Filter by location (partial match)"), # Add this
-    db: Session = Depends(get_db)
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AnySession = Depends(get_session)
 ):
-    """ Get a list of all assets, with optional filtering. """
-    return crud.get_assets(
-        db=db, 
+    """ Get a page of assets, with optional filtering. """
+    page = await run_db(
+        db, crud.get_assets,
         asset_type=asset_type, 
         status=status, 
-        location=location  # Pass it to the crud function
+        location=location,  # Pass it to the crud function
+        cursor=cursor,
+        limit=limit,
+        plain=True
     )
+    return fast_json(page, response)
+
+@router.get("/search", response_model=List[schemas.Asset])
+async def search_assets(
+    q: str = Query(..., min_length=1, description="Partial serial number, model or location"),
+    asset_type: schemas.AssetType | None = Query(None),
+    status: schemas.AssetStatus | None = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: AnySession = Depends(get_session)
+):
+    """ Ranked partial-match search across serial number, model and location. """
+    return await run_db(db, crud.search_assets, q=q, asset_type=asset_type, status=status, limit=limit)
 
 @router.get("/{asset_id}", response_model=schemas.Asset)
-def read_asset(asset_id: int, db: Session = Depends(get_db)):
+async def read_asset(asset_id: int, db: AnySession = Depends(get_session)):
     """ Get a single asset by its ID. """
-    db_asset = crud.get_asset_by_id(db, asset_id)
+    db_asset = await run_db(db, crud.get_asset_by_id, asset_id)
     if db_asset is None:
         raise HTTPException(status_code=404, detail="Asset not found")
     return db_asset
 
 @router.put("/{asset_id}", response_model=schemas.Asset)
-def update_existing_asset(asset_id: int, asset_update: schemas.AssetUpdate, db: Session = Depends(get_db)):
+async def update_existing_asset(asset_id: int, asset_update: schemas.AssetUpdate, db: AnySession = Depends(get_session)):
     """ Update an asset's status or location. """
-    return crud.update_asset(db=db, asset_id=asset_id, asset_update=asset_update)
+    return await run_db(db, crud.update_asset, asset_id=asset_id, asset_update=asset_update)
 
 @router.delete("/{asset_id}", response_model=schemas.Asset)
-def retire_asset(asset_id: int, db: Session = Depends(get_db)):
+async def retire_asset(asset_id: int, db: AnySession = Depends(get_session)):
     """ 'Delete' an asset by setting its status to Retired (soft delete). """
-    return crud.delete_asset(db=db, asset_id=asset_id)
\ No newline at end of file
+    return await run_db(db, crud.delete_asset, asset_id=asset_id)
\ No newline at end of file
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Query
+import schemas, crud
+from database import get_session, run_db, AnySession
+import datetime
+
+router = APIRouter(
+    prefix="/api/audit-logs",
+    tags=["Audit Log"]
+)
+
+@router.get("/", response_model=schemas.AuditLogPage)
+async def read_audit_logs(
+    start: datetime.datetime | None = Query(None, description="Only entries at or after this time (UTC)"),
+    end: datetime.datetime | None = Query(None, description="Only entries before this time (UTC)"),
+    action_type: str | None = Query(None, description="e.g. 'Asset Update'"),
+    user_id: int | None = Query(None),
+    entity_type: str | None = Query(None, description="e.g. 'Asset', 'FDH', 'Splitter'"),
+    entity_id: int | None = Query(None),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AnySession = Depends(get_session)
+):
+    """ Get a page of audit entries, newest first, with time-range and other filters. """
+    return await run_db(
+        db, crud.get_audit_logs,
+        start=start, end=end,
+        action_type=action_type, user_id=user_id,
+        entity_type=entity_type, entity_id=entity_id,
+        cursor=cursor, limit=limit
+    )
\ No newline at end of file
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+import schemas, crud
+import auth
+from database import get_session, run_db, AnySession
+
+router = APIRouter(
+    prefix="/api/auth",
+    tags=["Authentication"]
+)
+
+@router.post("/login", response_model=schemas.Token)
+async def login(credentials: schemas.LoginRequest, db: AnySession = Depends(get_session)):
+    """ Exchange a username and password for a bearer token. """
+    user = await run_db(db, crud.get_user_by_username, credentials.username)
+    # Argon2 runs on auth's own worker pool, never on the event loop
+    valid, new_hash = await auth.verify_password(credentials.password, user.password_hash if user else None)
+    if not valid:
+        raise HTTPException(
+            status_code=401,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    token = auth.issue_token(user)
+    await run_db(db, crud.record_login, user.user_id, new_hash)
+    return token
+
+@router.get("/me", response_model=schemas.AuthUser)
+async def read_current_user(principal: auth.Principal | None = Depends(auth.authenticate)):
+    """ Who the bearer token belongs to. """
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return principal
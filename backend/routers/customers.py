@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 import models, schemas, crud # Import crud
-from database import get_db
+from database import get_session, run_db, AnySession
+from fast_json import fast_json
 from typing import List
 
 router = APIRouter(
@@ -10,19 +10,25 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.Customer, status_code=201)
-def create_customer(customer: schemas.CustomerCreate, db: Session = Depends(get_db)):
+async def create_customer(customer: schemas.CustomerCreate, db: AnySession = Depends(get_session)):
     """ Create a new customer profile. """
-    return crud.create_customer(db=db, customer=customer) # Use crud
+    return await run_db(db, crud.create_customer, customer=customer) # Use crud
 
-@router.get("/", response_model=List[schemas.Customer])
-def get_all_customers(db: Session = Depends(get_db)):
-    """ Get a list of all customers. """
-    return crud.get_customers(db=db) # Use crud
+@router.get("/", response_model=schemas.CustomerPage)
+async def get_all_customers(
+    response: Response,
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AnySession = Depends(get_session)
+):
+    """ Get a page of customers, ordered by ID. """
+    page = await run_db(db, crud.get_customers, cursor=cursor, limit=limit, plain=True) # Use crud
+    return fast_json(page, response)
 
 @router.get("/{customer_id}", response_model=schemas.Customer)
-def get_customer(customer_id: int, db: Session = Depends(get_db)):
+async def get_customer(customer_id: int, db: AnySession = Depends(get_session)):
     """ Get a specific customer by their ID. """
-    customer = crud.get_customer_by_id(db, customer_id) # Use crud
+    customer = await run_db(db, crud.get_customer_by_id, customer_id) # Use crud
     if customer is None:
         raise HTTPException(status_code=404, detail="Customer not found")
     return customer
\ No newline at end of file
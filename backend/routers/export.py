@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import schemas, crud
+from database import get_session, AnySession
+import csv
+import datetime
+import decimal
+import io
+import json
+
+router = APIRouter(
+    prefix="/api/export",
+    tags=["Export"]
+)
+
+def _json_default(value):
+    """ Encode the column types the stdlib JSON encoder doesn't know about """
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _format_ndjson(rows) -> str:
+    return "".join(json.dumps(dict(row), default=_json_default) + "\n" for row in rows)
+
+def _csv_formatter(columns):
+    """ Returns (header line, function formatting a chunk of rows as CSV lines) """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def format_rows(rows) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([row[column] for column in columns] for row in rows)
+        return buffer.getvalue()
+
+    return format_rows([dict(zip(columns, columns))]), format_rows
+
+def _sync_body(chunks, header, format_rows):
+    # Iterated on the threadpool by StreamingResponse, so blocking fetches are fine
+    if header:
+        yield header
+    for rows in chunks:
+        yield format_rows(rows)
+
+async def _async_body(db: AsyncSession, entity, chunk_size, header, format_rows):
+    if header:
+        yield header
+    result = await db.stream(crud.export_statement(entity), execution_options={"yield_per": chunk_size})
+    async for rows in result.mappings().partitions():
+        yield format_rows(rows)
+
+@router.get("/{entity}")
+async def export_table(
+    entity: schemas.ExportEntity,
+    format: schemas.ExportFormat = Query(schemas.ExportFormat.ndjson),
+    chunk_size: int = Query(1000, ge=100, le=10000),
+    db: AnySession = Depends(get_session)
+):
+    """
+    Stream a full table dump as NDJSON or CSV.
+    Rows are fetched and written chunk by chunk, so the first bytes go out
+    immediately and memory use does not grow with the table.
+    """
+    if format == schemas.ExportFormat.csv:
+        header, format_rows = _csv_formatter(crud.export_columns(entity))
+        media_type = "text/csv"
+    else:
+        header, format_rows = None, _format_ndjson
+        media_type = "application/x-ndjson"
+
+    if isinstance(db, AsyncSession):
+        body = _async_body(db, entity, chunk_size, header, format_rows)
+    else:
+        chunks = crud.stream_export_rows(db, entity, chunk_size=chunk_size)
+        body = _sync_body(chunks, header, format_rows)
+
+    filename = f"{entity.value}.{format.value}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
\ No newline at end of file
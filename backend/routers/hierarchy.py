@@ -1,47 +1,87 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Response
 import models, schemas, crud
-from database import get_db
-from typing import List
+from database import get_session, run_db, AnySession
+from etag import hierarchy_conditional_get
+from fast_json import fast_json
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/api/network-hierarchy",
-    tags=["Network Hierarchy"]
+    tags=["Network Hierarchy"],
+    # ETag on every GET from the hierarchy version; If-None-Match is
+    # answered with 304 after one primary key read (see etag.py)
+    dependencies=[Depends(hierarchy_conditional_get)]
 )
 
+# Headend/FDH responses nest relationships, so they are converted inside
+# run_db (response_model=...) while the session can still load them.
+# The list routes skip that: crud returns plain column dicts (plain=True)
+# and fast_json encodes them with orjson.
+
 # --- Headends ---
 @router.post("/headends", response_model=schemas.Headend, status_code=201)
-def create_headend(headend: schemas.HeadendCreate, db: Session = Depends(get_db)):
-    return crud.create_headend(db=db, headend=headend)
+async def create_headend(headend: schemas.HeadendCreate, db: AnySession = Depends(get_session)):
+    return await run_db(db, crud.create_headend, headend=headend, response_model=schemas.Headend)
 
 @router.get("/headends", response_model=List[schemas.Headend])
-def get_all_headends(db: Session = Depends(get_db)):
-    return crud.get_headends(db=db)
+async def get_all_headends(response: Response, db: AnySession = Depends(get_session)):
+    return fast_json(await run_db(db, crud.get_headends, plain=True), response)
 
 # --- FDHs ---
 @router.post("/fdhs", response_model=schemas.FDH, status_code=201)
-def create_fdh(fdh: schemas.FDHCreate, db: Session = Depends(get_db)):
-    return crud.create_fdh(db=db, fdh=fdh)
+async def create_fdh(fdh: schemas.FDHCreate, db: AnySession = Depends(get_session)):
+    return await run_db(db, crud.create_fdh, fdh=fdh, response_model=schemas.FDH)
 
 @router.get("/fdhs", response_model=List[schemas.FDH])
-def get_all_fdhs(db: Session = Depends(get_db)):
-    return crud.get_fdhs(db=db)
+async def get_all_fdhs(response: Response, db: AnySession = Depends(get_session)):
+    return fast_json(await run_db(db, crud.get_fdhs, plain=True), response)
 
 @router.put("/fdhs/{fdh_id}", response_model=schemas.FDH) # --- NEW ---
-def update_fdh(fdh_id: int, fdh_update: schemas.FDHUpdate, db: Session = Depends(get_db)):
+async def update_fdh(fdh_id: int, fdh_update: schemas.FDHUpdate, db: AnySession = Depends(get_session)):
     """ Update an FDH's details (name, location, region) """
-    return crud.update_fdh(db=db, fdh_id=fdh_id, fdh_update=fdh_update)
+    return await run_db(db, crud.update_fdh, fdh_id=fdh_id, fdh_update=fdh_update, response_model=schemas.FDH)
 
 # --- Splitters ---
 @router.post("/splitters", response_model=schemas.Splitter, status_code=201)
-def create_splitter(splitter: schemas.SplitterCreate, db: Session = Depends(get_db)):
-    return crud.create_splitter(db=db, splitter=splitter)
+async def create_splitter(splitter: schemas.SplitterCreate, db: AnySession = Depends(get_session)):
+    return await run_db(db, crud.create_splitter, splitter=splitter)
 
 @router.get("/splitters", response_model=List[schemas.Splitter])
-def get_all_splitters(db: Session = Depends(get_db)):
-    return crud.get_splitters(db=db)
+async def get_all_splitters(response: Response, db: AnySession = Depends(get_session)):
+    return fast_json(await run_db(db, crud.get_splitters, plain=True), response)
 
 @router.put("/splitters/{splitter_id}", response_model=schemas.Splitter) # --- NEW ---
-def update_splitter(splitter_id: int, splitter_update: schemas.SplitterUpdate, db: Session = Depends(get_db)):
+async def update_splitter(splitter_id: int, splitter_update: schemas.SplitterUpdate, db: AnySession = Depends(get_session)):
     """ Update a splitter's internal location or move it to a new FDH """
-    return crud.update_splitter(db=db, splitter_id=splitter_id, splitter_update=splitter_update)
\ No newline at end of file
+    return await run_db(db, crud.update_splitter, splitter_id=splitter_id, splitter_update=splitter_update)
+# --- Port Allocation ---
+@router.get("/splitters/{splitter_id}/ports", response_model=schemas.SplitterPorts)
+async def get_splitter_ports(splitter_id: int, db: AnySession = Depends(get_session)):
+    """ Capacity, usage and free ports of a splitter """
+    return await run_db(db, crud.get_splitter_ports, splitter_id=splitter_id)
+
+@router.post("/splitters/{splitter_id}/assignments", response_model=schemas.Customer, status_code=201)
+async def assign_customer_port(splitter_id: int, assignment: schemas.PortAssignment, db: AnySession = Depends(get_session)):
+    """ Connect a customer to a port on this splitter (the lowest free one unless a port is given) """
+    return await run_db(db, crud.assign_customer_port, splitter_id=splitter_id, assignment=assignment)
+
+@router.delete("/splitters/{splitter_id}/assignments/{customer_id}", response_model=schemas.Customer)
+async def release_customer_port(splitter_id: int, customer_id: int, db: AnySession = Depends(get_session)):
+    """ Disconnect a customer from this splitter and free its port """
+    return await run_db(db, crud.release_customer_port, splitter_id=splitter_id, customer_id=customer_id)
+
+@router.post("/fdhs/{fdh_id}/assignments", response_model=List[schemas.Customer], status_code=201)
+async def bulk_assign_customer_ports(fdh_id: int, assignment: schemas.BulkPortAssignment, db: AnySession = Depends(get_session)):
+    """ Spread customers over the least utilized splitters of an FDH """
+    return await run_db(db, crud.bulk_assign_customer_ports, fdh_id=fdh_id, customer_ids=assignment.customer_ids)
+
+# --- Capacity ---
+@router.get("/capacity", response_model=List[schemas.CapacityRollup])
+async def get_capacity(level: Optional[schemas.CapacityLevel] = None, db: AnySession = Depends(get_session)):
+    """ Port utilization rolled up per FDH, region and headend """
+    return await run_db(db, crud.get_capacity, level=level)
+
+@router.get("/capacity/{level}/{key}", response_model=schemas.CapacityRollup)
+async def get_capacity_node(level: schemas.CapacityLevel, key: str, db: AnySession = Depends(get_session)):
+    """ Port utilization of one FDH (by ID), region (by name) or headend (by ID) """
+    return await run_db(db, crud.get_capacity_node, level=level, key=key)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Query, WebSocket
+import auth
+import events
+
+router = APIRouter(
+    prefix="/api/events",
+    tags=["Live Updates"]
+)
+
+@router.websocket("")
+async def change_events(
+    websocket: WebSocket,
+    topics: str | None = Query(None, description="Comma-separated topics to start with"),
+    token: str | None = Query(None, description="Bearer token; browsers can't set headers on a WebSocket"),
+):
+    """
+    Push channel for change events (see events.py). Send
+    {"subscribe": [...]} / {"unsubscribe": [...]} to change topics; every
+    frame from the server is a JSON array of events.
+    """
+    try:
+        principal = auth.verify_token(token) if token else None
+    except HTTPException:
+        await websocket.close(code=1008, reason="Invalid token")
+        return
+    if principal is None and auth.AUTH_REQUIRED:
+        await websocket.close(code=1008, reason="Not authenticated")
+        return
+    await websocket.accept()
+    await events.serve(websocket, [topic for topic in (topics or "").split(",") if topic])
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+import schemas, crud
+from database import get_session, run_db, AnySession
+
+router = APIRouter(
+    prefix="/api/stats",
+    tags=["Dashboard"]
+)
+
+@router.get("/", response_model=schemas.DashboardStats)
+async def get_dashboard_stats(db: AnySession = Depends(get_session)):
+    """ Aggregate counts for the dashboard (customers, assets, hierarchy, tasks). """
+    return await run_db(db, crud.get_stats)
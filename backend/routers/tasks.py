@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+import schemas, crud
+from database import get_session, run_db, AnySession
+from typing import List
+import datetime
+
+router = APIRouter(
+    prefix="/api/tasks",
+    tags=["Deployment Tasks"]
+)
+
+# --- Technicians ---
+
+@router.get("/technicians", response_model=List[schemas.Technician])
+async def read_technicians(region: str | None = Query(None), db: AnySession = Depends(get_session)):
+    """ Get all field technicians, optionally for one region. """
+    return await run_db(db, crud.get_technicians, region=region)
+
+@router.post("/technicians", response_model=schemas.Technician, status_code=201)
+async def create_technician(technician: schemas.TechnicianCreate, db: AnySession = Depends(get_session)):
+    """ Add a field technician. """
+    return await run_db(db, crud.create_technician, technician=technician)
+
+# --- Scheduling ---
+
+@router.post("/schedule", response_model=schemas.ScheduleReport)
+async def schedule_tasks(request: schemas.ScheduleRequest, db: AnySession = Depends(get_session)):
+    """
+    Dispatch every unscheduled task to a technician and a day in the window,
+    by region, daily capacity and neighborhood. Tasks that can't be placed
+    are listed with the reason. Set dry_run to preview the plan.
+    """
+    return await run_db(db, crud.schedule_tasks, request=request)
+
+# --- Tasks ---
+
+@router.post("/", response_model=schemas.DeploymentTask, status_code=201)
+async def create_task(task: schemas.DeploymentTaskCreate, db: AnySession = Depends(get_session)):
+    """ Create an installation or maintenance task for a customer. """
+    return await run_db(db, crud.create_task, task=task)
+
+@router.get("/", response_model=schemas.DeploymentTaskPage)
+async def read_tasks(
+    status: schemas.TaskStatus | None = Query(None),
+    technician_id: int | None = Query(None),
+    customer_id: int | None = Query(None),
+    unassigned: bool | None = Query(None, description="Only tasks without (true) or with (false) a technician"),
+    date_from: datetime.date | None = Query(None),
+    date_to: datetime.date | None = Query(None),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AnySession = Depends(get_session)
+):
+    """ Get a page of tasks, ordered by ID, with optional filtering. """
+    return await run_db(
+        db, crud.get_tasks,
+        status=status,
+        technician_id=technician_id,
+        customer_id=customer_id,
+        unassigned=unassigned,
+        date_from=date_from,
+        date_to=date_to,
+        cursor=cursor,
+        limit=limit
+    )
+
+@router.get("/{task_id}", response_model=schemas.DeploymentTask)
+async def read_task(task_id: int, db: AnySession = Depends(get_session)):
+    """ Get a single task by its ID. """
+    task = await run_db(db, crud.get_task_by_id, task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+@router.put("/{task_id}", response_model=schemas.DeploymentTask)
+async def update_task(task_id: int, task_update: schemas.DeploymentTaskUpdate, db: AnySession = Depends(get_session)):
+    """ Update a task's status, date, technician or notes. """
+    return await run_db(db, crud.update_task, task_id=task_id, task_update=task_update)
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 import models, schemas, crud
-from database import get_db
+import graph_index
+import power_budget
+from database import get_session, run_db, AnySession
+from etag import conditional_get
+from fast_json import fast_json
 from typing import List, Dict, Any
 
 router = APIRouter(
@@ -27,17 +31,61 @@ def format_node(item_id: str, label: str, type: str, status: str, x: int, y: int
         "type": "custom" # This will match our custom node in React
     }
 
-def format_edge(source_id: str, target_id: str) -> Dict[str, Any]:
+def format_edge(source_id: str, target_id: str, data: Dict[str, Any] | None = None) -> Dict[str, Any]:
     """ Helper function to create an edge for React Flow """
-    return {
+    edge = {
         "id": f"e-{source_id}-to-{target_id}",
         "source": source_id,
         "target": target_id,
         "animated": False
     }
+    if data:
+        edge["data"] = data
+    return edge
+
+def format_drop_line(drop_line) -> Dict[str, Any] | None:
+    """ Edge data for the fiber drop between a splitter and a customer """
+    if drop_line is None:
+        return None
+    length = drop_line.length_meters
+    return {
+        "lineId": drop_line.line_id,
+        "lengthMeters": float(length) if length is not None else None,
+        "status": drop_line.status
+    }
+
+def _customer_paths(db: Session, customer_ids: List[int]) -> Dict[int, tuple]:
+    """
+    Resolve (customer, splitter, fdh, headend) for each ID from the graph index.
+    Customers the index doesn't know yet, or whose splitter, FDH or headend
+    it doesn't (e.g. created by another worker), are fetched with one joined
+    query and added to it.
+    """
+    graph = graph_index.get_index(db)
+    paths = {}
+    misses = []
+    for customer_id in customer_ids:
+        path = graph.customer_path(customer_id)
+        if path:
+            paths[customer_id] = path
+        else:
+            misses.append(customer_id)
+
+    if misses:
+        for customer in crud.get_customer_paths(db, misses):
+            graph.add_customer_chain(customer)
+            splitter = customer.splitter
+            fdh = splitter.fdh if splitter else None
+            # The database's chain as a last resort, e.g. for a dangling splitter_id
+            paths[customer.customer_id] = (
+                graph.customer_path(customer.customer_id) or (customer, splitter, fdh, fdh.headend if fdh else None)
+            )
+    return paths
+
+# Graph builders are plain sync functions over a Session; the async routes
+# below run them through run_db.
 
-@router.get("/customer/{customer_id}")
-def get_customer_topology(customer_id: int, db: Session = Depends(get_db)):
+def build_customer_topology(db: Session, customer_id: int):
     """
     Generate the full network path for a single customer.
     Traverses: Headend -> FDH -> Splitter -> Customer -> ONT/Router
@@ -45,9 +93,10 @@ def get_customer_topology(customer_id: int, db: Session = Depends(get_db)):
     nodes = []
     edges = []
     
-    customer = crud.get_customer_by_id(db, customer_id)
-    if not customer:
+    path = _customer_paths(db, [customer_id]).get(customer_id)
+    if not path:
         raise HTTPException(status_code=404, detail="Customer not found")
+    customer, splitter, fdh, headend = path
 
     y_pos = 0
     
@@ -61,13 +110,12 @@ def get_customer_topology(customer_id: int, db: Session = Depends(get_db)):
     # We will implement this in the next sprint (Asset Assignment)
     # For now, we'll just show the customer
     
-    if not customer.splitter_id:
+    if not splitter:
         # Customer is not assigned, return just the customer node
         return {"nodes": nodes, "edges": edges}
 
     # 3. Splitter Node
     y_pos += 150
-    splitter = crud.get_splitter_by_id(db, customer.splitter_id)
     split_id = f"split-{splitter.splitter_id}"
     nodes.append(format_node(
         split_id, f"Splitter {splitter.model} ({splitter.location})", "splitter", "Online", 250, y_pos
@@ -75,8 +123,9 @@ def get_customer_topology(customer_id: int, db: Session = Depends(get_db)):
     edges.append(format_edge(split_id, cust_id))
     
     # 4. FDH Node
+    if not fdh:
+        return {"nodes": nodes, "edges": edges}
     y_pos += 150
-    fdh = crud.get_fdh_by_id(db, splitter.fdh_id)
     fdh_id = f"fdh-{fdh.fdh_id}"
     nodes.append(format_node(
         fdh_id, f"FDH {fdh.name}", "fdh", "Online", 250, y_pos
@@ -85,7 +134,6 @@ def get_customer_topology(customer_id: int, db: Session = Depends(get_db)):
     
     # 5. Headend Node
     y_pos += 150
-    headend = db.query(models.Headend).filter(models.Headend.headend_id == fdh.headend_id).first()
     if headend:
         head_id = f"headend-{headend.headend_id}"
         nodes.append(format_node(
@@ -95,8 +143,56 @@ def get_customer_topology(customer_id: int, db: Session = Depends(get_db)):
 
     return {"nodes": nodes, "edges": edges}
 
-@router.get("/fdh/{fdh_id}")
-def get_fdh_topology(fdh_id: int, db: Session = Depends(get_db)):
+def build_customers_topology(db: Session, customer_ids: List[int]):
+    """
+    Generate the merged network paths for many customers at once.
+    Paths come from the graph index (at most one query for customers it
+    hasn't seen); splitters, FDHs and headends shared between customers
+    appear only once in the graph.
+    """
+    paths = _customer_paths(db, customer_ids)
+
+    nodes: Dict[str, Dict[str, Any]] = {}
+    edges: Dict[str, Dict[str, Any]] = {}
+    # Next free x slot per level, so each level is laid out left to right
+    level_x = {0: 0, 150: 0, 300: 0, 450: 0}
+
+    def add_node(node_id: str, label: str, type: str, status: str, y: int):
+        if node_id not in nodes:
+            nodes[node_id] = format_node(node_id, label, type, status, level_x[y], y)
+            level_x[y] += 200
+
+    def add_edge(source_id: str, target_id: str):
+        edge = format_edge(source_id, target_id)
+        edges.setdefault(edge["id"], edge)
+
+    for customer_id in sorted(paths):
+        customer, splitter, fdh, headend = paths[customer_id]
+        cust_id = f"cust-{customer.customer_id}"
+        add_node(cust_id, customer.name, "customer", customer.status, 0)
+
+        if not splitter:
+            continue
+        split_id = f"split-{splitter.splitter_id}"
+        add_node(split_id, f"Splitter {splitter.model} ({splitter.location})", "splitter", "Online", 150)
+        add_edge(split_id, cust_id)
+
+        if not fdh:
+            continue
+        fdh_id = f"fdh-{fdh.fdh_id}"
+        add_node(fdh_id, f"FDH {fdh.name}", "fdh", "Online", 300)
+        add_edge(fdh_id, split_id)
+
+        if headend:
+            head_id = f"headend-{headend.headend_id}"
+            add_node(head_id, f"Headend {headend.name}", "headend", "Online", 450)
+            add_edge(head_id, fdh_id)
+
+    missing = sorted(set(customer_ids) - set(paths))
+
+    return {"nodes": list(nodes.values()), "edges": list(edges.values()), "missing_customer_ids": missing}
+
+def build_fdh_topology(db: Session, fdh_id: int):
     """
     Generate the topology for an FDH, showing its parent and all
     child splitters and their connected customers.
@@ -104,25 +200,29 @@ def get_fdh_topology(fdh_id: int, db: Session = Depends(get_db)):
     nodes = []
     edges = []
     
-    fdh = crud.get_fdh_by_id(db, fdh_id)
-    if not fdh:
-        raise HTTPException(status_code=404, detail="FDH not found")
+    graph = graph_index.get_index(db)
+    tree = graph.fdh_tree(fdh_id)
+    if tree is None:
+        # Not indexed yet: load the whole cabinet in one fetch and index it
+        db_fdh = crud.get_fdh_tree(db, fdh_id)
+        if not db_fdh:
+            raise HTTPException(status_code=404, detail="FDH not found")
+        graph.add_fdh_tree(db_fdh)
+        tree = graph.fdh_tree(fdh_id)
+    fdh, headend, splitters = tree
 
     # 1. FDH Node (Root)
     fdh_node_id = f"fdh-{fdh.fdh_id}"
     nodes.append(format_node(fdh_node_id, f"FDH {fdh.name}", "fdh", "Online", 400, 50))
     
     # 2. Parent Headend
-    if fdh.headend_id:
-        headend = db.query(models.Headend).filter(models.Headend.headend_id == fdh.headend_id).first()
-        if headend:
-            head_id = f"headend-{headend.headend_id}"
-            nodes.append(format_node(head_id, f"Headend {headend.name}", "headend", "Online", 400, 250))
-            edges.append(format_edge(head_id, fdh_node_id))
+    if headend:
+        head_id = f"headend-{headend.headend_id}"
+        nodes.append(format_node(head_id, f"Headend {headend.name}", "headend", "Online", 400, 250))
+        edges.append(format_edge(head_id, fdh_node_id))
             
     # 3. Child Splitters
-    splitters = db.query(models.Splitter).filter(models.Splitter.fdh_id == fdh.fdh_id).all()
-    for i, splitter in enumerate(splitters):
+    for i, (splitter, customers) in enumerate(splitters):
         split_id = f"split-{splitter.splitter_id}"
         split_x_pos = (i * 200) # Spread splitters horizontally
         nodes.append(format_node(
@@ -131,7 +231,6 @@ def get_fdh_topology(fdh_id: int, db: Session = Depends(get_db)):
         edges.append(format_edge(fdh_node_id, split_id))
         
         # 4. Child Customers
-        customers = db.query(models.Customer).filter(models.Customer.splitter_id == splitter.splitter_id).all()
         for j, customer in enumerate(customers):
             cust_id = f"cust-{customer.customer_id}"
             cust_x_pos = split_x_pos + (j * 50) # Stagger customers slightly
@@ -139,22 +238,15 @@ def get_fdh_topology(fdh_id: int, db: Session = Depends(get_db)):
             nodes.append(format_node(
                 cust_id, customer.name, "customer", customer.status, cust_x_pos, cust_y_pos
             ))
-            edges.append(format_edge(split_id, cust_id))
+            edges.append(format_edge(split_id, cust_id, format_drop_line(customer.drop_line)))
 
     return {"nodes": nodes, "edges": edges}
 
-@router.get("/search")
-def search_topology(
-    serial: str | None = Query(None),
-    db: Session = Depends(get_db)
-):
+def build_search_topology(db: Session, serial: str):
     """
     Search for a device by its serial number and return the topology
     for the customer it's assigned to.
     """
-    if not serial:
-        raise HTTPException(status_code=400, detail="Serial number is required")
-        
     # For now, we only search inventory assets (ONT/Router)
     asset = db.query(models.Asset).filter(models.Asset.serial_number == serial).first()
     if not asset:
@@ -166,4 +258,125 @@ def search_topology(
         raise HTTPException(status_code=404, detail="Asset is not assigned to a customer")
         
     # Return the topology for the customer this asset is assigned to
-    return get_customer_topology(assignment.customer_id, db)
+    return build_customer_topology(db, assignment.customer_id)
+
+# Power budget builders (see power_budget.py)
+
+def build_power_budget(db: Session, splitter_id: int | None = None, fdh_id: int | None = None,
+                       min_margin_db: float = power_budget.MIN_MARGIN_DB):
+    """ Link budget of every active drop line under one splitter or FDH, computed as one batch. """
+    lines = power_budget.load(db, splitter_id=splitter_id, fdh_id=fdh_id)
+    if not len(lines):
+        model, key, label = (models.Splitter, splitter_id, "Splitter") if splitter_id is not None else (models.FDH, fdh_id, "FDH")
+        if db.get(model, key) is None:
+            raise HTTPException(status_code=404, detail=f"{label} not found")
+    budget = power_budget.evaluate(lines)
+    return {
+        "summary": power_budget.summary(budget, min_margin_db),
+        "lines": power_budget.rows(budget, min_margin_db=min_margin_db),
+    }
+
+def build_customer_power_budget(db: Session, customer_id: int):
+    """ Link budget of one customer's drop line. """
+    lines = power_budget.load(db, customer_id=customer_id)
+    if not len(lines):
+        raise HTTPException(status_code=404, detail="Customer has no active drop line")
+    return power_budget.rows(power_budget.evaluate(lines))[0]
+
+def build_below_margin_report(db: Session, min_margin_db: float, fdh_id: int | None, limit: int):
+    """
+    Network-wide: the customers whose margin is under min_margin_db, worst
+    first. The summary covers the whole network (or the FDH).
+    """
+    budget = power_budget.evaluate(power_budget.network(db))
+    if fdh_id is None:
+        positions = power_budget.below_margin(budget, min_margin_db, limit)
+        in_scope = None
+    else:
+        positions = power_budget.below_margin(budget, min_margin_db)
+        positions = positions[budget.lines.fdh_id[positions] == fdh_id][:limit]
+        in_scope = budget.lines.fdh_id == fdh_id
+    return {
+        "summary": power_budget.summary(budget, min_margin_db, in_scope),
+        "lines": power_budget.rows(budget, positions, min_margin_db),
+    }
+
+# --- Routes ---
+
+# The graph routes served from the graph index are tagged with its ETag (see
+# etag.py); /search also depends on assets, which don't bump its generation.
+
+@router.get("/customer/{customer_id}", dependencies=[Depends(conditional_get)])
+async def get_customer_topology(customer_id: int, db: AnySession = Depends(get_session)):
+    """ Network path for a single customer: Headend -> FDH -> Splitter -> Customer. """
+    return await run_db(db, build_customer_topology, customer_id)
+
+@router.post("/customers")
+async def get_customers_topology(request: schemas.CustomerTopologyRequest, db: AnySession = Depends(get_session)):
+    """ Merged, deduplicated network paths for many customers at once. """
+    return await run_db(db, build_customers_topology, request.customer_ids)
+
+@router.get("/fdh/{fdh_id}", dependencies=[Depends(conditional_get)])
+async def get_fdh_topology(fdh_id: int, db: AnySession = Depends(get_session)):
+    """ An FDH with its parent headend, child splitters and their customers. """
+    return await run_db(db, build_fdh_topology, fdh_id)
+
+@router.get("/search")
+async def search_topology(
+    serial: str | None = Query(None),
+    db: AnySession = Depends(get_session)
+):
+    """ Topology for the customer a device (by serial number) is assigned to. """
+    if not serial:
+        raise HTTPException(status_code=400, detail="Serial number is required")
+    return await run_db(db, build_search_topology, serial)
+
+@router.post("/impact", response_model=schemas.ImpactReport)
+async def get_outage_impact(request: schemas.ImpactRequest, db: AnySession = Depends(get_session)):
+    """
+    Outage impact: the customers below any of the failed headends, FDHs,
+    splitters or drop lines, with their assigned assets.
+    """
+    report = await run_db(db, crud.get_outage_impact, request=request)
+    return fast_json(report)
+
+
+# Power budgets read the database, so they carry no graph index ETag (see etag.py)
+
+@router.get("/power/customer/{customer_id}", response_model=schemas.LinkBudget)
+async def get_customer_power_budget(customer_id: int, db: AnySession = Depends(get_session)):
+    """ Optical loss and margin on one customer's drop: feeder, splitter, drop and fixed losses. """
+    return await run_db(db, build_customer_power_budget, customer_id)
+
+@router.get("/power/splitter/{splitter_id}", response_model=schemas.PowerBudgetReport)
+async def get_splitter_power_budget(
+    splitter_id: int,
+    response: Response,
+    min_margin_db: float = Query(power_budget.MIN_MARGIN_DB),
+    db: AnySession = Depends(get_session)
+):
+    """ Link budgets of every active drop line on a splitter. """
+    report = await run_db(db, build_power_budget, splitter_id=splitter_id, min_margin_db=min_margin_db)
+    return fast_json(report, response)
+
+@router.get("/power/fdh/{fdh_id}", response_model=schemas.PowerBudgetReport)
+async def get_fdh_power_budget(
+    fdh_id: int,
+    response: Response,
+    min_margin_db: float = Query(power_budget.MIN_MARGIN_DB),
+    db: AnySession = Depends(get_session)
+):
+    """ Link budgets of every active drop line in an FDH. """
+    report = await run_db(db, build_power_budget, fdh_id=fdh_id, min_margin_db=min_margin_db)
+    return fast_json(report, response)
+
+@router.get("/power/below-margin", response_model=schemas.PowerBudgetReport)
+async def get_below_margin_report(
+    min_margin_db: float = Query(power_budget.MIN_MARGIN_DB),
+    fdh_id: int | None = Query(None),
+    limit: int = Query(1000, ge=1, le=100000),
+    db: AnySession = Depends(get_session)
+):
+    """ Customers below the power margin across the network (or one FDH), worst first. """
+    report = await run_db(db, build_below_margin_report, min_margin_db=min_margin_db, fdh_id=fdh_id, limit=limit)
+    return fast_json(report)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
 from enum import Enum
 import datetime
 
@@ -30,6 +30,21 @@ class CustomerStatus(str, Enum):
     Inactive = 'Inactive'
     Pending = 'Pending'
 
+class TaskStatus(str, Enum):
+    Scheduled = 'Scheduled'
+    InProgress = 'InProgress'
+    Completed = 'Completed'
+    Failed = 'Failed'
+
+class ExportEntity(str, Enum):
+    assets = 'inventory-assets'
+    customers = 'customers'
+    drop_lines = 'drop-lines'
+
+class ExportFormat(str, Enum):
+    ndjson = 'ndjson'
+    csv = 'csv'
+
 # --- User Schemas (Unchanged) ---
 class UserBase(BaseModel):
     username: str
@@ -45,6 +60,23 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class LoginRequest(BaseModel):
+    username: str
+    password: str
+
+class AuthUser(BaseModel):
+    user_id: int
+    username: str
+    role: UserRole
+
+    class Config:
+        from_attributes = True
+
+class Token(AuthUser):
+    access_token: str
+    token_type: str = "bearer"
+    expires_at: datetime.datetime
+
 # --- Asset Schemas (Updated) ---
 class AssetBase(BaseModel):
     asset_type: AssetType
@@ -69,6 +101,22 @@ class Asset(AssetBase):
     class Config:
         from_attributes = True
 
+class AssetImportRow(BaseModel):
+    row: int # 1-based position in the uploaded payload
+    serial_number: Optional[str] = None
+    accepted: bool
+    error: Optional[str] = None
+
+class AssetImportReport(BaseModel):
+    accepted: int
+    rejected: int
+    rows: List[AssetImportRow]
+
+class AssetPage(BaseModel):
+    items: List[Asset]
+    # Opaque cursor for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
 # --- Customer Schemas (Unchanged) ---
 class CustomerBase(BaseModel):
     name: str
@@ -88,6 +136,10 @@ class Customer(CustomerBase):
     class Config:
         from_attributes = True
 
+class CustomerPage(BaseModel):
+    items: List[Customer]
+    next_cursor: Optional[str] = None
+
 # --- Hierarchy Schemas (Updated) ---
 class SplitterBase(BaseModel):
     model: str
@@ -95,6 +147,8 @@ class SplitterBase(BaseModel):
     location: Optional[str] = None
 
 class SplitterCreate(SplitterBase):
+    # At most 256: one bit per port in models.Splitter.port_map
+    port_capacity: int = Field(..., ge=1, le=256)
     fdh_id: int
 
 class Splitter(SplitterBase):
@@ -109,6 +163,8 @@ class FDHBase(BaseModel):
     name: str
     location: str
     region: Optional[str] = None
+    # Fiber run from the headend, used by the power budget
+    feeder_length_meters: Optional[int] = Field(None, ge=0)
 
 class FDHCreate(FDHBase):
     headend_id: int
@@ -151,7 +207,206 @@ class FDHUpdate(BaseModel):
     location: Optional[str] = None
     region: Optional[str] = None
     max_ports: Optional[int] = None
+    feeder_length_meters: Optional[int] = Field(None, ge=0)
 
 class HeadendUpdate(BaseModel):
     name: Optional[str] = None
-    location: Optional[str] = None
\ No newline at end of file
+    location: Optional[str] = None
+
+# --- Port Allocation Schemas ---
+class PortAssignment(BaseModel):
+    customer_id: int
+    # Leave empty to take the lowest free port
+    port: Optional[int] = None
+
+class BulkPortAssignment(BaseModel):
+    customer_ids: List[int] = Field(..., min_length=1, max_length=5000)
+
+class SplitterPorts(BaseModel):
+    splitter_id: int
+    port_capacity: int
+    used_ports: int
+    free_ports: List[int]
+
+# --- Capacity Schemas ---
+class CapacityLevel(str, Enum):
+    fdh = 'fdh'
+    region = 'region'
+    headend = 'headend'
+
+class CapacityRollup(BaseModel):
+    level: CapacityLevel
+    key: str # fdh_id, region name or headend_id
+    splitter_count: int
+    port_capacity: int
+    used_ports: int
+    max_ports: int
+    # used_ports / port_capacity
+    utilization: float
+
+# --- Technician & Task Schemas ---
+class TechnicianBase(BaseModel):
+    name: str
+    contact: Optional[str] = None
+    region: Optional[str] = None
+    # Tasks per day; empty means the dispatch default
+    daily_capacity: Optional[int] = Field(None, ge=1)
+
+class TechnicianCreate(TechnicianBase):
+    pass
+
+class Technician(TechnicianBase):
+    technician_id: int
+
+    class Config:
+        from_attributes = True
+
+class DeploymentTaskBase(BaseModel):
+    scheduled_date: Optional[datetime.date] = None
+    notes: Optional[str] = None
+
+class DeploymentTaskCreate(DeploymentTaskBase):
+    customer_id: int
+    # Leave empty to let the scheduler pick one
+    technician_id: Optional[int] = None
+
+class DeploymentTaskUpdate(BaseModel):
+    status: Optional[TaskStatus] = None
+    scheduled_date: Optional[datetime.date] = None
+    technician_id: Optional[int] = None
+    notes: Optional[str] = None
+
+class DeploymentTask(DeploymentTaskBase):
+    task_id: int
+    status: TaskStatus
+    customer_id: int
+    technician_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class DeploymentTaskPage(BaseModel):
+    items: List[DeploymentTask]
+    next_cursor: Optional[str] = None
+
+class ScheduleRequest(BaseModel):
+    # First day of the window; defaults to today
+    start_date: Optional[datetime.date] = None
+    days: int = Field(7, ge=1, le=31)
+    # Only dispatch this region's backlog
+    region: Optional[str] = None
+    # Work out the plan without saving it
+    dry_run: bool = False
+
+class TaskAssignment(BaseModel):
+    task_id: int
+    technician_id: int
+    scheduled_date: datetime.date
+
+class UnassignedTask(BaseModel):
+    task_id: int
+    reason: str
+
+class ScheduleReport(BaseModel):
+    start_date: datetime.date
+    days: int
+    dry_run: bool
+    scheduled: int
+    unassigned_count: int
+    assignments: List[TaskAssignment]
+    unassigned: List[UnassignedTask]
+
+# --- Power Budget Schemas ---
+class LinkBudget(BaseModel):
+    line_id: int
+    customer_id: int
+    splitter_id: int
+    fdh_id: Optional[int] = None
+    split_ratio: int
+    # None when unknown; the default length was used (estimated)
+    drop_length_meters: Optional[float] = None
+    feeder_length_meters: Optional[float] = None
+    fiber_loss_db: float
+    splitter_loss_db: float
+    fixed_loss_db: float
+    total_loss_db: float
+    margin_db: float
+    below_margin: bool
+    estimated: bool
+
+class PowerBudgetSummary(BaseModel):
+    lines: int
+    below_margin: int
+    estimated: int
+    min_margin_db: Optional[float] = None
+    median_margin_db: Optional[float] = None
+    budget_db: float
+    min_margin_threshold_db: float
+
+class PowerBudgetReport(BaseModel):
+    summary: PowerBudgetSummary
+    lines: List[LinkBudget]
+
+# --- Audit Log Schemas ---
+class AuditLog(BaseModel):
+    log_id: int
+    action_type: Optional[str] = None
+    entity_type: Optional[str] = None
+    entity_id: Optional[int] = None
+    changes: Optional[str] = None # JSON: {field: [old, new]}
+    description: Optional[str] = None
+    timestamp: datetime.datetime
+    user_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class AuditLogPage(BaseModel):
+    items: List[AuditLog]
+    next_cursor: Optional[str] = None
+
+# --- Dashboard Schemas ---
+class DashboardStats(BaseModel):
+    total_customers: int
+    customers_by_status: Dict[str, int]
+    total_assets: int
+    assets_by_type: Dict[str, int]
+    assets_by_status: Dict[str, int]
+    total_fdhs: int
+    total_splitters: int
+    # Tasks that are Scheduled or InProgress
+    pending_tasks: int
+
+
+# --- Topology Schemas ---
+class CustomerTopologyRequest(BaseModel):
+    customer_ids: List[int] = Field(..., min_length=1, max_length=5000)
+
+class ImpactRequest(BaseModel):
+    # Failed nodes, any mix of levels; at least one in total
+    headend_ids: List[int] = Field(default_factory=list, max_length=5000)
+    fdh_ids: List[int] = Field(default_factory=list, max_length=5000)
+    splitter_ids: List[int] = Field(default_factory=list, max_length=5000)
+    line_ids: List[int] = Field(default_factory=list, max_length=5000)
+
+class ImpactedAsset(BaseModel):
+    asset_id: int
+    asset_type: str
+    model: Optional[str] = None
+    serial_number: Optional[str] = None
+    status: Optional[str] = None
+
+class ImpactedCustomer(BaseModel):
+    customer_id: int
+    name: str
+    address: Optional[str] = None
+    neighborhood: Optional[str] = None
+    status: Optional[str] = None
+    splitter_id: Optional[int] = None
+    assigned_port: Optional[int] = None
+    assets: List[ImpactedAsset]
+
+class ImpactReport(BaseModel):
+    customer_count: int
+    asset_count: int
+    customers: List[ImpactedCustomer]
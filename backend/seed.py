@@ -1,20 +1,19 @@
 from database import SessionLocal, engine
 import models
-from passlib.context import CryptContext
+import migrations
+import ancestry
+import asset_search
+import capacity
+import hierarchy_version
+from crud import get_password_hash # Same argon2 parameters the login route uses
 import datetime  # Ensure datetime is imported for the task
 
-# Setup password hashing
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def seed_database():
     db = SessionLocal()
     
     try:
-        # Create all tables
-        models.Base.metadata.create_all(bind=engine)
+        # Create or upgrade the schema
+        migrations.upgrade(engine)
         
         # Check if DB is already seeded
         if db.query(models.User).count() > 0:
@@ -115,6 +114,16 @@ def seed_database():
         db.add(task1)
         db.commit()
 
+        # The rows above were inserted directly, so build what crud would
+        # have kept up to date: capacity roll-ups, the asset search index and
+        # customer ancestry. migrations.upgrade built them from an empty DB.
+        # Bumping the hierarchy version invalidates ETags browsers still hold.
+        capacity.rebuild(db)
+        asset_search.rebuild(db)
+        ancestry.rebuild(db)
+        hierarchy_version.bump(db)
+        db.commit()
+
         print("Database seeding complete!")
 
     except Exception as e:
@@ -0,0 +1,317 @@
+"""
+Synthetic plant generator for load and regression testing.
+
+Builds a realistic network on top of whatever is already in the database:
+headends, FDHs per headend and splitters per FDH, customers filling a share
+of the splitter ports (plus a backlog of unassigned Pending customers),
+drop lines, ONTs and routers assigned to customers, spare warehouse stock,
+technicians, deployment tasks and audit history. A share of the Scheduled
+tasks has no technician or date yet: the backlog POST /api/tasks/schedule
+dispatches (dispatch.py). Those of customers that are already connected,
+but still Pending installation, can be scheduled; those of customers
+without a port are reported as not connected.
+
+Everything derives from --seed through a single random.Random, and IDs are
+assigned here (continuing after the current maximum of each table), so the
+same seed on the same starting database produces the same rows. Rows are
+streamed into per-table buffers and written with executemany inserts; when
+any buffer fills up, all of them are flushed parents-first and committed,
+so memory stays flat and foreign keys always resolve.
+
+Derived data is kept consistent: splitter port bitmaps and used_ports are
+set as ports are filled, and the capacity roll-ups, asset search index and
+customer ancestry are rebuilt at the end (skip that with --skip-derived).
+
+Examples (from the backend directory):
+    python synthetic_data.py --headends 2 --fdhs-per-headend 5           # small
+    python synthetic_data.py --headends 20 --fdhs-per-headend 50 --seed 7 # ~190k customers, ~1.8M rows
+"""
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+import datetime
+import random
+import time
+import ancestry
+import asset_search
+import audit
+import capacity
+import hierarchy_version
+import models
+
+REGIONS = ["North", "South", "East", "West", "Central", "Harbor", "Hills", "Valley"]
+STREETS = ["Oak", "Maple", "Cedar", "Pine", "Elm", "Birch", "Walnut", "Willow", "Aspen", "Spruce", "Lake", "Hill"]
+STREET_TYPES = ["St", "Ave", "Rd", "Ln", "Dr", "Ct", "Way", "Blvd"]
+FIRST_NAMES = ["Alice", "Bob", "Carla", "David", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jamal",
+               "Kira", "Luis", "Maya", "Nikhil", "Olga", "Pavel", "Quinn", "Rosa", "Sanjay", "Tara"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Patel", "Kowalski", "Okafor", "Rossi", "Nguyen", "Silva",
+              "Muller", "Haddad", "Kim", "Singh", "Novak", "Ahmed", "Costa", "Ivanova", "Brown"]
+PLANS = ["100 Mbps Fiber", "300 Mbps Fiber", "500 Mbps Fiber", "1 GIG Fiber", "2 GIG Fiber"]
+ONT_MODELS = ["Nokia G-010G-A", "Huawei HG8010H", "ZTE F601", "Calix 716GE-I"]
+ROUTER_MODELS = ["Netgear R7000", "TP-Link Archer AX55", "Asus RT-AX58U", "Eero Pro 6"]
+SPARE_TYPES = [("ONT", ONT_MODELS), ("Router", ROUTER_MODELS), ("CPE", ["Ubiquiti LiteBeam"]),
+               ("Switch", ["Cisco C9200"]), ("FiberRoll", ["Corning SMF-28 1km"])]
+WAREHOUSES = ["Warehouse A", "Warehouse B", "Warehouse C"] + [f"Tech Van {i}" for i in range(1, 13)]
+
+# Flush order: parents before children
+TABLES = [
+    models.Headend, models.FDH, models.Splitter, models.Technician, models.Customer,
+    models.FiberDropLine, models.Asset, models.AssignedAssets, models.DeploymentTask, models.AuditLog,
+]
+
+
+class BulkWriter:
+    """Per-table row buffers, flushed together (in TABLES order) and committed in batches"""
+
+    def __init__(self, db: Session, batch_size: int):
+        self.db = db
+        self.batch_size = batch_size
+        self.buffers = {model: [] for model in TABLES}
+        self.counts = {model: 0 for model in TABLES}
+
+    def add(self, model, row: dict):
+        buffer = self.buffers[model]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for model in TABLES:
+            rows = self.buffers[model]
+            if rows:
+                self.db.execute(insert(model.__table__), rows)
+                self.counts[model] += len(rows)
+                self.buffers[model] = []
+        self.db.commit()
+
+
+def next_ids(db: Session) -> dict:
+    """First free primary key of every table, so generated rows never collide with existing ones"""
+    ids = {}
+    for model in TABLES:
+        pk = model.__table__.primary_key.columns.values()[0]
+        ids[model] = (db.scalar(select(func.max(pk))) or 0) + 1
+    return ids
+
+
+def generate(db: Session,
+             headends: int = 2,
+             fdhs_per_headend: int = 10,
+             splitters_per_fdh: int = 8,
+             ports_per_splitter: int = 32,
+             fill_ratio: float = 0.75,
+             pending_ratio: float = 0.05,
+             spare_assets_per_fdh: int = 20,
+             technicians_per_region: int = 5,
+             unassigned_task_ratio: float = 0.5,
+             audit_events_per_customer: int = 2,
+             seed: int = 42,
+             base_date: datetime.date = datetime.date(2025, 1, 1),
+             batch_size: int = 10000) -> dict:
+    """Generate a plant; returns row counts per table name"""
+    rng = random.Random(seed)
+    ids = next_ids(db)
+    writer = BulkWriter(db, batch_size)
+    base_time = datetime.datetime.combine(base_date, datetime.time())
+
+    def take_id(model) -> int:
+        value = ids[model]
+        ids[model] += 1
+        return value
+
+    def person() -> str:
+        return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+    def address() -> str:
+        return f"{rng.randint(1, 9999)} {rng.choice(STREETS)} {rng.choice(STREET_TYPES)}"
+
+    def moment(days_back: int = 365) -> datetime.datetime:
+        return base_time - datetime.timedelta(seconds=rng.randint(0, days_back * 86400))
+
+    def add_asset(asset_type: str, model: str, status: str, location: str) -> int:
+        asset_id = take_id(models.Asset)
+        writer.add(models.Asset, {
+            "asset_id": asset_id, "asset_type": asset_type, "model": model,
+            "serial_number": f"SYN{asset_type[:2].upper()}{asset_id:010d}",
+            "status": status, "location": location,
+        })
+        return asset_id
+
+    def add_history(customer_id: int, name: str, splitter_id: int | None, port: int | None, created: datetime.datetime):
+        events = [audit.AuditEvent("Customer Create", "Customer", customer_id, label=name, timestamp=created)]
+        if splitter_id is not None:
+            events.append(audit.AuditEvent(
+                "Port Assigned", "Customer", customer_id, label=name,
+                changes={"splitter_id": [None, splitter_id], "assigned_port": [None, port]},
+                timestamp=created + datetime.timedelta(hours=rng.randint(1, 72)),
+            ))
+        while len(events) < audit_events_per_customer:
+            events.append(audit.AuditEvent(
+                "Customer Update", "Customer", customer_id, label=name,
+                changes={"plan": [rng.choice(PLANS), rng.choice(PLANS)]},
+                timestamp=created + datetime.timedelta(days=rng.randint(1, 300)),
+            ))
+        for event in events[:audit_events_per_customer]:
+            writer.add(models.AuditLog, {"log_id": take_id(models.AuditLog), **event.row()})
+
+    def add_customer(region: str, technicians: list[int], splitter_id: int | None, port: int | None):
+        customer_id = take_id(models.Customer)
+        name = person()
+        created = moment()
+        assigned = splitter_id is not None
+        # Connected customers still Pending are waiting for their installation
+        status = rng.choices(["Active", "Inactive", "Pending"], weights=[90, 5, 5])[0] if assigned else "Pending"
+        writer.add(models.Customer, {
+            "customer_id": customer_id, "name": name, "address": address(), "neighborhood": region,
+            "plan": rng.choice(PLANS), "connection_type": "Wired", "status": status,
+            "assigned_port": port, "created_at": created, "splitter_id": splitter_id,
+        })
+
+        if assigned:
+            writer.add(models.FiberDropLine, {
+                "line_id": take_id(models.FiberDropLine),
+                "length_meters": round(rng.uniform(15, 900), 2),
+                "status": "Active" if status == "Active" else "Disconnected",
+                "from_splitter_id": splitter_id, "to_customer_id": customer_id,
+            })
+            for asset_type, choices in (("ONT", ONT_MODELS), ("Router", ROUTER_MODELS)):
+                asset_id = add_asset(asset_type, rng.choice(choices), "Assigned", "Customer Premises")
+                writer.add(models.AssignedAssets, {
+                    "id": take_id(models.AssignedAssets), "customer_id": customer_id,
+                    "asset_id": asset_id, "assigned_on": created,
+                })
+
+        if status != "Pending":
+            task_status = "Completed"
+        elif assigned:
+            task_status = "Scheduled"
+        else:
+            task_status = rng.choice(["Scheduled", "InProgress"])
+        scheduled = (created + datetime.timedelta(days=rng.randint(1, 14))).date()
+        technician_id = rng.choice(technicians) if technicians else None
+        if task_status == "Scheduled" and rng.random() < unassigned_task_ratio:
+            # Not dispatched yet: no technician, and no date requested
+            scheduled = technician_id = None
+        writer.add(models.DeploymentTask, {
+            "task_id": take_id(models.DeploymentTask), "status": task_status, "scheduled_date": scheduled,
+            "notes": "Installation", "customer_id": customer_id, "technician_id": technician_id,
+        })
+        add_history(customer_id, name, splitter_id, port, created)
+
+    # Technicians per region, shared by every headend in it
+    technicians_by_region = {}
+    for region in REGIONS[:max(1, min(len(REGIONS), headends))]:
+        for _ in range(technicians_per_region):
+            technician_id = take_id(models.Technician)
+            writer.add(models.Technician, {
+                "technician_id": technician_id, "name": person(),
+                "contact": f"555-{rng.randint(0, 9999):04d}", "region": region,
+            })
+            technicians_by_region.setdefault(region, []).append(technician_id)
+
+    for h in range(headends):
+        region = REGIONS[h % len(REGIONS)]
+        technicians = technicians_by_region.get(region, [])
+        headend_id = take_id(models.Headend)
+        writer.add(models.Headend, {
+            "headend_id": headend_id, "name": f"HE-{headend_id:04d}", "location": f"{address()} ({region})",
+        })
+
+        for _ in range(fdhs_per_headend):
+            fdh_id = take_id(models.FDH)
+            writer.add(models.FDH, {
+                "fdh_id": fdh_id, "name": f"FDH-{fdh_id:06d}-{region}", "location": address(), "region": region,
+                "max_ports": splitters_per_fdh * ports_per_splitter, "headend_id": headend_id,
+            })
+
+            for slot in range(splitters_per_fdh):
+                splitter_id = take_id(models.Splitter)
+                mask = 0
+                for port in range(1, ports_per_splitter + 1):
+                    if rng.random() < fill_ratio:
+                        mask |= 1 << (port - 1)
+                # The splitter row goes first so its customers' foreign keys resolve
+                writer.add(models.Splitter, {
+                    "splitter_id": splitter_id, "model": f"1:{ports_per_splitter}",
+                    "port_capacity": ports_per_splitter, "used_ports": mask.bit_count(),
+                    "port_map": mask.to_bytes((ports_per_splitter + 7) // 8, "little"),
+                    "location": f"Slot {slot % 16 + 1}, Shelf {slot // 16 + 1}", "fdh_id": fdh_id,
+                })
+                for port in range(1, ports_per_splitter + 1):
+                    if mask >> (port - 1) & 1:
+                        add_customer(region, technicians, splitter_id, port)
+
+            pending = round(splitters_per_fdh * ports_per_splitter * pending_ratio)
+            for _ in range(pending):
+                add_customer(region, technicians, None, None)
+            for _ in range(spare_assets_per_fdh):
+                asset_type, choices = rng.choice(SPARE_TYPES)
+                status = rng.choices(["Available", "Faulty", "Retired"], weights=[90, 7, 3])[0]
+                add_asset(asset_type, rng.choice(choices), status, rng.choice(WAREHOUSES))
+
+    writer.flush()
+    return {model.__tablename__: count for model, count in writer.counts.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal, engine
+    import migrations
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic network plant for load testing",
+                                     epilog="Rows are added after existing data; run against an empty database for clean numbers.")
+    parser.add_argument("--headends", type=int, default=2)
+    parser.add_argument("--fdhs-per-headend", type=int, default=10)
+    parser.add_argument("--splitters-per-fdh", type=int, default=8)
+    parser.add_argument("--ports", type=int, default=32, help="ports per splitter")
+    parser.add_argument("--fill", type=float, default=0.75, help="share of splitter ports with a customer")
+    parser.add_argument("--pending", type=float, default=0.05,
+                        help="unassigned Pending customers per FDH, as a share of its ports")
+    parser.add_argument("--spare-assets", type=int, default=20, help="warehouse assets per FDH")
+    parser.add_argument("--technicians", type=int, default=5, help="technicians per region")
+    parser.add_argument("--unassigned-tasks", type=float, default=0.5,
+                        help="share of Scheduled tasks left without a technician, for the dispatcher")
+    parser.add_argument("--audit-events", type=int, default=2, help="audit log entries per customer")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--base-date", type=datetime.date.fromisoformat, default=datetime.date(2025, 1, 1),
+                        help="generated timestamps fall in the year before this date")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--skip-derived", action="store_true",
+                        help="don't rebuild capacity roll-ups, the asset search index and customer ancestry afterwards")
+    args = parser.parse_args()
+
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        counts = generate(
+            db,
+            headends=args.headends,
+            fdhs_per_headend=args.fdhs_per_headend,
+            splitters_per_fdh=args.splitters_per_fdh,
+            ports_per_splitter=args.ports,
+            fill_ratio=args.fill,
+            pending_ratio=args.pending,
+            spare_assets_per_fdh=args.spare_assets,
+            technicians_per_region=args.technicians,
+            unassigned_task_ratio=args.unassigned_tasks,
+            audit_events_per_customer=args.audit_events,
+            seed=args.seed,
+            base_date=args.base_date,
+            batch_size=args.batch_size,
+        )
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        for table, count in counts.items():
+            print(f"{table:<16} {count:>12,}")
+        print(f"{'total':<16} {total:>12,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+        hierarchy_version.bump(db) # Browsers' hierarchy ETags no longer hold
+        db.commit()
+
+        if not args.skip_derived:
+            start = time.perf_counter()
+            capacity.rebuild(db)
+            asset_search.rebuild(db)
+            ancestry.rebuild(db)
+            print(f"Capacity roll-ups, asset search index and customer ancestry rebuilt in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
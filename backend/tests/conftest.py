@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+
+# A throwaway SQLite database, set before the app's modules read DATABASE_URL
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.pop("DB_ASYNC", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+import migrations
+from database import SessionLocal, engine
+
+
+@pytest.fixture(scope="session")
+def client():
+    migrations.upgrade(engine)
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@contextmanager
+def count_statements():
+    """Collects every SQL statement the engine runs inside the block"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
@@ -0,0 +1,45 @@
+"""
+The trigram index narrows down selective terms only; common terms fall
+back to a plain ILIKE scan. Both must find the same assets.
+"""
+import itertools
+
+import pytest
+
+import asset_search
+import crud
+import schemas
+
+_serials = itertools.count()
+
+
+@pytest.fixture
+def assets(db, monkeypatch):
+    monkeypatch.setattr(asset_search, "MAX_CANDIDATES", 5)
+    created = [
+        crud.create_asset(db, schemas.AssetCreate(
+            asset_type="ONT", model="Test ONT", serial_number=f"SRCH{next(_serials):06d}", location=location,
+        ))
+        for location in ["Common Depot"] * 8 + ["Rare Van 7"]
+    ]
+    return {asset.asset_id: asset for asset in created}
+
+
+def test_rare_term_uses_index(db, assets):
+    assert asset_search.candidate_ids(db, "rare van", ("location",)) is not None
+    found = [a.asset_id for a in crud.get_assets(db, location="rare van", limit=1000)["items"]]
+    assert [assets[asset_id].location for asset_id in found if asset_id in assets] == ["Rare Van 7"]
+
+
+def test_common_term_scans(db, assets):
+    assert asset_search.candidate_ids(db, "common depot", ("location",)) is None
+    found = {a.asset_id for a in crud.get_assets(db, location="common depot", limit=1000)["items"]}
+    assert {asset_id for asset_id, a in assets.items() if a.location == "Common Depot"} <= found
+
+
+def test_search_agrees_with_scan(db, assets, monkeypatch):
+    serial = next(a.serial_number for a in assets.values() if a.location == "Rare Van 7")
+    indexed = [a.asset_id for a in crud.search_assets(db, serial[2:])]
+    monkeypatch.setattr(asset_search, "MAX_CANDIDATES", 0)
+    assert [a.asset_id for a in crud.search_assets(db, serial[2:])] == indexed
+    assert len(indexed) == 1
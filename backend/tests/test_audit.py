@@ -0,0 +1,55 @@
+"""
+Security-relevant actions are audited in the same transaction as the
+change, so their trail survives even if queued events are never written.
+"""
+import pytest
+
+import audit
+import crud
+import models
+import schemas
+
+
+@pytest.fixture
+def lost_queue(client, monkeypatch):
+    """Queued events vanish, as if the process died before the writer flushed them"""
+    assert audit.writer is not None and audit.writer.running
+    monkeypatch.setattr(audit.writer, "enqueue", lambda events: [])
+
+
+def audit_rows(db, action_type: str, entity_id: int):
+    return db.query(models.AuditLog).filter_by(action_type=action_type, entity_id=entity_id).all()
+
+
+def test_port_changes_are_atomic(db, lost_queue):
+    headend = crud.create_headend(db, schemas.HeadendCreate(name="AUDIT-HE"))
+    fdh = crud.create_fdh(db, schemas.FDHCreate(name="AUDIT-FDH", location="Test", headend_id=headend.headend_id))
+    splitter = crud.create_splitter(db, schemas.SplitterCreate(model="1:8", port_capacity=8, fdh_id=fdh.fdh_id))
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="Audit", address="1 Test St"))
+
+    crud.assign_customer_port(db, splitter.splitter_id, schemas.PortAssignment(customer_id=customer.customer_id))
+    crud.release_customer_port(db, splitter.splitter_id, customer.customer_id)
+
+    assert len(audit_rows(db, "Port Assigned", customer.customer_id)) == 1
+    assert len(audit_rows(db, "Port Released", customer.customer_id)) == 1
+
+
+def test_login_is_atomic(db, lost_queue):
+    user = models.User(username="audit-user", password_hash="x", role="Admin")
+    db.add(user)
+    db.commit()
+
+    crud.record_login(db, user.user_id)
+
+    assert len(audit_rows(db, "Login", user.user_id)) == 1
+
+
+def test_task_history_starts_with_its_creation(db, monkeypatch):
+    monkeypatch.setattr(audit, "writer", None) # Synchronous mode: the row is there on commit
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="Audit Task", address="1 Test St"))
+
+    task = crud.create_task(db, schemas.DeploymentTaskCreate(customer_id=customer.customer_id, notes="Install"))
+
+    created = audit_rows(db, "Task Create", task.task_id)
+    assert len(created) == 1
+    assert created[0].entity_type == "DeploymentTask"
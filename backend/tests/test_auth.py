@@ -0,0 +1,20 @@
+"""Malformed tokens are a 401, never a server error."""
+import pytest
+from fastapi import HTTPException
+from starlette.websockets import WebSocketDisconnect
+
+import auth
+
+
+@pytest.mark.parametrize("token", ["no-signature", "e30.forged", "e30.sïgnature", "päyload.c2ln", "é.é"])
+def test_bad_tokens_are_unauthorized(token):
+    with pytest.raises(HTTPException) as error:
+        auth.verify_token(token)
+    assert error.value.status_code == 401
+
+
+def test_non_ascii_token_on_the_websocket(client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/events?token=%C3%A9.%C3%A9") as websocket:
+            websocket.receive_text()
+    assert closed.value.code == 1008
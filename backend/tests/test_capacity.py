@@ -0,0 +1,34 @@
+"""
+The first writes to a new roll-up node can race: each sees the row missing
+and inserts it. The later insert must skip the row, not fail the write.
+"""
+from sqlalchemy import insert
+
+import capacity
+import models
+from database import SessionLocal
+
+
+def test_row_created_by_another_session(db, monkeypatch):
+    keys = [("region", "Raced")]
+    checked = capacity._existing_keys
+
+    def racing(session, keys):
+        existing = checked(session, keys)
+        # Another writer's first write to the node commits right after our check
+        other = SessionLocal()
+        try:
+            other.execute(insert(models.CapacityRollup).values(
+                level="region", key="Raced", splitter_count=1, port_capacity=8, used_ports=0, max_ports=0
+            ))
+            other.commit()
+        finally:
+            other.close()
+        return existing
+
+    monkeypatch.setattr(capacity, "_existing_keys", racing)
+    capacity.adjust(db, keys, splitter_count=1, port_capacity=32)
+    db.commit()
+
+    row = db.get(models.CapacityRollup, ("region", "Raced"))
+    assert (row.splitter_count, row.port_capacity) == (2, 40)
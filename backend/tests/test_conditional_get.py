@@ -0,0 +1,51 @@
+"""
+Hierarchy routes are tagged with the database's hierarchy version, so a
+write from any worker changes their ETag, and an unchanged hierarchy is a
+304 before the route runs its queries.
+"""
+import crud
+import schemas
+from conftest import count_statements
+
+FDHS = "/api/network-hierarchy/fdhs"
+
+
+def test_unchanged_hierarchy_is_not_modified(client):
+    first = client.get(FDHS)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    with count_statements() as statements:
+        again = client.get(FDHS, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert len(statements) == 1, statements
+
+
+def test_write_from_another_session_changes_the_etag(client, db):
+    first = client.get(FDHS)
+    etag = first.headers["etag"]
+
+    # Another worker's write, through crud in a session of its own
+    headend = crud.create_headend(db, schemas.HeadendCreate(name="ETAG-HE"))
+    crud.create_fdh(db, schemas.FDHCreate(name="ETAG-FDH", location="Test", headend_id=headend.headend_id))
+
+    again = client.get(FDHS, headers={"If-None-Match": etag})
+    assert again.status_code == 200
+    assert again.headers["etag"] != etag
+    assert "ETAG-FDH" in [fdh["name"] for fdh in again.json()]
+
+
+def test_port_writes_change_the_etag(client, db):
+    headend = crud.create_headend(db, schemas.HeadendCreate(name="ETAG-PORTS-HE"))
+    fdh = crud.create_fdh(db, schemas.FDHCreate(name="ETAG-PORTS-FDH", location="Test", headend_id=headend.headend_id))
+    splitter = crud.create_splitter(db, schemas.SplitterCreate(model="1:8", port_capacity=8, fdh_id=fdh.fdh_id))
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="ETag", address="1 Test St"))
+    ports = f"/api/network-hierarchy/splitters/{splitter.splitter_id}/ports"
+    etag = client.get(ports).headers["etag"]
+
+    crud.assign_customer_port(db, splitter.splitter_id, schemas.PortAssignment(customer_id=customer.customer_id))
+
+    again = client.get(ports, headers={"If-None-Match": etag})
+    assert again.status_code == 200
+    assert again.json()["used_ports"] == 1
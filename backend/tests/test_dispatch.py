@@ -0,0 +1,154 @@
+"""
+Batch dispatch: dispatch.plan's placement rules on in-memory backlogs, and
+schedule_tasks refusing to save a plan that raced with another assignment.
+"""
+import datetime
+import itertools
+
+import pytest
+from fastapi import HTTPException
+
+import crud
+import dispatch
+import models
+import schemas
+from database import SessionLocal
+
+MONDAY = datetime.date(2026, 3, 2)
+TUESDAY = MONDAY + datetime.timedelta(days=1)
+THURSDAY = MONDAY + datetime.timedelta(days=3)
+
+_names = itertools.count()
+
+
+def days_by_task(plan: dispatch.Plan) -> dict:
+    return {task_id: day for task_id, _, day, _ in plan.assignments}
+
+
+def technicians_by_task(plan: dispatch.Plan) -> dict:
+    return {task_id: technician_id for task_id, technician_id, _, _ in plan.assignments}
+
+
+def test_fixed_date_task_goes_on_its_date():
+    backlog = dispatch.Backlog(
+        tasks=[(1, "North", "Elm", None), (2, "North", "Elm", THURSDAY)],
+        technicians=[(10, "North", 1)],
+    )
+
+    plan = dispatch.plan(backlog, MONDAY, 5)
+
+    assert plan.assignments == [(2, 10, THURSDAY, THURSDAY), (1, 10, MONDAY, None)]
+    assert plan.unassigned == []
+
+
+def test_existing_bookings_take_capacity():
+    backlog = dispatch.Backlog(
+        tasks=[(task_id, "North", "Elm", None) for task_id in (1, 2, 3)],
+        technicians=[(10, "North", 3)],
+        booked={(10, MONDAY): 2},
+    )
+
+    plan = dispatch.plan(backlog, MONDAY, 2)
+
+    assert days_by_task(plan) == {1: MONDAY, 2: TUESDAY, 3: TUESDAY}
+
+
+def test_default_capacity_when_unset():
+    backlog = dispatch.Backlog(
+        tasks=[(task_id, "North", "Elm", None) for task_id in range(dispatch.DEFAULT_DAILY_CAPACITY + 1)],
+        technicians=[(10, "North", None)],
+    )
+
+    plan = dispatch.plan(backlog, MONDAY, 2)
+
+    assert list(days_by_task(plan).values()).count(MONDAY) == dispatch.DEFAULT_DAILY_CAPACITY
+
+
+def test_neighborhood_is_topped_up_on_the_same_day():
+    # Both technicians start with 3 slots. Elm's second task stays with
+    # whoever took its first, although the other technician is then freer;
+    # Oak goes to the freer one.
+    backlog = dispatch.Backlog(
+        tasks=[(1, "North", "Elm", None), (2, "North", "Oak", None), (3, "North", "Elm", None)],
+        technicians=[(10, "North", 3), (11, "North", 3)],
+    )
+
+    plan = dispatch.plan(backlog, MONDAY, 1)
+
+    technicians = technicians_by_task(plan)
+    assert technicians[1] == technicians[3]
+    assert technicians[2] != technicians[1]
+
+
+def test_tasks_that_cannot_be_placed_are_reported():
+    backlog = dispatch.Backlog(
+        tasks=[
+            (1, None, "Elm", None),
+            (2, "North", "Elm", MONDAY + datetime.timedelta(days=10)),
+            (3, "South", "Elm", None),
+            (4, "North", "Elm", MONDAY),
+        ],
+        technicians=[(10, "North", 2), (11, None, 5)],
+    )
+
+    plan = dispatch.plan(backlog, MONDAY, 3)
+
+    assert days_by_task(plan) == {4: MONDAY}
+    reasons = dict(plan.unassigned)
+    assert reasons.keys() == {1, 2, 3}
+    assert "region" in reasons[1]
+    assert "outside the scheduling window" in reasons[2]
+    assert "No technician free in South" in reasons[3]
+
+
+@pytest.fixture
+def region_backlog(db):
+    """Two unscheduled tasks in a region of their own, and a technician there"""
+    region = f"DISPATCH-{next(_names)}"
+    headend = models.Headend(name=f"{region}-HE")
+    fdh = models.FDH(name=f"{region}-FDH", location="Test", region=region, headend=headend)
+    splitter = models.Splitter(model="1:8", port_capacity=8, fdh=fdh)
+    customer = models.Customer(name="Dispatch", address="Test", status="Active", splitter=splitter, assigned_port=1)
+    technician = models.Technician(name="Dispatch", region=region, daily_capacity=4)
+    tasks = [models.DeploymentTask(status="Scheduled", customer=customer) for _ in range(2)]
+    db.add_all([technician, *tasks])
+    db.commit()
+    return region, technician.technician_id, [task.task_id for task in tasks]
+
+
+def test_schedule_conflicts_with_a_concurrent_assignment(db, region_backlog, monkeypatch):
+    region, technician_id, task_ids = region_backlog
+    planned = dispatch.plan
+
+    def racing_plan(backlog, start, days):
+        result = planned(backlog, start, days)
+        # Someone assigns a task by hand after the backlog was read
+        other = SessionLocal()
+        try:
+            other.get(models.DeploymentTask, task_ids[0]).technician_id = technician_id
+            other.commit()
+        finally:
+            other.close()
+        return result
+
+    monkeypatch.setattr(dispatch, "plan", racing_plan)
+    with pytest.raises(HTTPException) as conflict:
+        crud.schedule_tasks(db, schemas.ScheduleRequest(start_date=MONDAY, days=2, region=region))
+    assert conflict.value.status_code == 409
+
+    # Nothing from the plan was saved
+    db.expire_all()
+    untouched = db.get(models.DeploymentTask, task_ids[1])
+    assert untouched.technician_id is None and untouched.scheduled_date is None
+
+
+def test_schedule_saves_the_plan(db, region_backlog):
+    region, technician_id, task_ids = region_backlog
+
+    result = crud.schedule_tasks(db, schemas.ScheduleRequest(start_date=MONDAY, days=2, region=region))
+
+    assert result["scheduled"] == 2
+    db.expire_all()
+    for task_id in task_ids:
+        task = db.get(models.DeploymentTask, task_id)
+        assert (task.technician_id, task.scheduled_date) == (technician_id, MONDAY)
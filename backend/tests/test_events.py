@@ -0,0 +1,47 @@
+"""
+Customer writes reach the browsers following that customer, and
+subscription changes apply completely or not at all.
+"""
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import crud
+import events
+import schemas
+
+
+def test_new_customer_is_published(db, monkeypatch):
+    published = []
+    monkeypatch.setattr(events, "publish", lambda type, data, topics: published.append((type, data, topics)))
+
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="Evented", address="1 Test St"))
+
+    assert published == [("customer.created", events.plain(customer, schemas.Customer),
+                          [f"customer:{customer.customer_id}"])]
+
+
+def replies(websocket) -> list[dict]:
+    return json.loads(websocket.receive_text())
+
+
+def test_over_the_topic_limit_changes_nothing(client, monkeypatch):
+    monkeypatch.setattr(events, "MAX_TOPICS", 2)
+    with client.websocket_connect("/api/events?topics=customer:1,customer:2") as websocket:
+        assert replies(websocket) == [{"type": "subscribed", "topics": ["customer:1", "customer:2"]}]
+
+        websocket.send_json({"unsubscribe": ["customer:1"], "subscribe": ["customer:3", "customer:4"]})
+        assert replies(websocket)[0]["type"] == "error"
+
+        websocket.send_json({})
+        assert replies(websocket) == [{"type": "subscribed", "topics": ["customer:1", "customer:2"]}]
+
+
+def test_connection_without_a_broker_is_closed(client, monkeypatch):
+    monkeypatch.setattr(events, "_broker", None)
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/events?topics=assets") as websocket:
+            websocket.receive_text()
+    assert closed.value.code == 1013
+    assert json.loads(events._update_topics(events.Subscriber(), {"subscribe": ["assets"]}))["type"] == "error"
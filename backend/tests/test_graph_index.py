@@ -0,0 +1,55 @@
+"""
+The graph index keeps writes that land while it reloads, and never serves
+a customer's path with links it hasn't indexed.
+"""
+import itertools
+from types import SimpleNamespace
+
+import crud
+import graph_index
+import models
+import schemas
+
+_names = itertools.count()
+
+
+def test_update_during_reload_is_kept(db, monkeypatch):
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="Before", address="1 Test St"))
+    index = graph_index.NetworkGraphIndex()
+    read = index._read
+
+    def racing_read(session):
+        maps = read(session)
+        # A write that commits after the snapshot, and updates the index meanwhile
+        index.upsert_customer(SimpleNamespace(
+            customer_id=customer.customer_id, name="After", status="Active", splitter_id=None
+        ))
+        return maps
+
+    index.load(db)
+    monkeypatch.setattr(index, "_read", racing_read)
+    index.load(db)
+
+    assert index.customer_path(customer.customer_id)[0].name == "After"
+
+
+def test_path_through_unindexed_splitter_comes_from_the_database(client, db):
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="Moved", address="1 Test St"))
+    # Another worker adds a splitter and connects the customer to it; this
+    # worker's index only hears about the customer
+    fdh = models.FDH(name=f"GRAPH-FDH-{next(_names)}", location="Test",
+                     headend=models.Headend(name=f"GRAPH-HE-{next(_names)}"))
+    splitter = models.Splitter(model="1:8", port_capacity=8, fdh=fdh)
+    db.add(splitter)
+    db.flush()
+    db.query(models.Customer).filter_by(customer_id=customer.customer_id).update(
+        {"splitter_id": splitter.splitter_id, "assigned_port": 1}
+    )
+    db.commit()
+    graph_index.index.upsert_customer(db.get(models.Customer, customer.customer_id))
+
+    response = client.get(f"/api/topology/customer/{customer.customer_id}")
+
+    assert response.status_code == 200
+    node_ids = {node["id"] for node in response.json()["nodes"]}
+    assert {f"split-{splitter.splitter_id}", f"fdh-{fdh.fdh_id}", f"headend-{fdh.headend_id}"} <= node_ids
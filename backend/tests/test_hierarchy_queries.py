@@ -0,0 +1,63 @@
+"""
+Statement counts for the hierarchy listings. Each must stay the same
+however many headends, FDHs and splitters there are (no N+1 queries).
+"""
+import itertools
+
+import pytest
+
+import crud
+import models
+from conftest import count_statements
+
+_names = itertools.count()
+
+
+def add_tree(db, headends: int, fdhs_per_headend: int, splitters_per_fdh: int):
+    for _ in range(headends):
+        headend = models.Headend(name=f"TEST-HE-{next(_names)}")
+        for _ in range(fdhs_per_headend):
+            fdh = models.FDH(name=f"TEST-FDH-{next(_names)}", location="Test")
+            fdh.splitters = [
+                models.Splitter(model="1:8", port_capacity=8, location="Test") for _ in range(splitters_per_fdh)
+            ]
+            headend.fdhs.append(fdh)
+        db.add(headend)
+    db.commit()
+
+
+# (endpoint, statements): the hierarchy version read for the ETag, then one
+# per level of the tree
+ENDPOINTS = [
+    ("/api/network-hierarchy/headends", 4),
+    ("/api/network-hierarchy/fdhs", 3),
+]
+
+
+@pytest.mark.parametrize("size", [(1, 1, 1), (5, 4, 3)])
+@pytest.mark.parametrize("path, expected", ENDPOINTS)
+def test_endpoint_statement_count(client, db, size, path, expected):
+    add_tree(db, *size)
+    with count_statements() as statements:
+        response = client.get(path)
+    assert response.status_code == 200
+    assert len(statements) == expected, statements
+
+
+@pytest.mark.parametrize("size", [(1, 1, 1), (5, 4, 3)])
+def test_orm_statement_count(db, size):
+    add_tree(db, *size)
+    db.expunge_all()
+    with count_statements() as statements:
+        headends = crud.get_headends(db)
+        # Touch the whole tree the Headend schema serializes
+        splitters = [s for h in headends for f in h.fdhs for s in f.splitters]
+    assert splitters
+    assert len(statements) == 3, statements
+
+    db.expunge_all()
+    with count_statements() as statements:
+        fdhs = crud.get_fdhs(db)
+        splitters = [s for f in fdhs for s in f.splitters]
+    assert splitters
+    assert len(statements) == 2, statements
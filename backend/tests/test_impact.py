@@ -0,0 +1,47 @@
+"""Outage impact through a drop line only counts customers still served by it."""
+import itertools
+
+import pytest
+
+import crud
+import models
+import schemas
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def connected(db):
+    headend = crud.create_headend(db, schemas.HeadendCreate(name=f"IMPACT-HE-{next(_names)}"))
+    fdh = crud.create_fdh(db, schemas.FDHCreate(name=f"IMPACT-FDH-{next(_names)}", location="Test", headend_id=headend.headend_id))
+    splitter = crud.create_splitter(db, schemas.SplitterCreate(model="1:8", port_capacity=8, fdh_id=fdh.fdh_id))
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="Impact", address="1 Test St"))
+    line = models.FiberDropLine(length_meters=50, status="Active", from_splitter_id=splitter.splitter_id,
+                                to_customer_id=customer.customer_id)
+    db.add(line)
+    db.commit()
+    crud.assign_customer_port(db, splitter.splitter_id, schemas.PortAssignment(customer_id=customer.customer_id))
+    return splitter, customer, line
+
+
+def impacted(db, line) -> list[int]:
+    report = crud.get_outage_impact(db, schemas.ImpactRequest(line_ids=[line.line_id]))
+    return [customer["customer_id"] for customer in report["customers"]]
+
+
+def test_drop_line_impact_follows_the_customer(db, connected):
+    splitter, customer, line = connected
+    assert impacted(db, line) == [customer.customer_id]
+
+    crud.release_customer_port(db, splitter.splitter_id, customer.customer_id)
+    assert impacted(db, line) == []
+
+
+def test_disconnected_drop_line_has_no_impact(db, connected):
+    splitter, customer, line = connected
+    line.status = "Disconnected"
+    db.commit()
+    # Refreshed by the next port change, or by a rebuild
+    crud.release_customer_port(db, splitter.splitter_id, customer.customer_id)
+    crud.assign_customer_port(db, splitter.splitter_id, schemas.PortAssignment(customer_id=customer.customer_id))
+    assert impacted(db, line) == []
@@ -0,0 +1,36 @@
+"""Port allocation edge cases: legacy port numbers and the bitmap's size."""
+import pytest
+from pydantic import ValidationError
+
+import crud
+import models
+import schemas
+
+
+@pytest.fixture
+def splitter(db):
+    headend = crud.create_headend(db, schemas.HeadendCreate(name="PORTS-HE"))
+    fdh = crud.create_fdh(db, schemas.FDHCreate(name="PORTS-FDH", location="Test", headend_id=headend.headend_id))
+    return crud.create_splitter(db, schemas.SplitterCreate(model="1:8", port_capacity=8, fdh_id=fdh.fdh_id))
+
+
+def test_legacy_out_of_range_ports_are_ignored(db, splitter):
+    # Rows from before the bitmap, with port numbers it can't hold
+    for port in (0, -3, 2):
+        db.add(models.Customer(name=f"Legacy {port}", address="Test", status="Active",
+                               splitter_id=splitter.splitter_id, assigned_port=port))
+    newcomer = models.Customer(name="Newcomer", address="Test", status="Pending")
+    db.add(newcomer)
+    db.commit()
+
+    crud.assign_customer_port(db, splitter.splitter_id, schemas.PortAssignment(customer_id=newcomer.customer_id))
+
+    assert newcomer.assigned_port == 1
+    assert crud.get_splitter_ports(db, splitter.splitter_id)["free_ports"] == [3, 4, 5, 6, 7, 8]
+
+
+@pytest.mark.parametrize("capacity", [0, 257])
+def test_port_capacity_fits_the_bitmap(capacity):
+    with pytest.raises(ValidationError):
+        schemas.SplitterCreate(model="1:X", port_capacity=capacity, fdh_id=1)
+    assert schemas.SplitterCreate(model="1:256", port_capacity=256, fdh_id=1).port_capacity == 256
@@ -0,0 +1,72 @@
+"""
+Power budgets can't see other workers' writes through this process's graph
+index: the network snapshot expires on age alone, and the per-node routes
+answer from the database every time.
+"""
+import itertools
+
+import pytest
+
+import models
+import power_budget
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def splitter(db):
+    headend = models.Headend(name=f"POWER-HE-{next(_names)}")
+    fdh = models.FDH(name=f"POWER-FDH-{next(_names)}", location="Test", headend=headend)
+    splitter = models.Splitter(model="1:32", port_capacity=32, fdh=fdh)
+    db.add(splitter)
+    db.commit()
+    return splitter
+
+
+def add_line(db, splitter) -> int:
+    """An active drop line written directly, as another worker would"""
+    customer = models.Customer(name="Power", address="Test", status="Active", splitter_id=splitter.splitter_id)
+    db.add(customer)
+    db.flush()
+    line = models.FiberDropLine(length_meters=100, status="Active", from_splitter_id=splitter.splitter_id,
+                                to_customer_id=customer.customer_id)
+    db.add(line)
+    db.commit()
+    return line.line_id
+
+
+def test_network_snapshot_expires_on_age(db, splitter, monkeypatch):
+    monkeypatch.setattr(power_budget, "SNAPSHOT_MAX_AGE", 3600)
+    power_budget.network(db)
+    line_id = add_line(db, splitter)
+    assert line_id not in power_budget.network(db).line_id
+
+    monkeypatch.setattr(power_budget, "SNAPSHOT_MAX_AGE", 0)
+    assert line_id in power_budget.network(db).line_id
+
+
+def test_splitter_budget_is_never_a_stale_304(client, db, splitter):
+    path = f"/api/topology/power/splitter/{splitter.splitter_id}"
+    first = client.get(path)
+    assert first.status_code == 200 and "etag" not in first.headers
+
+    add_line(db, splitter)
+    again = client.get(path, headers={"If-None-Match": "*"})
+    assert again.status_code == 200
+    assert again.json()["summary"]["lines"] == first.json()["summary"]["lines"] + 1
+
+
+def test_moved_customer_has_no_budget_from_the_old_line(client, db, splitter):
+    line_id = add_line(db, splitter)
+    customer_id = db.get(models.FiberDropLine, line_id).to_customer_id
+    assert client.get(f"/api/topology/power/customer/{customer_id}").json()["line_id"] == line_id
+
+    # Moved to another splitter; the old line is still Active
+    other = models.Splitter(model="1:8", port_capacity=8, fdh_id=splitter.fdh_id)
+    db.add(other)
+    db.flush()
+    db.get(models.Customer, customer_id).splitter_id = other.splitter_id
+    db.commit()
+
+    assert client.get(f"/api/topology/power/customer/{customer_id}").status_code == 404
+    assert line_id not in power_budget.load(db).line_id
@@ -0,0 +1,61 @@
+"""
+Dashboard stats: NULL groups are counted under a label, and the cache lock
+isn't held while the counts are computed.
+"""
+import threading
+
+from sqlalchemy import update
+
+import crud
+import models
+
+
+def test_null_status_is_counted_as_unknown(client, db):
+    customer = models.Customer(name="No Status", address="Test")
+    asset = models.Asset(asset_type="ONT", serial_number="STATS-NULL-1")
+    db.add_all([customer, asset])
+    db.flush()
+    # NULL rather than the column defaults, as in rows written outside the app
+    db.execute(update(models.Customer).where(models.Customer.customer_id == customer.customer_id).values(status=None))
+    db.execute(update(models.Asset).where(models.Asset.asset_id == asset.asset_id).values(status=None))
+    db.commit()
+    crud.invalidate_stats()
+
+    response = client.get("/api/stats")
+
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["customers_by_status"][crud.UNKNOWN_GROUP] >= 1
+    assert stats["assets_by_status"][crud.UNKNOWN_GROUP] >= 1
+    assert stats["total_customers"] == sum(stats["customers_by_status"].values())
+
+
+def test_compute_runs_outside_the_lock(db, monkeypatch):
+    computing, finish = threading.Event(), threading.Event()
+    compute = crud._compute_stats
+
+    def slow_compute(session):
+        computing.set()
+        finish.wait(5)
+        return compute(session)
+
+    monkeypatch.setattr(crud, "_compute_stats", slow_compute)
+    crud.invalidate_stats()
+    results = []
+    reader = threading.Thread(target=lambda: results.append(crud.get_stats(db)))
+    reader.start()
+    try:
+        assert computing.wait(5)
+        # A write lands while the slow compute runs: it must not wait for it
+        acquired = crud._stats_lock.acquire(timeout=1)
+        if acquired:
+            crud._stats_lock.release()
+        crud.invalidate_stats()
+    finally:
+        finish.set()
+        reader.join()
+
+    assert acquired
+    assert results
+    # The compute started before that write, so its result isn't cached
+    assert crud._stats_cache["value"] is None
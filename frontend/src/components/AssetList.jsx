@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import StatusBadge from './StatusBadge';
+import { useLiveEvents } from '../liveEvents';
 
 // These should match your backend AssetType and AssetStatus enums
 const ASSET_TYPES = ['ONT', 'Router', 'Switch', 'CPE', 'FiberRoll', 'FDH', 'Splitter'];
@@ -10,6 +11,7 @@ export default function AssetList() {
   const [assets, setAssets] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   
   // State for filters
   const [filters, setFilters] = useState({
@@ -18,8 +20,8 @@ export default function AssetList() {
     location: '', // Add location state
   });
 
-  const fetchAssets = () => {
-    setLoading(true);
+  const fetchAssets = (cursor = null) => {
+    if (!cursor) setLoading(true);
     
     // Build query string from filters
     const params = new URLSearchParams();
@@ -32,6 +34,9 @@ export default function AssetList() {
     if (filters.location) { // Add location to query
       params.append('location', filters.location);
     }
+    if (cursor) {
+      params.append('cursor', cursor);
+    }
     
     const queryString = params.toString();
     
@@ -41,7 +46,8 @@ export default function AssetList() {
         return res.json();
       })
       .then((data) => {
-        setAssets(data);
+        setAssets((prev) => (cursor ? [...prev, ...data.items] : data.items));
+        setNextCursor(data.next_cursor);
         setLoading(false);
       })
       .catch((err) => {
@@ -55,6 +61,32 @@ export default function AssetList() {
     fetchAssets();
   }, [filters]);
 
+  const matchesFilters = (asset) =>
+    (!filters.asset_type || asset.asset_type === filters.asset_type) &&
+    (!filters.status || asset.status === filters.status) &&
+    (!filters.location || (asset.location || '').toLowerCase().includes(filters.location.toLowerCase()));
+
+  // Apply asset changes from other sessions to the rows on screen
+  useLiveEvents(['assets'], (event) => {
+    if (event.type === 'resync' || event.type === 'asset.imported') {
+      fetchAssets();
+      return;
+    }
+    const asset = event.data;
+    if (event.type === 'asset.created') {
+      // Pages are in ID order, so a new asset goes at the end once that's loaded
+      if (!nextCursor && matchesFilters(asset)) {
+        setAssets((prev) => (prev.some((a) => a.asset_id === asset.asset_id) ? prev : [...prev, asset]));
+      }
+    } else if (event.type === 'asset.updated') {
+      setAssets((prev) =>
+        matchesFilters(asset)
+          ? prev.map((a) => (a.asset_id === asset.asset_id ? asset : a))
+          : prev.filter((a) => a.asset_id !== asset.asset_id)
+      );
+    }
+  });
+
   const handleFilterChange = (e) => {
     const { name, value } = e.target;
     setFilters((prev) => ({
@@ -192,6 +224,16 @@ export default function AssetList() {
             </table>
           )}
           {!loading && assets.length === 0 && <p className="p-4">No assets found matching criteria.</p>}
+          {!loading && nextCursor && (
+            <div className="p-4">
+              <button
+                onClick={() => fetchAssets(nextCursor)}
+                className="py-2 px-4 border border-gray-300 rounded-md text-sm font-medium text-gray-700 hover:bg-gray-50"
+              >
+                Load more
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
@@ -4,11 +4,13 @@ export default function CustomerList() {
   const [customers, setCustomers] = useState([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
+  const [nextCursor, setNextCursor] = useState(null)
 
-  useEffect(() => {
-    // Fetch customers from our API
+  const fetchCustomers = (cursor = null) => {
+    // Fetch a page of customers from our API
     // The /api prefix will be handled by the Vite proxy
-    fetch('/api/customers')
+    const url = cursor ? `/api/customers?cursor=${encodeURIComponent(cursor)}` : '/api/customers'
+    fetch(url)
       .then((res) => {
         if (!res.ok) {
           throw new Error('Network response was not ok')
@@ -16,13 +18,18 @@ export default function CustomerList() {
         return res.json()
       })
       .then((data) => {
-        setCustomers(data)
+        setCustomers((prev) => (cursor ? [...prev, ...data.items] : data.items))
+        setNextCursor(data.next_cursor)
         setLoading(false)
       })
       .catch((err) => {
         setError(err.message)
         setLoading(false)
       })
+  }
+
+  useEffect(() => {
+    fetchCustomers()
   }, [])
 
   return (
@@ -42,6 +49,14 @@ export default function CustomerList() {
             ))}
           </ul>
         )}
+        {nextCursor && (
+          <button
+            onClick={() => fetchCustomers(nextCursor)}
+            className="mt-4 py-2 px-4 border border-gray-300 rounded-md text-sm font-medium text-gray-700 hover:bg-gray-50"
+          >
+            Load more
+          </button>
+        )}
       </div>
     </div>
   )
@@ -35,7 +35,7 @@ export default function Dashboard() {
   const [stats, setStats] = useState({
     totalCustomers: 0,
     availableAssets: 0,
-    pendingTasks: 1, // Static for now
+    pendingTasks: 0,
     totalFDHs: 0,
     totalSplitters: 0,
   });
@@ -46,30 +46,20 @@ export default function Dashboard() {
     const fetchStats = async () => {
       setLoading(true);
       try {
-        const [customersRes, assetsRes, fdhsRes, splittersRes] = await Promise.all([
-          fetch('/api/customers'),
-          fetch('/api/inventory-assets?status=Available'),
-          fetch('/api/network-hierarchy/fdhs'),
-          fetch('/api/network-hierarchy/splitters'),
-          // We will add the /api/tasks fetch here in Sprint 4
-        ]);
-
-        if (!customersRes.ok || !assetsRes.ok || !fdhsRes.ok || !splittersRes.ok) {
-          throw new Error('Failed to fetch all dashboard data');
+        // All counts are aggregated server-side in a single request
+        const res = await fetch('/api/stats/');
+        if (!res.ok) {
+          throw new Error('Failed to fetch dashboard stats');
         }
+        const data = await res.json();
 
-        const customersData = await customersRes.json();
-        const assetsData = await assetsRes.json();
-        const fdhsData = await fdhsRes.json();
-        const splittersData = await splittersRes.json();
-
-        setStats(prevStats => ({
-          ...prevStats,
-          totalCustomers: customersData.length,
-          availableAssets: assetsData.length,
-          totalFDHs: fdhsData.length,
-          totalSplitters: splittersData.length,
-        }));
+        setStats({
+          totalCustomers: data.total_customers,
+          availableAssets: data.assets_by_status.Available || 0,
+          pendingTasks: data.pending_tasks,
+          totalFDHs: data.total_fdhs,
+          totalSplitters: data.total_splitters,
+        });
 
       } catch (err) {
         setError(err.message);
@@ -115,16 +105,10 @@ export default function Dashboard() {
         <StatCard
           title="Pending Tasks"
           value={stats.pendingTasks}
-          loading={loading} // This will just show '1' after loading
+          loading={loading}
           to="/tasks"
         />
       </div>
-      
-      {!loading && !error && (
-        <div className="mt-6 bg-blue-50 text-blue-700 p-4 rounded-md text-sm">
-          <strong>Note:</strong> The 'Pending Tasks' card is using static data. Its live API endpoint will be built in Sprint 4.
-        </div>
-      )}
     </div>
   );
 }
\ No newline at end of file
@@ -4,6 +4,7 @@ import FDHForm from './FDHForm';
 import SplitterForm from './SplitterForm';
 import FDHEditForm from './FDHEditForm'; // Import new edit form
 import SplitterEditForm from './SplitterEditForm'; // Import new edit form
+import { isLive, useLiveEvents } from '../liveEvents';
 
 // Reusable Edit Button
 const EditButton = ({ onClick }) => (
@@ -25,6 +26,37 @@ const AddButton = ({ onClick, text }) => (
   </button>
 );
 
+// --- Live update helpers ---
+
+// Insert (with defaults for the nested lists) or update a row in a list kept in ID order
+const upsertById = (list, key, item, defaults = {}) => {
+  if (!list.some((row) => row[key] === item[key])) {
+    return [...list, { ...defaults, ...item }].sort((a, b) => a[key] - b[key]);
+  }
+  return list.map((row) => (row[key] === item[key] ? { ...row, ...item } : row));
+};
+
+// Put a splitter under its FDH, taking it out of this FDH if it moved elsewhere
+const placeSplitter = (fdh, splitter) => {
+  if (fdh.fdh_id === splitter.fdh_id) {
+    return { ...fdh, splitters: upsertById(fdh.splitters, 'splitter_id', splitter) };
+  }
+  const others = fdh.splitters.filter((s) => s.splitter_id !== splitter.splitter_id);
+  return others.length === fdh.splitters.length ? fdh : { ...fdh, splitters: others };
+};
+
+// Same for an FDH and its headend; the FDH keeps its splitters
+const placeFdh = (headends, fdh) => {
+  const previous = headends.flatMap((h) => h.fdhs).find((f) => f.fdh_id === fdh.fdh_id);
+  return headends.map((headend) => {
+    if (headend.headend_id === fdh.headend_id) {
+      return { ...headend, fdhs: upsertById(headend.fdhs, 'fdh_id', { ...previous, ...fdh }, { splitters: [] }) };
+    }
+    const others = headend.fdhs.filter((f) => f.fdh_id !== fdh.fdh_id);
+    return others.length === headend.fdhs.length ? headend : { ...headend, fdhs: others };
+  });
+};
+
 export default function NetworkHierarchy() {
   const [headends, setHeadends] = useState([]);
   const [fdhList, setFdhList] = useState([]); // Flat list of all FDHs for the form
@@ -69,6 +101,25 @@ export default function NetworkHierarchy() {
     fetchHierarchy();
   }, []);
 
+  // Apply hierarchy changes (from any session) to the tree in place
+  useLiveEvents(['hierarchy'], (event) => {
+    const item = event.data;
+    if (event.type === 'resync') {
+      fetchHierarchy();
+    } else if (event.type === 'headend.created') {
+      setHeadends((prev) => upsertById(prev, 'headend_id', item, { fdhs: [] }));
+    } else if (event.type.startsWith('fdh.')) {
+      setHeadends((prev) => placeFdh(prev, item));
+      setFdhList((prev) => upsertById(prev, 'fdh_id', item, { splitters: [] }));
+    } else if (event.type.startsWith('splitter.')) {
+      setHeadends((prev) => prev.map((headend) => ({
+        ...headend,
+        fdhs: headend.fdhs.map((fdh) => placeSplitter(fdh, item)),
+      })));
+      setFdhList((prev) => prev.map((fdh) => placeSplitter(fdh, item)));
+    }
+  });
+
   // --- Modal Handlers ---
   const openAddFdhModal = (headendId) => {
     setCurrentItem({ headend_id: headendId }); // Pass the parent ID
@@ -107,7 +158,8 @@ export default function NetworkHierarchy() {
   // This function will be called by all forms on success
   const handleFormSuccess = () => {
     closeModal();
-    fetchHierarchy(); // Refresh the entire hierarchy list
+    // The change comes back as a live event; only refetch without one
+    if (!isLive()) fetchHierarchy();
   };
   
   return (
@@ -17,6 +17,14 @@ const getStatusClasses = (status) => {
       return 'bg-gray-100 text-gray-800';
     case 'Pending':
       return 'bg-purple-100 text-purple-800';
+    case 'Scheduled':
+      return 'bg-blue-100 text-blue-800';
+    case 'InProgress':
+      return 'bg-yellow-100 text-yellow-800';
+    case 'Completed':
+      return 'bg-green-100 text-green-800';
+    case 'Failed':
+      return 'bg-red-100 text-red-800';
     default:
       return 'bg-gray-100 text-gray-800';
   }
@@ -1,12 +1,147 @@
-import React from 'react'
-// This is a placeholder for now.
-// You would fetch /api/tasks here (after creating the router).
+import React, { useState, useEffect } from 'react'
+import StatusBadge from './StatusBadge'
+
+const COLUMNS = ['Task', 'Customer', 'Technician', 'Date', 'Status', 'Notes']
+
 export default function TaskList() {
+  const [tasks, setTasks] = useState([])
+  const [loading, setLoading] = useState(true)
+  const [error, setError] = useState(null)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [unassignedOnly, setUnassignedOnly] = useState(false)
+  const [scheduling, setScheduling] = useState(false)
+  const [report, setReport] = useState(null)
+
+  const fetchTasks = (cursor = null) => {
+    const params = new URLSearchParams()
+    if (unassignedOnly) params.append('unassigned', 'true')
+    if (cursor) params.append('cursor', cursor)
+    fetch(`/api/tasks?${params.toString()}`)
+      .then((res) => {
+        if (!res.ok) {
+          throw new Error('Network response was not ok')
+        }
+        return res.json()
+      })
+      .then((data) => {
+        setTasks((prev) => (cursor ? [...prev, ...data.items] : data.items))
+        setNextCursor(data.next_cursor)
+        setLoading(false)
+      })
+      .catch((err) => {
+        setError(err.message)
+        setLoading(false)
+      })
+  }
+
+  useEffect(() => {
+    setLoading(true)
+    fetchTasks()
+  }, [unassignedOnly])
+
+  // Dispatch the unscheduled backlog over the next 7 days
+  const handleSchedule = () => {
+    setScheduling(true)
+    setReport(null)
+    fetch('/api/tasks/schedule', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ days: 7 }),
+    })
+      .then((res) => {
+        if (!res.ok) {
+          return res.json().then((err) => {
+            throw new Error(err.detail || 'Scheduling failed')
+          })
+        }
+        return res.json()
+      })
+      .then((data) => {
+        setReport(data)
+        setScheduling(false)
+        fetchTasks()
+      })
+      .catch((err) => {
+        setError(err.message)
+        setScheduling(false)
+      })
+  }
+
   return (
     <div>
-      <h2 className="text-3xl font-bold text-gray-800 mb-4">Deployment Tasks</h2>
-      <div className="bg-white p-6 rounded-lg shadow">
-        <p>Task list will be displayed here.</p>
+      <div className="flex justify-between items-center mb-4">
+        <h2 className="text-3xl font-bold text-gray-800">Deployment Tasks</h2>
+        <button
+          onClick={handleSchedule}
+          disabled={scheduling}
+          className="py-2 px-4 border border-transparent rounded-md shadow-sm text-sm font-medium text-white bg-blue-600 hover:bg-blue-700 disabled:opacity-50"
+        >
+          {scheduling ? 'Scheduling...' : 'Schedule next 7 days'}
+        </button>
+      </div>
+
+      {report && (
+        <div className="mb-4 p-4 bg-blue-50 rounded-lg text-sm text-blue-800">
+          Scheduled {report.scheduled} task(s) from {report.start_date}.
+          {report.unassigned_count > 0 && (
+            <span> {report.unassigned_count} could not be placed, e.g. task {report.unassigned[0].task_id}: {report.unassigned[0].reason}</span>
+          )}
+        </div>
+      )}
+
+      <div className="mb-4">
+        <label className="inline-flex items-center text-sm text-gray-700">
+          <input
+            type="checkbox"
+            checked={unassignedOnly}
+            onChange={(e) => setUnassignedOnly(e.target.checked)}
+            className="mr-2"
+          />
+          Only tasks without a technician
+        </label>
+      </div>
+
+      <div className="bg-white shadow overflow-hidden rounded-lg">
+        <div className="overflow-x-auto">
+          {loading && <p className="p-4">Loading tasks...</p>}
+          {error && <p className="p-4 text-red-500">Error: {error}</p>}
+          {!loading && !error && tasks.length > 0 && (
+            <table className="min-w-full divide-y divide-gray-200">
+              <thead className="bg-gray-50">
+                <tr>
+                  {COLUMNS.map((column) => (
+                    <th key={column} scope="col" className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                      {column}
+                    </th>
+                  ))}
+                </tr>
+              </thead>
+              <tbody className="bg-white divide-y divide-gray-200">
+                {tasks.map((task) => (
+                  <tr key={task.task_id}>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">#{task.task_id}</td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{task.customer_id}</td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{task.technician_id ?? 'Unassigned'}</td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{task.scheduled_date ?? '-'}</td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm">
+                      <StatusBadge status={task.status} />
+                    </td>
+                    <td className="px-6 py-4 text-sm text-gray-500">{task.notes}</td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          )}
+          {!loading && tasks.length === 0 && <p className="p-4">No tasks found.</p>}
+          {!loading && nextCursor && (
+            <button
+              onClick={() => fetchTasks(nextCursor)}
+              className="m-4 py-2 px-4 border border-gray-300 rounded-md text-sm font-medium text-gray-700 hover:bg-gray-50"
+            >
+              Load more
+            </button>
+          )}
+        </div>
       </div>
     </div>
   )
@@ -3,6 +3,33 @@ import ReactFlow, { MiniMap, Controls, Background, useNodesState, useEdgesState,
 import 'reactflow/dist/style.css';
 import { useSearchParams } from 'react-router-dom';
 import CustomNode from './CustomNode'; // We will create this
+import { useLiveEvents } from '../liveEvents';
+
+const FAULTY_STATUSES = ['Faulty', 'Retired', 'Inactive', 'Disconnected'];
+
+// Add default edge styles
+const styleEdge = (edge) => ({
+  ...edge,
+  type: 'smoothstep',
+  markerEnd: { type: MarkerType.ArrowClosed, color: '#6b7280' },
+  style: { stroke: '#6b7280', strokeWidth: 2 }
+});
+
+// Same shape as format_node / format_edge in routers/topology.py
+const makeNode = (id, label, type, status, x, y) => ({
+  id,
+  position: { x, y },
+  data: { label, type, status, isFaulty: FAULTY_STATUSES.includes(status) },
+  type: 'custom'
+});
+const makeEdge = (source, target) => styleEdge({ id: `e-${source}-to-${target}`, source, target, animated: false });
+
+// Replace a node's data (keeping where the user dragged it), or add it
+const upsertNode = (nodes, node) => (
+  nodes.some((n) => n.id === node.id)
+    ? nodes.map((n) => (n.id === node.id ? { ...n, data: node.data } : n))
+    : [...nodes, node]
+);
 
 export default function TopologyViewer() {
   const [nodes, setNodes, onNodesChange] = useNodesState([]);
@@ -10,6 +37,7 @@ export default function TopologyViewer() {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [searchParams] = useSearchParams();
+  const [reloads, setReloads] = useState(0); // Bumped to refetch after missed events
 
   // This tells React Flow about our custom node type
   const nodeTypes = useMemo(() => ({ custom: CustomNode }), []);
@@ -41,23 +69,75 @@ export default function TopologyViewer() {
         return res.json();
       })
       .then((data) => {
-        // Add default edge styles
-        const styledEdges = data.edges.map(edge => ({
-          ...edge,
-          type: 'smoothstep',
-          markerEnd: { type: MarkerType.ArrowClosed, color: '#6b7280' },
-          style: { stroke: '#6b7280', strokeWidth: 2 }
-        }));
-        
         setNodes(data.nodes);
-        setEdges(styledEdges);
+        setEdges(data.edges.map(styleEdge));
         setLoading(false);
       })
       .catch((err) => {
         setError(err.message);
         setLoading(false);
       });
-  }, [searchParams, setNodes, setEdges]); // Re-run when search params change
+  }, [searchParams, reloads, setNodes, setEdges]); // Re-run when search params change
+
+  // --- Live updates ---
+  // An FDH view follows its cabinet; a customer (or serial search) view
+  // follows that customer's path, which is short enough to refetch.
+  const fdhId = searchParams.get('fdh_id');
+  const pathCustomer = searchParams.get('customer_id')
+    || nodes.find((node) => node.id.startsWith('cust-'))?.id.slice('cust-'.length);
+  const liveTopic = fdhId ? `fdh:${fdhId}` : pathCustomer ? `customer:${pathCustomer}` : null;
+
+  const applyToFdh = (event) => {
+    const item = event.data;
+    if (event.type === 'fdh.updated') {
+      const node = makeNode(`fdh-${item.fdh_id}`, `FDH ${item.name}`, 'fdh', 'Online', 400, 50);
+      setNodes((prev) => upsertNode(prev, node));
+    } else if (event.type.startsWith('splitter.')) {
+      const splitId = `split-${item.splitter_id}`;
+      if (String(item.fdh_id) === fdhId) {
+        const label = `Splitter ${item.model} (${item.location ?? 'None'})`;
+        setNodes((prev) => {
+          const x = prev.filter((n) => n.id.startsWith('split-') && n.id !== splitId).length * 200;
+          return upsertNode(prev, makeNode(splitId, label, 'splitter', 'Online', x, -150));
+        });
+        const edge = makeEdge(`fdh-${fdhId}`, splitId);
+        setEdges((prev) => (prev.some((e) => e.id === edge.id) ? prev : [...prev, edge]));
+      } else {
+        // Moved to another FDH: it leaves this view with its customers
+        const gone = new Set([splitId, ...edges.filter((e) => e.source === splitId).map((e) => e.target)]);
+        setNodes((prev) => prev.filter((n) => !gone.has(n.id)));
+        setEdges((prev) => prev.filter((e) => !gone.has(e.source) && !gone.has(e.target)));
+      }
+    } else if (event.type === 'customer.updated') {
+      const custId = `cust-${item.customer_id}`;
+      const splitId = `split-${item.splitter_id}`;
+      const splitter = nodes.find((n) => n.id === splitId);
+      // Several events can arrive in one frame, so edges are updated from their latest state
+      const withoutCustomer = (prev) => prev.filter((e) => e.target !== custId);
+      if (!splitter) {
+        // Released, or connected to a splitter outside this FDH
+        setNodes((prev) => prev.filter((n) => n.id !== custId));
+        setEdges(withoutCustomer);
+        return;
+      }
+      const siblings = edges.filter((e) => e.source === splitId && e.target !== custId).length;
+      const x = splitter.position.x + siblings * 50;
+      setNodes((prev) => upsertNode(prev, makeNode(custId, item.name, 'customer', item.status, x, -250)));
+      setEdges((prev) => {
+        // Keeps the drop line data if the customer stayed on this splitter
+        const kept = prev.find((e) => e.target === custId && e.source === splitId);
+        return [...withoutCustomer(prev), kept || makeEdge(splitId, custId)];
+      });
+    }
+  };
+
+  useLiveEvents(liveTopic ? [liveTopic] : [], (event) => {
+    if (event.type === 'resync' || (!fdhId && event.type === 'customer.updated')) {
+      setReloads((n) => n + 1);
+    } else if (fdhId) {
+      applyToFdh(event);
+    }
+  });
 
   if (loading) return <p className="text-gray-700">Loading topology...</p>;
   
@@ -0,0 +1,116 @@
+import { useEffect, useRef } from 'react'
+
+// One WebSocket per tab to /api/events (see backend/events.py), shared by
+// every screen. Topics are reference-counted across screens, so the server
+// only sends what is on screen. Each frame is a JSON array of events, and
+// each event goes to the handlers of any topic it lists.
+//
+// A handler also receives { type: 'resync' } whenever it may have missed
+// events: after a reconnect, or when the server dropped its backlog. It
+// should then refetch what it shows.
+
+const handlers = new Map() // topic -> Set of handlers
+let socket = null
+let everConnected = false
+let retryDelay = 1000
+
+const send = (message) => {
+  if (socket && socket.readyState === WebSocket.OPEN) {
+    socket.send(JSON.stringify(message))
+  }
+}
+
+const allHandlers = () => new Set([...handlers.values()].flatMap((set) => [...set]))
+
+const deliver = (event) => {
+  if (event.type === 'resync') {
+    allHandlers().forEach((handler) => handler(event))
+    return
+  }
+  if (event.type === 'error') {
+    console.warn('Live updates:', event.detail)
+    return
+  }
+  if (!event.topics) return // e.g. 'subscribed' acknowledgements
+  const targets = new Set(event.topics.flatMap((topic) => [...(handlers.get(topic) || [])]))
+  targets.forEach((handler) => handler(event))
+}
+
+const connect = () => {
+  const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws'
+  socket = new WebSocket(`${protocol}://${window.location.host}/api/events`)
+
+  socket.onopen = () => {
+    retryDelay = 1000
+    // Everything subscribed so far, including while the socket was connecting
+    send({ subscribe: [...handlers.keys()] })
+    // Anything written while we were away was missed
+    if (everConnected) deliver({ type: 'resync' })
+    everConnected = true
+  }
+  socket.onmessage = (message) => {
+    JSON.parse(message.data).forEach(deliver)
+  }
+  socket.onclose = () => {
+    socket = null
+    if (handlers.size === 0) return
+    setTimeout(() => {
+      if (!socket && handlers.size > 0) connect()
+    }, retryDelay)
+    retryDelay = Math.min(retryDelay * 2, 30000)
+  }
+}
+
+export const isLive = () => socket !== null && socket.readyState === WebSocket.OPEN
+
+// Returns a function that removes the subscription
+export function subscribe(topics, handler) {
+  const added = topics.filter((topic) => !handlers.has(topic))
+  topics.forEach((topic) => {
+    if (!handlers.has(topic)) handlers.set(topic, new Set())
+    handlers.get(topic).add(handler)
+  })
+  if (!socket) {
+    connect()
+  } else if (added.length > 0) {
+    send({ subscribe: added })
+  }
+
+  return () => {
+    const removed = topics.filter((topic) => {
+      const set = handlers.get(topic)
+      if (!set) return false
+      set.delete(handler)
+      if (set.size > 0) return false
+      handlers.delete(topic)
+      return true
+    })
+    if (handlers.size === 0 && socket) {
+      // Nothing on screen is live any more; the next subscriber starts afresh
+      const closing = socket
+      socket = null
+      everConnected = false
+      closing.onopen = null
+      closing.onclose = null
+      closing.onmessage = null
+      closing.close()
+    } else if (removed.length > 0) {
+      send({ unsubscribe: removed })
+    }
+  }
+}
+
+// Subscribe a component to topics for as long as it is mounted. The
+// handler may change between renders; the subscription follows the topics.
+export function useLiveEvents(topics, handler) {
+  const handlerRef = useRef(handler)
+  useEffect(() => {
+    handlerRef.current = handler
+  })
+
+  const key = topics.join(',')
+  useEffect(() => {
+    if (!key) return undefined
+    return subscribe(key.split(','), (event) => handlerRef.current(event))
+  }, [key])
+}
@@ -10,6 +10,7 @@ export default defineConfig({
       '/api': {
         target: 'http://127.0.0.1:8000',
         changeOrigin: true,
+        ws: true, // Live updates (/api/events) are a WebSocket
         rewrite: (path) => path, // Keep the /api prefix
       },
     },